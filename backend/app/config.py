@@ -23,12 +23,13 @@ async def verify_admin_jwt(request: Request, cursor=Depends(get_db_cursor)):
         username = payload.get("username")  # 从 token 中获取用户名
         
         # 检查 token 是否与数据库中的相符（只检查同一用户名的 token）
-        cursor.execute("""
+        await cursor.execute("""
             SELECT current_token 
             FROM admin_users 
             WHERE id=%s AND username=%s
         """, (admin_id, username))
-        row = cursor.fetchone()
+        row = await cursor.fetchone()
+        await cursor.release()  # 驗證完立即歸還連線，不佔用到路由處理結束
         
         if not row or row["current_token"] != token:
             print(f"❌ [管理員驗證] 管理員 {username} (ID: {admin_id}) 的 token 不符或已在其他地方登入")
@@ -51,12 +52,13 @@ async def verify_customer_jwt(request: Request, cursor=Depends(get_db_cursor)):
         username = payload.get("username")  # 从 token 中获取用户名
         
         # 检查 token 是否与数据库中的相符（只检查同一用户名的 token）
-        cursor.execute("""
+        await cursor.execute("""
             SELECT current_token 
             FROM customers 
             WHERE customer_id=%s AND username=%s
         """, (customer_id, username))
-        row = cursor.fetchone()
+        row = await cursor.fetchone()
+        await cursor.release()  # 驗證完立即歸還連線，不佔用到路由處理結束
         
         if not row or row["current_token"] != token:
             print(f"❌ [會員驗證] 會員 {username} (ID: {customer_id}) 的 token 不符或已在其他地方登入")
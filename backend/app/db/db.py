@@ -1,31 +1,120 @@
 import os
-import psycopg2
-import psycopg2.extras
-from psycopg2.pool import SimpleConnectionPool
-from contextlib import contextmanager
+import time
+import weakref
+import asyncio
+import psycopg
+from fastapi import HTTPException
+from psycopg import rows
+from psycopg.conninfo import make_conninfo
+from psycopg.types.numeric import FloatLoader
+from psycopg.pq import TransactionStatus
+from psycopg_pool import ConnectionPool, AsyncConnectionPool, PoolTimeout, TooManyRequests
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
 
-global_pool = None  # 初始化為 None
+global_pool = None  # 同步連線池，供背景任務（APScheduler 執行緒）使用
+async_pool = None   # 非同步連線池 (psycopg 3)，供 async 路由使用
+replica_pool = None  # 唯讀副本連線池（有設定 POSTGRES_REPLICA_HOST 才會建立）
+_async_pool_lock = asyncio.Lock()
+_replica_healthy = False
+_replica_monitor_task = None
 
-# 全局連線池 minconn 建議根據應用程式的預期併發量設定，maxconn 避免耗盡資料庫資源
-# 可以根據實際情況調整這些值
-# 初始化連線池
+# 連線池設定（可由環境變數調整）
+# minconn 建議根據應用程式的預期併發量設定，maxconn 避免耗盡資料庫資源
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 5))          # 最小保持 5 個連線
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 20))         # 最大允許 20 個連線
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 5))          # 取得連線最多等待 5 秒
+DB_POOL_MAX_WAITING = int(os.getenv("DB_POOL_MAX_WAITING", 50))   # 最多 50 個請求排隊等待連線
+DB_POOL_RETRY_AFTER = int(os.getenv("DB_POOL_RETRY_AFTER", 2))    # 連線池滿載時建議前端幾秒後重試
+
+# 唯讀副本設定：副本無法連線或延遲超過 DB_REPLICA_MAX_LAG 秒時，讀取改走主庫
+POSTGRES_REPLICA_HOST = os.getenv("POSTGRES_REPLICA_HOST")
+DB_REPLICA_MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG", 5))
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", 5))
+
+# 連線汰換與存活檢查（避免資料庫容錯移轉後一直拿到壞掉的連線）
+DB_CONN_MAX_LIFETIME = float(os.getenv("DB_CONN_MAX_LIFETIME", 1800))  # 連線最長存活 30 分鐘，到期歸還時汰換
+DB_CONN_MAX_USES = int(os.getenv("DB_CONN_MAX_USES", 1000))           # 每條連線最多借出 1000 次，之後歸還時汰換
+DB_CONN_IDLE_CHECK = float(os.getenv("DB_CONN_IDLE_CHECK", 30))        # 閒置超過 30 秒的連線，借出前先做存活檢查
+
+# 每條連線的使用紀錄：[借出次數, 最後歸還時間]
+_conn_usage = weakref.WeakKeyDictionary()
+
+# 連線池滿載：回傳 503 與 Retry-After，讓流量高峰時快速失敗而不是變成 500
+class PoolExhausted(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=503,
+            detail="伺服器忙碌中，請稍後再試",
+            headers={"Retry-After": str(DB_POOL_RETRY_AFTER)}
+        )
+
+# 連線參數（同步與非同步連線池共用；副本使用相同帳號，只有主機與埠號不同）
+def _conninfo(host=None, port=None):
+    return make_conninfo(
+        dbname=os.getenv("POSTGRES_DB"),
+        user=os.getenv("POSTGRES_USER"),
+        password=os.getenv("POSTGRES_PASSWORD"),
+        host=host or os.getenv("POSTGRES_HOST"),
+        port=port or os.getenv("POSTGRES_PORT", "5432"),
+        # 加入連線參數
+        connect_timeout=3,        # 連線超時時間
+        keepalives=1,            # 啟用 TCP keepalive
+        keepalives_idle=30,      # 閒置 30 秒後發送 keepalive
+        keepalives_interval=10,   # 每 10 秒重試一次
+        keepalives_count=5        # 最多重試 5 次
+    )
+
+# 連線歸還時記錄使用次數，回傳是否已達汰換上限
+def _record_return(conn):
+    usage = _conn_usage.setdefault(conn, [0, 0.0])
+    usage[0] += 1
+    usage[1] = time.monotonic()
+    return usage[0] >= DB_CONN_MAX_USES
+
+# 閒置太久的連線才需要存活檢查，剛用過的連線直接借出，不多花一次來回
+def _idle_too_long(conn):
+    usage = _conn_usage.get(conn)
+    return usage is not None and time.monotonic() - usage[1] > DB_CONN_IDLE_CHECK
+
+# 借出次數達上限的連線在歸還時（reset 回呼）直接關閉，連線池看到已關閉的連線會丟棄並補上新連線
+# （連線池會記錄 warning，屬預期情況）；max_lifetime 只依存活時間汰換，使用次數需自行處理
+def _reset_sync(conn):
+    if _record_return(conn):
+        conn.close()
+
+async def _reset_async(conn):
+    if _record_return(conn):
+        await conn.close()
+
+def _check_sync(conn):
+    if _idle_too_long(conn):
+        ConnectionPool.check_connection(conn)
+
+async def _check_async(conn):
+    if _idle_too_long(conn):
+        await AsyncConnectionPool.check_connection(conn)
+
+# 連線是否仍有未結束的交易（歸還前需回滾，避免把 aborted transaction 的連線交給下一個請求）
+def _in_transaction(conn):
+    return conn.info.transaction_status in (TransactionStatus.INTRANS, TransactionStatus.INERROR)
+
+# 初始化同步連線池（執行緒安全；連線用盡時排隊等待，最多 DB_POOL_TIMEOUT 秒）
+# 只有背景任務使用，因此維持較小的連線數
 def init_pool():
     global global_pool
     if not global_pool:
-        global_pool = SimpleConnectionPool(
-            minconn=5,      # 最小保持 5 個連線
-            maxconn=20,     # 最大允許 20 個連線
-            dbname=os.getenv("POSTGRES_DB"),
-            user=os.getenv("POSTGRES_USER"),
-            password=os.getenv("POSTGRES_PASSWORD"),
-            host=os.getenv("POSTGRES_HOST"),
-            port="5432",
-            # 加入連線參數
-            connect_timeout=3,        # 連線超時時間
-            keepalives=1,            # 啟用 TCP keepalive
-            keepalives_idle=30,      # 閒置 30 秒後發送 keepalive
-            keepalives_interval=10,   # 每 10 秒重試一次
-            keepalives_count=5        # 最多重試 5 次
+        global_pool = ConnectionPool(
+            conninfo=_conninfo(),
+            min_size=1,
+            max_size=3,
+            timeout=DB_POOL_TIMEOUT,
+            max_waiting=DB_POOL_MAX_WAITING,
+            max_lifetime=DB_CONN_MAX_LIFETIME,
+            check=_check_sync,
+            reset=_reset_sync,
+            kwargs={"row_factory": dict_row},
+            open=True
         )
 
 # 從連線池中獲取連線
@@ -37,29 +126,309 @@ def get_db_conn():
 # 同步獲取游標和連線 (專為背景任務設計)
 def get_sync_db_cursor_and_conn():
     conn = get_db_conn()
-    cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+    cursor = conn.cursor()
     return conn, cursor
 
-# FastAPI 依賴項：獲取游標並確保連線被歸還
-async def get_db_cursor():
-    conn = None
+@contextmanager
+def get_conn_and_cursor():
+    conn = get_db_conn()
     cursor = None
     try:
-        conn = get_db_conn()
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-        yield cursor
+        cursor = conn.cursor()
+        yield conn, cursor
     finally:
         if cursor:
             cursor.close()
-        if conn:
-            global_pool.putconn(conn)
+        if _in_transaction(conn):
+            try:
+                conn.rollback()
+            except Exception as e:
+                print(f"⚠️ [連線池] 歸還前回滾失敗，連線將被汰換：{e}")
+        global_pool.putconn(conn)
 
-@contextmanager
-def get_conn_and_cursor():
-    conn = get_db_conn()
+# 查詢結果列：與 psycopg2 的 DictRow 相同，可用索引 row[0] 或欄位名稱 row["status"] 取值
+class DictRow(list):
+    __slots__ = ("_index",)
+
+    def __init__(self, index, values):
+        super().__init__(values)
+        self._index = index
+
+    def __getitem__(self, key):
+        if not isinstance(key, (int, slice)):
+            key = self._index[key]
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except (KeyError, IndexError):
+            return default
+
+    def keys(self):
+        return self._index.keys()
+
+    def values(self):
+        return list(self)
+
+    def items(self):
+        return [(name, self[i]) for name, i in self._index.items()]
+
+# psycopg 3 row factory：回傳 DictRow
+def dict_row(cursor):
+    if cursor.description is None:
+        return tuple
+    index = {column.name: i for i, column in enumerate(cursor.description)}
+
+    def make_row(values):
+        return DictRow(index, values)
+
+    return make_row
+
+def _new_async_pool(conninfo):
+    return AsyncConnectionPool(
+        conninfo=conninfo,
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        timeout=DB_POOL_TIMEOUT,
+        max_waiting=DB_POOL_MAX_WAITING,
+        max_lifetime=DB_CONN_MAX_LIFETIME,
+        check=_check_async,
+        reset=_reset_async,
+        kwargs={"row_factory": dict_row},
+        open=False
+    )
+
+# 初始化非同步連線池（連線用盡時排隊等待，超過等待時間或排隊數上限則回傳 503）
+# 有設定副本時一併建立副本連線池，並啟動背景任務定期檢查副本狀態
+async def init_async_pool():
+    global async_pool, replica_pool, _replica_monitor_task
+    async with _async_pool_lock:
+        if async_pool:
+            return
+        pool = _new_async_pool(_conninfo())
+        await pool.open()
+        async_pool = pool
+
+        if POSTGRES_REPLICA_HOST:
+            replica_pool = _new_async_pool(_conninfo(
+                host=POSTGRES_REPLICA_HOST,
+                port=os.getenv("POSTGRES_REPLICA_PORT", "5432")
+            ))
+            await replica_pool.open(wait=False)  # 副本掛掉不影響啟動
+            _replica_monitor_task = asyncio.create_task(_monitor_replica())
+
+# 關閉非同步連線池（應用程式關閉時呼叫）
+async def close_async_pool():
+    global async_pool, replica_pool, _replica_monitor_task, _replica_healthy
+    if _replica_monitor_task:
+        _replica_monitor_task.cancel()
+        _replica_monitor_task = None
+    if replica_pool:
+        await replica_pool.close()
+        replica_pool = None
+        _replica_healthy = False
+    if async_pool:
+        await async_pool.close()
+        async_pool = None
+
+# 查詢副本延遲秒數；WAL 已全部重播（主庫沒有新寫入）時視為 0
+async def _replica_lag():
+    async with replica_pool.connection(timeout=DB_REPLICA_CHECK_INTERVAL) as conn:
+        cursor = await conn.execute("""
+            SELECT CASE
+                WHEN NOT pg_is_in_recovery() THEN 0
+                WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+            END AS lag
+        """)
+        row = await cursor.fetchone()
+        await conn.rollback()
+        return float(row["lag"])
+
+# 背景任務：定期檢查副本是否可用、延遲是否在門檻內
+async def _monitor_replica():
+    global _replica_healthy
+    while True:
+        try:
+            lag = await _replica_lag()
+            healthy = lag <= DB_REPLICA_MAX_LAG
+            if not healthy and _replica_healthy:
+                print(f"⚠️ [副本] 延遲 {lag:.1f} 秒超過 {DB_REPLICA_MAX_LAG} 秒，讀取改走主庫")
+        except Exception as e:
+            healthy = False
+            if _replica_healthy:
+                print(f"⚠️ [副本] 無法連線，讀取改走主庫：{e}")
+        if healthy and not _replica_healthy:
+            print("✅ [副本] 副本可用，唯讀查詢改走副本")
+        _replica_healthy = healthy
+        await asyncio.sleep(DB_REPLICA_CHECK_INTERVAL)
+
+# 列表 API 專用的游標：結果列直接是 dict、NUMERIC 讀成 float，
+# 可不經 Python 迴圈轉換直接交給 orjson 序列化（見 utils/json_response.py）
+def _json_cursor(conn):
+    cursor = conn.cursor(row_factory=rows.dict_row)
+    cursor.adapters.register_loader("numeric", FloatLoader)
+    return cursor
+
+# 延遲借出連線的游標：第一次 execute 時才向連線池借連線，commit / rollback 後立即歸還
+# 驗證輸入失敗提早回傳、或等待 await request.json() 時都不會佔用連線
+# fallback_pool：主要連線池借不到連線時改用的連線池（唯讀副本借不到時改走主庫）
+class LazyCursor:
+    def __init__(self, pool, fallback_pool=None):
+        self._pool = pool
+        self._fallback_pool = fallback_pool
+        self._conn = None
+        self._cursor = None
+        self._json_rows = False
+        self._pending = None   # 連線歸還時尚未讀取的結果列
+        self._rowcount = -1
+        self.connection = _LazyConnection(self)
+
+    async def _acquire(self):
+        if self._conn is not None:
+            return
+        if self._fallback_pool is not None:
+            try:
+                self._conn = await self._pool.getconn(timeout=DB_POOL_TIMEOUT / 2)
+                self._cursor = self._conn.cursor()
+                self._json_rows = False
+                return
+            except (PoolTimeout, TooManyRequests):
+                self._pool, self._fallback_pool = self._fallback_pool, None
+        try:
+            self._conn = await self._pool.getconn()
+        except (PoolTimeout, TooManyRequests):
+            print(f"⚠️ [連線池] 連線已用盡（等待 {DB_POOL_TIMEOUT} 秒逾時或排隊已滿），回傳 503")
+            raise PoolExhausted()
+        self._cursor = self._conn.cursor()
+        self._json_rows = False
+
+    # json_rows=True：結果列為 dict 且 NUMERIC 讀成 float，供列表 API 直接序列化
+    async def execute(self, query, params=None, *, json_rows=False):
+        await self._acquire()
+        self._pending = None
+        if json_rows != self._json_rows:
+            await self._cursor.close()
+            self._cursor = _json_cursor(self._conn) if json_rows else self._conn.cursor()
+            self._json_rows = json_rows
+        await self._cursor.execute(query, params)
+        return self
+
+    async def fetchone(self):
+        if self._pending is not None:
+            return self._pending.popleft() if self._pending else None
+        return await self._cursor.fetchone()
+
+    async def fetchmany(self, size=0):
+        if self._pending is not None:
+            size = size or 1
+            return [self._pending.popleft() for _ in range(min(size, len(self._pending)))]
+        return await self._cursor.fetchmany(size)
+
+    async def fetchall(self):
+        if self._pending is not None:
+            rows = list(self._pending)
+            self._pending.clear()
+            return rows
+        return await self._cursor.fetchall()
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount if self._cursor is not None else self._rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description if self._cursor is not None else None
+
+    # 歸還連線（未提交的交易會回滾）；尚未讀取的結果列會先保留，之後仍可 fetch
+    async def release(self):
+        if self._conn is None:
+            return
+        conn, cursor = self._conn, self._cursor
+        self._conn = self._cursor = None
+        try:
+            if cursor.description is not None:
+                self._pending = deque(await cursor.fetchall())
+            self._rowcount = cursor.rowcount
+            await cursor.close()
+        finally:
+            if _in_transaction(conn):
+                try:
+                    await conn.rollback()
+                except Exception as e:
+                    print(f"⚠️ [連線池] 歸還前回滾失敗，連線將被汰換：{e}")
+            await self._pool.putconn(conn)
+
+    async def close(self):
+        await self.release()
+
+# 讓既有的 cursor.connection.commit() 寫法繼續可用：提交後立即歸還連線
+class _LazyConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    async def commit(self):
+        if self._cursor._conn is None:
+            return
+        await self._cursor._conn.commit()
+        await self._cursor.release()
+
+    async def rollback(self):
+        if self._cursor._conn is None:
+            return
+        await self._cursor._conn.rollback()
+        await self._cursor.release()
+
+# 長時間唯讀工作（匯出、分析資料載入）的連線字串：副本健康時連副本，否則連主庫
+def _read_only_conninfo():
+    if replica_pool and _replica_healthy:
+        return _conninfo(host=POSTGRES_REPLICA_HOST, port=os.getenv("POSTGRES_REPLICA_PORT", "5432"))
+    return _conninfo()
+
+# 大量資料匯出用的專用唯讀連線（不從連線池借出，匯出再久也不佔用 API 的連線）
+# 使用完畢需自行 close()
+async def open_read_only_connection():
+    conn = await psycopg.AsyncConnection.connect(_read_only_conninfo())
+    await conn.set_read_only(True)
+    return conn
+
+# 主庫游標：延遲借出連線，離開時歸還
+# 路由以 get_db_cursor 依賴項取得；請求以外的背景工作用 async with db_cursor() as cursor
+@asynccontextmanager
+async def db_cursor():
+    if not async_pool:
+        await init_async_pool()
+    cursor = LazyCursor(async_pool)
     try:
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-        yield conn, cursor
+        yield cursor
+    finally:
+        await cursor.release()
+
+# FastAPI 依賴項：提供延遲借出連線的游標，並確保請求結束時連線被歸還
+# 用法：await cursor.execute(...) / await cursor.fetchone() / await cursor.connection.commit()
+# 只讀查詢結束後可呼叫 await cursor.release() 提早歸還連線
+async def get_db_cursor():
+    async with db_cursor() as cursor:
+        yield cursor
+
+# 唯讀查詢用的游標，副本健康時走副本，否則走主庫
+# 只能用於不寫入、可接受些微延遲的查詢（商品目錄、訂單歷史、後台列表）
+# 路由以 get_read_db_cursor 依賴項取得；請求以外的背景工作用 async with read_db_cursor() as cursor
+@asynccontextmanager
+async def read_db_cursor():
+    if not async_pool:
+        await init_async_pool()
+    if replica_pool and _replica_healthy:
+        cursor = LazyCursor(replica_pool, fallback_pool=async_pool)
+    else:
+        cursor = LazyCursor(async_pool)
+    try:
+        yield cursor
     finally:
-        cursor.close()
-        global_pool.putconn(conn)
\ No newline at end of file
+        await cursor.release()
+
+# FastAPI 依賴項：唯讀查詢用的游標（見 read_db_cursor）
+async def get_read_db_cursor():
+    async with read_db_cursor() as cursor:
+        yield cursor
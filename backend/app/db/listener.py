@@ -0,0 +1,58 @@
+import asyncio
+import psycopg
+from psycopg import sql
+from collections import defaultdict
+from db.db import _conninfo
+
+# PostgreSQL LISTEN/NOTIFY：以一條專用連線（不佔用連線池）接收資料庫通知，
+# 讓每個 Pod 都能在資料變更時清除自己的行程內快取
+_callbacks = defaultdict(list)   # 頻道 -> [callback(payload)]
+_listener_task = None
+
+# 註冊頻道的處理函式（需在 start_listener() 前註冊）
+def register_listener(channel: str, callback):
+    _callbacks[channel].append(callback)
+
+def _dispatch(channel, payload):
+    for callback in _callbacks.get(channel, []):
+        try:
+            callback(payload)
+        except Exception as e:
+            print(f"❌ [LISTEN] 處理 {channel} 通知時發生錯誤：{e}")
+
+async def _listen_forever():
+    delay = 1
+    while True:
+        try:
+            conn = await psycopg.AsyncConnection.connect(_conninfo(), autocommit=True)
+            async with conn:
+                for channel in _callbacks:
+                    await conn.execute(sql.SQL("LISTEN {}").format(sql.Identifier(channel)))
+                print(f"✅ [LISTEN] 已訂閱：{', '.join(_callbacks)}")
+                delay = 1
+                # 斷線期間可能漏掉通知，重新連上後一律視為資料已變更
+                for channel in _callbacks:
+                    _dispatch(channel, None)
+                async for notify in conn.notifies():
+                    _dispatch(notify.channel, notify.payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ [LISTEN] 連線中斷，{delay} 秒後重試：{e}")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 30)
+
+def start_listener():
+    global _listener_task
+    if _listener_task is None and _callbacks:
+        _listener_task = asyncio.create_task(_listen_forever())
+
+async def stop_listener():
+    global _listener_task
+    if _listener_task:
+        _listener_task.cancel()
+        try:
+            await _listener_task
+        except asyncio.CancelledError:
+            pass
+        _listener_task = None
@@ -0,0 +1,297 @@
+import os
+import re
+import sys
+import json
+import argparse
+import psycopg
+from psycopg import sql as pgsql
+from dotenv import load_dotenv
+from db.db import _conninfo
+
+# 資料庫結構版本管理
+# 用法（在 backend/app 目錄下執行）：
+#   python -m db.migrate                 套用所有尚未執行的 migration
+#   python -m db.migrate --status        列出每個 migration 是否已套用
+#   python -m db.migrate --check-plans   檢查熱門查詢的執行計畫，出現 Seq Scan 即回傳非 0
+#   python -m db.migrate --check-plans --seed
+#                                        先在同一個交易中寫入測試資料並 ANALYZE 再檢查，結束後全部回滾
+#                                        （空的開發 / CI 資料庫也能以接近正式環境的統計資訊檢查）
+#   自動測試：TEST_DATABASE_URL=postgresql://... python -m pytest tests/test_query_plans.py
+#                                        對指定的資料庫套用 migration、寫入測試資料後逐一檢查（未設定時略過）
+#
+# migration 檔放在 db/migrations/，檔名為「四位數版本_說明.sql」，依版本順序套用一次
+# 預設整個檔案在同一個交易中執行；第一行為 "-- migrate:no-transaction" 的檔案
+# （例如 CREATE INDEX CONCURRENTLY）改為逐句以 autocommit 執行，每句須以分號結尾
+#   CREATE INDEX CONCURRENTLY 中途失敗會留下 INVALID 的索引，IF NOT EXISTS 重跑時會直接略過；
+#   因此建立前先刪除同名的 INVALID 索引，整個檔案執行完後再確認索引皆有效，否則不記錄為已套用
+# 套用新的 migration 後會自動檢查一次執行計畫（只警告，不影響啟動）
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+NO_TRANSACTION_MARK = "-- migrate:no-transaction"
+MIGRATION_LOCK_ID = 727_001  # pg_advisory_lock 鎖號，避免多個 Pod 同時執行 migration
+CONCURRENT_INDEX = re.compile(
+    r"^CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)", re.IGNORECASE
+)
+PLAN_CHECK_SEED_ROWS = int(os.getenv("PLAN_CHECK_SEED_ROWS", 10000))  # --seed 寫入的訂單筆數
+
+# 熱門查詢：--check-plans 會逐一 EXPLAIN，確保都有索引可用
+HOT_QUERIES = {
+    "顧客訂單歷史": (
+        "SELECT order_id, amount, item_names, status, created_at, paid_at FROM orders "
+        "WHERE customer_id = %s ORDER BY created_at DESC, order_id DESC LIMIT 11",
+        (1,),
+    ),
+    "顧客訂單歷史下一頁": (
+        "SELECT order_id, amount, item_names, status, created_at, paid_at FROM orders "
+        "WHERE customer_id = %s AND (created_at, order_id) < (%s::timestamptz, %s) "
+        "ORDER BY created_at DESC, order_id DESC LIMIT 11",
+        (1, "2025-01-01T00:00:00+00:00", "20250101000000000001"),
+    ),
+    "後台訂單列表": (
+        "SELECT order_id FROM orders WHERE (created_at, order_id) < (%s::timestamptz, %s) "
+        "ORDER BY created_at DESC, order_id DESC LIMIT 51",
+        ("2025-01-01T00:00:00+00:00", "20250101000000000001"),
+    ),
+    "後台訂單依狀態": (
+        "SELECT order_id FROM orders WHERE status = %s "
+        "AND created_at >= %s::date::timestamp AT TIME ZONE 'Asia/Taipei' "
+        "ORDER BY created_at DESC, order_id DESC LIMIT 51",
+        ("success", "2025-01-01"),
+    ),
+    "後台訂單依配送方式": (
+        "SELECT order_id FROM orders WHERE delivery_type = %s ORDER BY created_at DESC, order_id DESC LIMIT 51",
+        ("cvs",),
+    ),
+    "後台訂單依金額": (
+        "SELECT order_id FROM orders WHERE (amount, order_id) > (%s::numeric, %s) "
+        "ORDER BY amount ASC, order_id ASC LIMIT 51",
+        (100, "20250101000000000001"),
+    ),
+    "後台出貨單列表": (
+        "SELECT shipment_id FROM shipments WHERE status = %s AND (created_at, shipment_id) < (%s::timestamptz, %s) "
+        "ORDER BY created_at DESC, shipment_id DESC LIMIT 51",
+        ("shipped", "2025-01-01T00:00:00+00:00", 100),
+    ),
+    "後台客戶列表": (
+        "SELECT customer_id FROM customers WHERE (created_at, customer_id) < (%s::timestamptz, %s) "
+        "ORDER BY created_at DESC, customer_id DESC LIMIT 51",
+        ("2025-01-01T00:00:00+00:00", 100),
+    ),
+    "後台客戶搜尋": (
+        "SELECT customer_id FROM customers WHERE search_vector @@ customer_search_query(%s) "
+        "ORDER BY created_at DESC, customer_id DESC LIMIT 51",
+        ("0912-345",),
+    ),
+    "顧客訂單筆數": ("SELECT COUNT(*) FROM (SELECT 1 FROM orders WHERE customer_id = %s LIMIT 1000) AS capped", (1,)),
+    "單筆訂單": ("SELECT status FROM orders WHERE order_id = %s", ("20250101000000000001",)),
+    "逾時訂單檢查": (
+        "UPDATE orders SET status = 'fail' "
+        "WHERE status = 'pending' AND created_at < NOW() - INTERVAL '20 minutes'",
+        None,
+    ),
+    "商品搜尋": (
+        "SELECT id FROM products, product_search_query(%s) AS q "
+        "WHERE search_vector @@ q ORDER BY ts_rank(search_vector, q) DESC, created_at DESC, id DESC LIMIT 21",
+        ("洗髮精",),
+    ),
+    "商品列表下一頁": (
+        "SELECT id FROM products WHERE (created_at, id) < (%s::timestamptz, %s) "
+        "ORDER BY created_at DESC, id DESC LIMIT 21",
+        ("2025-01-01T00:00:00+00:00", 100),
+    ),
+    "商品分類": (
+        "SELECT id FROM products WHERE string_to_array(category, '#') @> ARRAY[%s]::text[] "
+        "AND (created_at, id) < (%s::timestamptz, %s) "
+        "ORDER BY created_at DESC, id DESC LIMIT 21",
+        ("beauty", "2025-01-01T00:00:00+00:00", 100),
+    ),
+    "儀表板未付款訂單數": ("SELECT SUM(order_count) FROM order_daily_rollup WHERE status = 'pending'", None),
+    "商品銷售明細": ("SELECT order_id, quantity FROM order_items WHERE product_id = %s", (1,)),
+    "訂單出貨單": ("SELECT shipment_id, status FROM shipments WHERE order_id = %s", ("20250101000000000001",)),
+    "會員登入": ("SELECT customer_id FROM customers WHERE username = %s", ("demo",)),
+    "Email 是否已註冊": ("SELECT customer_id FROM customers WHERE email = %s", ("demo@example.com",)),
+    "Email 驗證": ("SELECT customer_id FROM customers WHERE verification_token = %s", ("token",)),
+    "重設密碼": ("SELECT customer_id FROM customers WHERE reset_token = %s", ("token",)),
+}
+
+# 讀取 migrations 目錄，回傳依版本排序的 [(版本, 檔名, SQL)]
+def load_migrations():
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = re.match(r"^(\d{4})_.+\.sql$", filename)
+        if not match:
+            continue
+        with open(os.path.join(MIGRATIONS_DIR, filename), encoding="utf-8") as f:
+            migrations.append((match.group(1), filename, f.read()))
+    return migrations
+
+# 拆成單句（只用於 no-transaction 檔案，不支援含分號的函式內容）
+def split_statements(sql):
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [stmt.strip() for stmt in "\n".join(lines).split(";") if stmt.strip()]
+
+def ensure_migrations_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version     VARCHAR(20) PRIMARY KEY,
+            filename    TEXT NOT NULL,
+            applied_at  TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        )
+    """)
+
+def applied_versions(conn):
+    return {row[0] for row in conn.execute("SELECT version FROM schema_migrations")}
+
+# 目前 schema 中指定名稱、但 INVALID（CONCURRENTLY 建立失敗留下）的索引
+def invalid_indexes(conn, names):
+    return [row[0] for row in conn.execute("""
+        SELECT c.relname
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = ANY(%s)
+          AND c.relnamespace = current_schema()::regnamespace
+          AND NOT i.indisvalid
+    """, (list(names),))]
+
+def drop_invalid_index(conn, name):
+    if invalid_indexes(conn, [name]):
+        print(f"⚠️ [Migration] 索引 {name} 為 INVALID（先前建立失敗），刪除後重建")
+        conn.execute(pgsql.SQL("DROP INDEX CONCURRENTLY IF EXISTS {}").format(pgsql.Identifier(name)))
+
+def apply_migration(conn, version, filename, sql):
+    print(f"[Migration] 套用 {filename} ...")
+    if sql.lstrip().startswith(NO_TRANSACTION_MARK):
+        indexes = []
+        for statement in split_statements(sql):
+            match = CONCURRENT_INDEX.match(statement)
+            if match:
+                indexes.append(match.group(1))
+                drop_invalid_index(conn, match.group(1))
+            conn.execute(statement)
+        invalid = invalid_indexes(conn, indexes)
+        if invalid:
+            raise RuntimeError(f"{filename} 執行後索引仍為 INVALID：{', '.join(invalid)}")
+        conn.execute("INSERT INTO schema_migrations (version, filename) VALUES (%s, %s)", (version, filename))
+    else:
+        with conn.transaction():
+            conn.execute(sql)
+            conn.execute("INSERT INTO schema_migrations (version, filename) VALUES (%s, %s)", (version, filename))
+    print(f"✅ [Migration] {filename} 已套用")
+
+# 套用所有尚未執行的 migration
+def migrate(conninfo=None):
+    with psycopg.connect(conninfo or _conninfo(), autocommit=True) as conn:
+        conn.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+        try:
+            ensure_migrations_table(conn)
+            done = applied_versions(conn)
+            pending = [m for m in load_migrations() if m[0] not in done]
+            if not pending:
+                print("✅ [Migration] 資料庫已是最新版本")
+            for version, filename, sql in pending:
+                apply_migration(conn, version, filename, sql)
+        finally:
+            conn.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+    if pending and not check_plans(conninfo=conninfo):
+        print("⚠️ [Migration] 有熱門查詢出現 Seq Scan，請以 python -m db.migrate --check-plans 確認")
+
+def status():
+    with psycopg.connect(_conninfo(), autocommit=True) as conn:
+        ensure_migrations_table(conn)
+        done = applied_versions(conn)
+    for version, filename, _ in load_migrations():
+        print(f"{'✅' if version in done else '⏳'} {filename}")
+
+def _seq_scans(plan):
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan.get("Relation Name"))
+    for child in plan.get("Plans", []):
+        found.extend(_seq_scans(child))
+    return found
+
+# --seed：寫入顧客、商品、訂單、訂單明細、出貨單測試資料（與既有資料不衝突），並更新統計資訊
+# 在 check_plans 的交易中執行，檢查完畢即回滾；資料需符合正式環境的限制（NOT NULL、CHECK、欄位長度）
+SEED_STATEMENTS = [
+    """
+    INSERT INTO customers (username, email, password, name, phone, address, created_at)
+    SELECT 'plancheck_' || g, 'plancheck_' || g || '@example.com', '-', '測試顧客' || g,
+           '0912-' || lpad(g::text, 6, '0'), '台北市測試路 ' || g || ' 號', NOW() - g * INTERVAL '1 minute'
+    FROM generate_series(1, %(customers)s) AS g
+    """,
+    """
+    INSERT INTO products (name, price, description, image_url, category, created_at)
+    SELECT '日本洗髮精 Shampoo plancheck ' || g, 100 + g %% 500, '測試商品',
+           'https://example.com/plancheck/' || g || '.jpg',
+           (ARRAY['beauty', 'food', 'health', 'beauty#health'])[g %% 4 + 1], NOW() - g * INTERVAL '1 minute'
+    FROM generate_series(1, %(products)s) AS g
+    """,
+    """
+    INSERT INTO orders (order_id, amount, item_names, status, customer_id, delivery_type, created_at, paid_at)
+    SELECT 'plancheck-' || g, 100 + g %% 5000, '日本洗髮精 x 1',
+           (ARRAY['pending', 'success', 'fail', 'shipped'])[g %% 4 + 1],
+           c.customer_id, (ARRAY['home', 'cvs'])[g %% 2 + 1],
+           NOW() - g * INTERVAL '1 minute',
+           CASE WHEN g %% 4 IN (1, 3) THEN NOW() - g * INTERVAL '1 minute' END
+    FROM generate_series(1, %(orders)s) AS g
+    JOIN customers c ON c.username = 'plancheck_' || (g %% %(customers)s + 1)
+    """,
+    """
+    INSERT INTO order_items (order_id, line_no, product_id, product_name, quantity, unit_price)
+    SELECT o.order_id, 1, p.id, p.name, 1, p.price
+    FROM orders o
+    JOIN products p ON p.name = '日本洗髮精 Shampoo plancheck ' || (substr(o.order_id, 11)::int %% %(products)s + 1)
+    WHERE o.order_id LIKE 'plancheck-%%'
+    """,
+    """
+    INSERT INTO shipments (order_id, recipient_name, delivery_type, status, created_at)
+    SELECT order_id, '測試', delivery_type, CASE WHEN status = 'shipped' THEN 'shipped' ELSE 'pending' END, created_at
+    FROM orders
+    WHERE order_id LIKE 'plancheck-%%' AND status IN ('success', 'shipped')
+    """,
+    "ANALYZE customers, products, orders, order_items, shipments, order_daily_rollup, shipment_daily_rollup",
+]
+
+def seed_plan_data(conn, orders=PLAN_CHECK_SEED_ROWS):
+    params = {"orders": orders, "customers": max(orders // 10, 1), "products": max(orders // 20, 1)}
+    for statement in SEED_STATEMENTS:
+        conn.execute(statement, params)
+    print(f"[執行計畫] 已寫入 {orders} 筆測試訂單（檢查後回滾）")
+
+# 回傳查詢執行計畫中出現 Seq Scan 的資料表（呼叫端需先 SET enable_seqscan = off）
+def plan_seq_scans(conn, sql, params):
+    row = conn.execute("EXPLAIN (FORMAT JSON) " + sql, params).fetchone()
+    plan = row[0] if not isinstance(row[0], str) else json.loads(row[0])
+    return _seq_scans(plan[0]["Plan"])
+
+# 檢查熱門查詢的執行計畫；關閉 enable_seqscan 後仍出現 Seq Scan 代表缺少可用的索引
+def check_plans(seed=False, conninfo=None):
+    failed = []
+    with psycopg.connect(conninfo or _conninfo()) as conn:
+        if seed:
+            seed_plan_data(conn)
+        conn.execute("SET enable_seqscan = off")
+        for name, (sql, params) in HOT_QUERIES.items():
+            tables = plan_seq_scans(conn, sql, params)
+            if tables:
+                failed.append(name)
+                print(f"❌ [執行計畫] {name}：{', '.join(tables)} 出現 Seq Scan")
+            else:
+                print(f"✅ [執行計畫] {name}")
+        conn.rollback()
+    return not failed
+
+if __name__ == "__main__":
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="資料庫 migration 工具")
+    parser.add_argument("--status", action="store_true", help="列出 migration 套用狀態")
+    parser.add_argument("--check-plans", action="store_true", help="檢查熱門查詢是否會 Seq Scan")
+    parser.add_argument("--seed", action="store_true", help="搭配 --check-plans：先寫入測試資料（檢查後回滾）")
+    args = parser.parse_args()
+
+    if args.status:
+        status()
+    elif args.check_plans:
+        sys.exit(0 if check_plans(seed=args.seed) else 1)
+    else:
+        migrate()
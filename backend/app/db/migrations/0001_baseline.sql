@@ -0,0 +1,162 @@
+-- 基準資料表結構：與正式環境相同（依 postgres/init.sql 整理為可在 PostgreSQL 執行的語法）
+-- 既有資料庫已有這些資料表，IF NOT EXISTS 讓此檔案可安全套用；新環境則會建立與正式環境一致的結構
+--   欄位型別、NULL 與否、CHECK 條件、外鍵皆照 init.sql（例如金額為 INTEGER、部分 created_at 為可為 NULL 的 TIMESTAMP），
+--   之後的 migration 與程式都以此為準，不要在這裡「修正」型別，需要調整請新增 migration
+--   init.sql 的 MySQL 語法（KEY (...)、重複的 PRIMARY KEY / UNIQUE）已改寫或省略；
+--   建立後又刪除的索引（idx_orders_created_at、idx_orders_status）不建立
+--   orders.order_id 被 shipments / return_logistics 外鍵參照，正式環境必有唯一限制，這裡明確寫出
+
+CREATE TABLE IF NOT EXISTS customers (
+    customer_id         SERIAL NOT NULL,
+    username            VARCHAR(50) NOT NULL,
+    name                VARCHAR(50) NOT NULL,
+    email               VARCHAR(100) NOT NULL,
+    phone               VARCHAR(20) NOT NULL,
+    password            VARCHAR(100) NOT NULL,
+    created_at          TIMESTAMP NULL DEFAULT now(),
+    address             VARCHAR(255) NOT NULL DEFAULT NULL::character varying,
+    is_verified         BOOLEAN NULL DEFAULT false,
+    verification_token  VARCHAR(255) NULL DEFAULT NULL,
+    token_expiry        TIMESTAMPTZ NULL DEFAULT NULL,
+    current_token       VARCHAR(255) NULL DEFAULT NULL,
+    reset_token         VARCHAR(128) NULL DEFAULT NULL,
+    reset_token_expiry  TIMESTAMP NULL DEFAULT NULL,
+    PRIMARY KEY (customer_id),
+    UNIQUE (username)
+);
+
+CREATE TABLE IF NOT EXISTS orders (
+    id               SERIAL NOT NULL,
+    order_id         VARCHAR(50) NOT NULL,
+    amount           INTEGER NOT NULL,
+    item_names       TEXT NOT NULL,
+    status           VARCHAR(20) NOT NULL DEFAULT 'pending',
+    return_reason    TEXT,
+    created_at       TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    paid_at          TIMESTAMP WITH TIME ZONE,
+    updated_at       TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    customer_id      INTEGER NULL DEFAULT NULL,
+    delivery_type    VARCHAR(20) NOT NULL DEFAULT 'home',
+    store_id         VARCHAR(20) NULL,
+    store_name       VARCHAR(100) NULL,
+    cvs_type         VARCHAR(20) NULL,
+    address          VARCHAR(200) NULL,
+    recipient_name   VARCHAR(50) NULL,
+    recipient_phone  VARCHAR(20) NULL,
+    PRIMARY KEY (id),
+    CONSTRAINT orders_order_id_key UNIQUE (order_id),
+    CONSTRAINT orders_customer_id_fkey FOREIGN KEY (customer_id) REFERENCES customers (customer_id) ON UPDATE NO ACTION ON DELETE NO ACTION,
+    CONSTRAINT chk_order_status CHECK (
+        status IN (
+            'pending',            -- 待處理
+            'success',            -- 付款成功
+            'fail',               -- 付款失敗
+            'out_of_stock',       -- 缺貨中
+            'shipped',            -- 已出貨
+            'arrived',            -- 已到店
+            'picked_up',          -- 已取貨
+            'completed',          -- 已完成
+            'return_requested',   -- 退貨申請中
+            'return_processing',  -- 退貨處理中
+            'cancelled'           -- 已取消
+        )
+    )
+);
+
+CREATE INDEX IF NOT EXISTS idx_orders_customer_id ON orders (customer_id);
+CREATE INDEX IF NOT EXISTS idx_orders_order_id ON orders (order_id);
+CREATE INDEX IF NOT EXISTS idx_orders_customer_created ON orders (customer_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_orders_customer_status ON orders (customer_id, status);
+
+CREATE TABLE IF NOT EXISTS products (
+    id           SERIAL NOT NULL,
+    name         TEXT NOT NULL,
+    price        INTEGER NOT NULL,
+    description  TEXT NOT NULL,
+    image_url    TEXT NOT NULL,
+    created_at   TIMESTAMP NULL DEFAULT now(),
+    category     VARCHAR(255) NOT NULL DEFAULT NULL::character varying,  -- 可多分類，以「#」分隔
+    PRIMARY KEY (id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_products_category ON products (category);
+CREATE INDEX IF NOT EXISTS idx_products_created_at ON products (created_at);
+CREATE INDEX IF NOT EXISTS idx_products_search ON products (name, description);
+
+CREATE INDEX IF NOT EXISTS idx_customers_username ON customers (username);
+CREATE INDEX IF NOT EXISTS idx_customers_email ON customers (email);
+
+CREATE TABLE IF NOT EXISTS shipments (
+    shipment_id             SERIAL NOT NULL,
+    order_id                VARCHAR(50) NOT NULL,
+    recipient_name          VARCHAR(50) NOT NULL,
+    delivery_type           VARCHAR(20) NOT NULL DEFAULT 'home',
+    store_id                VARCHAR(20) NULL,
+    store_name              VARCHAR(100) NULL,
+    cvs_type                VARCHAR(20) NULL,
+    address                 VARCHAR(200) NULL,
+    status                  VARCHAR(20) NOT NULL DEFAULT 'pending',
+    created_at              TIMESTAMP NULL DEFAULT now(),
+    updated_at              TIMESTAMP NULL DEFAULT now(),
+    picked_up_at            TIMESTAMP WITH TIME ZONE,
+    return_store_name       VARCHAR(100),
+    return_tracking_number  VARCHAR(50),
+    PRIMARY KEY (shipment_id),
+    CONSTRAINT shipments_order_id_fkey FOREIGN KEY (order_id) REFERENCES orders (order_id) ON UPDATE NO ACTION ON DELETE NO ACTION,
+    CONSTRAINT chk_shipment_status CHECK (
+        status IN (
+            'pending',            -- 待出貨
+            'out_of_stock',       -- 缺貨中
+            'shipped',            -- 已出貨
+            'arrived',            -- 已到店
+            'picked_up',          -- 已取貨
+            'completed',          -- 已完成
+            'return_requested',   -- 退貨申請中
+            'return_processing'   -- 退貨處理中
+        )
+    )
+);
+
+CREATE INDEX IF NOT EXISTS idx_shipments_order_id ON shipments (order_id);
+CREATE INDEX IF NOT EXISTS idx_shipments_status ON shipments (status);
+CREATE INDEX IF NOT EXISTS idx_shipments_created_at ON shipments (created_at);
+
+CREATE TABLE IF NOT EXISTS admin_users (
+    id          SERIAL PRIMARY KEY,
+    username    VARCHAR(50) UNIQUE NOT NULL,
+    password    TEXT NOT NULL,
+    created_at  TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    notes       TEXT NULL DEFAULT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_admin_users_username ON admin_users (username);
+
+CREATE TABLE IF NOT EXISTS cleanup_logs (
+    id                SERIAL NOT NULL,
+    operation         VARCHAR(50) NULL DEFAULT NULL,
+    records_affected  INTEGER NULL DEFAULT NULL,
+    executed_at       TIMESTAMP NULL DEFAULT NULL,
+    PRIMARY KEY (id)
+);
+
+CREATE TABLE IF NOT EXISTS return_logistics (
+    id            SERIAL PRIMARY KEY,
+    order_id      VARCHAR(50) NOT NULL UNIQUE,
+    logistics_id  VARCHAR(50) NOT NULL,
+    store_id      VARCHAR(20) NOT NULL,
+    store_name    VARCHAR(100) NOT NULL,
+    cvs_type      VARCHAR(20) NOT NULL,
+    status        VARCHAR(20) NOT NULL DEFAULT 'created',
+    created_at    TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at    TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT fk_order_id FOREIGN KEY (order_id) REFERENCES orders (order_id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_return_logistics_order_id ON return_logistics (order_id);
+CREATE INDEX IF NOT EXISTS idx_return_logistics_logistics_id ON return_logistics (logistics_id);
+CREATE INDEX IF NOT EXISTS idx_return_logistics_status ON return_logistics (status);
+
+-- init.sql 之後於正式環境加上、既有程式已在使用的欄位
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS payment_message TEXT;        -- 付款結果訊息（routers/pay.py）
+ALTER TABLE shipments ADD COLUMN IF NOT EXISTS delivered_at TIMESTAMPTZ;  -- 到店時間（後台到店 / 自動完成）
+ALTER TABLE admin_users ADD COLUMN IF NOT EXISTS current_token TEXT;      -- 後踢前登入機制
@@ -0,0 +1,26 @@
+-- migrate:no-transaction
+-- 熱門查詢的索引；CONCURRENTLY 建立索引不鎖表，線上資料庫可直接套用
+
+-- 顧客訂單歷史：WHERE customer_id = ? ORDER BY created_at DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_orders_customer_created
+    ON orders (customer_id, created_at DESC);
+
+-- 逾時訂單檢查 (check_pending_orders) 與儀表板未付款統計：WHERE status = ? AND created_at < ?
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_orders_status_created
+    ON orders (status, created_at);
+
+-- 出貨單以訂單編號查詢
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_shipments_order_id
+    ON shipments (order_id);
+
+-- 登入、註冊檢查（索引名稱與 UNIQUE 約束自動建立的索引相同，新環境已存在時會略過）
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS customers_username_key
+    ON customers (username);
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS customers_email_key
+    ON customers (email);
+
+-- Email 驗證與重設密碼連結（大部分顧客沒有 token，用部分索引節省空間）
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_customers_verification_token
+    ON customers (verification_token) WHERE verification_token IS NOT NULL;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_customers_reset_token
+    ON customers (reset_token) WHERE reset_token IS NOT NULL;
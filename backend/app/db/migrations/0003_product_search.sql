@@ -0,0 +1,68 @@
+-- 商品全文搜尋：以 search_vector 取代 name / description 的 ILIKE '%q%' 全表掃描
+-- PostgreSQL 內建斷詞無法處理中日文，這裡自行切詞：
+--   英數字：以連續英數字為一個詞（小寫），查詢時做前綴比對，輸入 "sham" 可找到 "shampoo"
+--   中日文：每個字 (unigram) 加上相鄰兩字 (bigram)，查詢「洗髮精」會比對「洗髮」「髮精」等詞
+
+CREATE OR REPLACE FUNCTION product_search_terms(input TEXT) RETURNS TEXT[]
+LANGUAGE plpgsql IMMUTABLE AS $$
+DECLARE
+    run TEXT;
+    terms TEXT[] := '{}';
+    i INT;
+BEGIN
+    IF input IS NULL OR input = '' THEN
+        RETURN terms;
+    END IF;
+
+    FOR run IN SELECT (regexp_matches(lower(input), '[a-z0-9]+', 'g'))[1] LOOP
+        terms := terms || run;
+    END LOOP;
+
+    -- 平假名、片假名、CJK 統一漢字（含擴充 A、相容漢字）
+    FOR run IN SELECT (regexp_matches(input, '[぀-ヿ㐀-䶿一-鿿豈-﫿]+', 'g'))[1] LOOP
+        FOR i IN 1 .. char_length(run) LOOP
+            terms := terms || substr(run, i, 1);
+            IF i < char_length(run) THEN
+                terms := terms || substr(run, i, 2);
+            END IF;
+        END LOOP;
+    END LOOP;
+
+    RETURN ARRAY(SELECT DISTINCT unnest(terms));
+END
+$$;
+
+-- 商品的搜尋向量：名稱權重 A、描述權重 B
+CREATE OR REPLACE FUNCTION product_search_vector(name TEXT, description TEXT) RETURNS tsvector
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT setweight(array_to_tsvector(product_search_terms(name)), 'A')
+        || setweight(array_to_tsvector(product_search_terms(description)), 'B')
+$$;
+
+-- 使用者輸入轉成 tsquery（所有詞都要符合）；沒有可搜尋的詞時回傳 NULL
+CREATE OR REPLACE FUNCTION product_search_query(input TEXT) RETURNS tsquery
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT string_agg(
+        quote_literal(term) || CASE WHEN term ~ '^[a-z0-9]+$' THEN ':*' ELSE '' END,
+        ' & '
+    )::tsquery
+    FROM unnest(product_search_terms(input)) AS term
+$$;
+
+ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector;
+
+CREATE OR REPLACE FUNCTION products_search_vector_update() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.search_vector := product_search_vector(NEW.name, NEW.description);
+    RETURN NEW;
+END
+$$;
+
+DROP TRIGGER IF EXISTS trg_products_search_vector ON products;
+CREATE TRIGGER trg_products_search_vector
+    BEFORE INSERT OR UPDATE OF name, description ON products
+    FOR EACH ROW EXECUTE FUNCTION products_search_vector_update();
+
+-- 既有商品補上搜尋向量
+UPDATE products SET search_vector = product_search_vector(name, description);
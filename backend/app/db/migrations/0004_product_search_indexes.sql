@@ -0,0 +1,13 @@
+-- migrate:no-transaction
+-- 商品搜尋與分類篩選的索引
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_products_search_vector
+    ON products USING GIN (search_vector);
+
+-- 分類精確篩選，並依上架時間排序
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_products_category_created
+    ON products (category, created_at DESC);
+
+-- 商品列表預設依上架時間排序
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_products_created
+    ON products (created_at DESC);
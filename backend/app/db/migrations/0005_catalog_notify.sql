@@ -0,0 +1,15 @@
+-- 商品資料異動時發出 NOTIFY catalog_changed，各 Pod 的 LISTEN 連線收到後清除行程內商品快取
+-- 以 statement 層級觸發，一次批次更新只發一則通知（同一交易內重複的通知也會被合併）
+
+CREATE OR REPLACE FUNCTION notify_catalog_changed() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_notify('catalog_changed', TG_OP);
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS trg_products_catalog_notify ON products;
+CREATE TRIGGER trg_products_catalog_notify
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON products
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_catalog_changed();
@@ -0,0 +1,12 @@
+-- migrate:no-transaction
+-- 商品列表改為 keyset 分頁，排序加入 id 做為同一時間上架商品的順序依據
+-- 索引需包含 id 才能直接以 (created_at, id) < (...) 定位下一頁
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_products_created_id
+    ON products (created_at DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_products_category_created_id
+    ON products (category, created_at DESC, id DESC);
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_products_created;
+DROP INDEX CONCURRENTLY IF EXISTS idx_products_category_created;
@@ -0,0 +1,41 @@
+-- HTTP 條件式請求 (ETag / Last-Modified) 所需的驗證資訊
+--   catalog_meta：商品目錄版本，商品任何異動都會 +1，做為商品列表的 ETag
+--   products.updated_at / orders.updated_at：單筆資料最後修改時間，做為單一商品與訂單明細的 ETag
+
+CREATE TABLE IF NOT EXISTS catalog_meta (
+    id          BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),  -- 只允許一列
+    version     BIGINT NOT NULL DEFAULT 1,
+    updated_at  TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+INSERT INTO catalog_meta (id) VALUES (TRUE) ON CONFLICT DO NOTHING;
+
+ALTER TABLE products ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW();
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW();
+
+CREATE OR REPLACE FUNCTION touch_updated_at() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.updated_at := NOW();
+    RETURN NEW;
+END
+$$;
+
+DROP TRIGGER IF EXISTS trg_products_touch_updated_at ON products;
+CREATE TRIGGER trg_products_touch_updated_at
+    BEFORE UPDATE ON products
+    FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+
+DROP TRIGGER IF EXISTS trg_orders_touch_updated_at ON orders;
+CREATE TRIGGER trg_orders_touch_updated_at
+    BEFORE UPDATE ON orders
+    FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+
+-- 商品異動時同時遞增目錄版本，並通知各 Pod 清除快取
+CREATE OR REPLACE FUNCTION notify_catalog_changed() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE catalog_meta SET version = version + 1, updated_at = NOW();
+    PERFORM pg_notify('catalog_changed', TG_OP);
+    RETURN NULL;
+END
+$$;
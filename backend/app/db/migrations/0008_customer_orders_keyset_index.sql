@@ -0,0 +1,8 @@
+-- migrate:no-transaction
+-- 顧客訂單歷史改為 keyset 分頁：WHERE customer_id = ? AND (created_at, order_id) < (...)
+-- ORDER BY created_at DESC, order_id DESC，索引加入 order_id 以直接定位下一頁
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_orders_customer_created_order
+    ON orders (customer_id, created_at DESC, order_id DESC);
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_orders_customer_created;
@@ -0,0 +1,20 @@
+-- migrate:no-transaction
+-- 後台訂單列表（keyset 分頁，以 order_id 做為同值時的排序依據）
+--   預設：ORDER BY created_at DESC, order_id DESC
+--   依狀態 / 配送方式篩選後依建立時間排序；依金額排序
+--   依顧客篩選沿用 idx_orders_customer_created_order
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_orders_created_order
+    ON orders (created_at DESC, order_id DESC);
+
+-- 同時取代 idx_orders_status_created（逾時訂單檢查仍可使用）
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_orders_status_created_order
+    ON orders (status, created_at DESC, order_id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_orders_delivery_created_order
+    ON orders (delivery_type, created_at DESC, order_id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_orders_amount_order
+    ON orders (amount DESC, order_id DESC);
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_orders_status_created;
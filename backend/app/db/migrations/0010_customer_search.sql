@@ -0,0 +1,35 @@
+-- 後台客戶搜尋（姓名、Email、電話）：沿用商品搜尋的切詞函式 (0003)，以 search_vector + GIN 索引取代 ILIKE 全表掃描
+--   姓名：中日文 unigram / bigram，英數字為詞
+--   Email：依非英數字切開（demo@example.com → demo、example、com），可前綴比對
+--   電話：只保留數字成為一個詞（0912-345-678 → 0912345678），可前綴比對
+
+CREATE OR REPLACE FUNCTION customer_search_vector(name TEXT, email TEXT, phone TEXT) RETURNS tsvector
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT array_to_tsvector(product_search_terms(
+        coalesce(name, '') || ' ' || coalesce(email, '') || ' ' || regexp_replace(coalesce(phone, ''), '\D', '', 'g')
+    ))
+$$;
+
+-- 搜尋字串轉 tsquery：數字之間的空白與連字號先去掉，讓「0912-345」也能比對到電話
+CREATE OR REPLACE FUNCTION customer_search_query(input TEXT) RETURNS tsquery
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT product_search_query(regexp_replace(input, '(\d)[\s-]+(?=\d)', '\1', 'g'))
+$$;
+
+ALTER TABLE customers ADD COLUMN IF NOT EXISTS search_vector tsvector;
+
+CREATE OR REPLACE FUNCTION customers_search_vector_update() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.search_vector := customer_search_vector(NEW.name, NEW.email, NEW.phone);
+    RETURN NEW;
+END
+$$;
+
+DROP TRIGGER IF EXISTS trg_customers_search_vector ON customers;
+CREATE TRIGGER trg_customers_search_vector
+    BEFORE INSERT OR UPDATE OF name, email, phone ON customers
+    FOR EACH ROW EXECUTE FUNCTION customers_search_vector_update();
+
+-- 既有客戶補上搜尋向量
+UPDATE customers SET search_vector = customer_search_vector(name, email, phone);
@@ -0,0 +1,16 @@
+-- migrate:no-transaction
+-- 後台出貨單、客戶列表改為 keyset 分頁與搜尋所需的索引
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_customers_search_vector
+    ON customers USING GIN (search_vector);
+
+-- 客戶列表：ORDER BY created_at DESC, customer_id DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_customers_created_id
+    ON customers (created_at DESC, customer_id DESC);
+
+-- 出貨單列表：ORDER BY created_at DESC, shipment_id DESC，可依狀態篩選
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_shipments_created_id
+    ON shipments (created_at DESC, shipment_id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_shipments_status_created_id
+    ON shipments (status, created_at DESC, shipment_id DESC);
@@ -0,0 +1,162 @@
+-- 儀表板每日彙總表：依「台灣時間的日期 × 狀態」累計訂單數、金額與出貨單數
+--   由 orders / shipments 上的觸發器在同一交易中遞增 / 遞減，儀表板只需讀取彙總表，
+--   不論累積多少訂單，查詢量只與天數有關
+--   觸發器為 statement 層級（transition table），批次 UPDATE 也只會對每個 (日期, 狀態) 寫入一次
+--   正式環境的 orders / shipments.created_at 可為 NULL：沒有建立時間的資料無法歸到某一天，不計入彙總
+--   （回填與觸發器都略過；之後補上 created_at 時由 UPDATE 觸發器計入）
+
+CREATE TABLE IF NOT EXISTS order_daily_rollup (
+    day           DATE NOT NULL,
+    status        VARCHAR(30) NOT NULL,
+    order_count   BIGINT NOT NULL DEFAULT 0,
+    amount_total  NUMERIC(14,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, status)
+);
+
+CREATE TABLE IF NOT EXISTS shipment_daily_rollup (
+    day             DATE NOT NULL,
+    status          VARCHAR(30) NOT NULL,
+    shipment_count  BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, status)
+);
+
+-- 依狀態加總全部日期用（未付款、未出貨、總營業額）
+CREATE INDEX IF NOT EXISTS idx_order_daily_rollup_status ON order_daily_rollup (status, day);
+CREATE INDEX IF NOT EXISTS idx_shipment_daily_rollup_status ON shipment_daily_rollup (status, day);
+
+-- AT TIME ZONE 依賴 tzdata（時區規則更新可能改變結果），且 shipments.created_at 為 TIMESTAMP，
+-- 傳入時依連線的 TimeZone 轉換，因此宣告為 STABLE（不可用於索引運算式）
+CREATE OR REPLACE FUNCTION rollup_day(ts TIMESTAMPTZ) RETURNS DATE
+LANGUAGE sql STABLE AS $$
+    SELECT (ts AT TIME ZONE 'Asia/Taipei')::date
+$$;
+
+-- 舊資料列記為 -1、新資料列記為 +1，依 (日期, 狀態) 合併後寫入彙總表
+-- 只改到其他欄位（例如 paid_at、updated_at）的 UPDATE 合併後為 0，不會寫入
+-- 依 (日期, 狀態) 排序寫入，避免同時執行的交易以不同順序鎖定而死結
+CREATE OR REPLACE FUNCTION order_rollup_apply() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO order_daily_rollup AS r (day, status, order_count, amount_total)
+        SELECT rollup_day(created_at), status, COUNT(*), SUM(amount)
+        FROM new_rows
+        WHERE created_at IS NOT NULL
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+        ON CONFLICT (day, status) DO UPDATE
+        SET order_count = r.order_count + EXCLUDED.order_count,
+            amount_total = r.amount_total + EXCLUDED.amount_total;
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO order_daily_rollup AS r (day, status, order_count, amount_total)
+        SELECT day, status, SUM(n), SUM(amount)
+        FROM (
+            SELECT rollup_day(created_at) AS day, status, 1 AS n, amount FROM new_rows WHERE created_at IS NOT NULL
+            UNION ALL
+            SELECT rollup_day(created_at), status, -1, -amount FROM old_rows WHERE created_at IS NOT NULL
+        ) AS delta
+        GROUP BY day, status
+        HAVING SUM(n) <> 0 OR SUM(amount) <> 0
+        ORDER BY day, status
+        ON CONFLICT (day, status) DO UPDATE
+        SET order_count = r.order_count + EXCLUDED.order_count,
+            amount_total = r.amount_total + EXCLUDED.amount_total;
+    ELSE
+        INSERT INTO order_daily_rollup AS r (day, status, order_count, amount_total)
+        SELECT rollup_day(created_at), status, -COUNT(*), -SUM(amount)
+        FROM old_rows
+        WHERE created_at IS NOT NULL
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+        ON CONFLICT (day, status) DO UPDATE
+        SET order_count = r.order_count + EXCLUDED.order_count,
+            amount_total = r.amount_total + EXCLUDED.amount_total;
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION shipment_rollup_apply() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO shipment_daily_rollup AS r (day, status, shipment_count)
+        SELECT rollup_day(created_at), status, COUNT(*)
+        FROM new_rows
+        WHERE created_at IS NOT NULL
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+        ON CONFLICT (day, status) DO UPDATE
+        SET shipment_count = r.shipment_count + EXCLUDED.shipment_count;
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO shipment_daily_rollup AS r (day, status, shipment_count)
+        SELECT day, status, SUM(n)
+        FROM (
+            SELECT rollup_day(created_at) AS day, status, 1 AS n FROM new_rows WHERE created_at IS NOT NULL
+            UNION ALL
+            SELECT rollup_day(created_at), status, -1 FROM old_rows WHERE created_at IS NOT NULL
+        ) AS delta
+        GROUP BY day, status
+        HAVING SUM(n) <> 0
+        ORDER BY day, status
+        ON CONFLICT (day, status) DO UPDATE
+        SET shipment_count = r.shipment_count + EXCLUDED.shipment_count;
+    ELSE
+        INSERT INTO shipment_daily_rollup AS r (day, status, shipment_count)
+        SELECT rollup_day(created_at), status, -COUNT(*)
+        FROM old_rows
+        WHERE created_at IS NOT NULL
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+        ON CONFLICT (day, status) DO UPDATE
+        SET shipment_count = r.shipment_count + EXCLUDED.shipment_count;
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+-- transition table 的觸發器只能對應單一事件，因此 INSERT / UPDATE / DELETE 各建一個
+DROP TRIGGER IF EXISTS trg_orders_rollup_insert ON orders;
+CREATE TRIGGER trg_orders_rollup_insert
+    AFTER INSERT ON orders REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION order_rollup_apply();
+
+DROP TRIGGER IF EXISTS trg_orders_rollup_update ON orders;
+CREATE TRIGGER trg_orders_rollup_update
+    AFTER UPDATE ON orders REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION order_rollup_apply();
+
+DROP TRIGGER IF EXISTS trg_orders_rollup_delete ON orders;
+CREATE TRIGGER trg_orders_rollup_delete
+    AFTER DELETE ON orders REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION order_rollup_apply();
+
+DROP TRIGGER IF EXISTS trg_shipments_rollup_insert ON shipments;
+CREATE TRIGGER trg_shipments_rollup_insert
+    AFTER INSERT ON shipments REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION shipment_rollup_apply();
+
+DROP TRIGGER IF EXISTS trg_shipments_rollup_update ON shipments;
+CREATE TRIGGER trg_shipments_rollup_update
+    AFTER UPDATE ON shipments REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION shipment_rollup_apply();
+
+DROP TRIGGER IF EXISTS trg_shipments_rollup_delete ON shipments;
+CREATE TRIGGER trg_shipments_rollup_delete
+    AFTER DELETE ON shipments REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION shipment_rollup_apply();
+
+-- 回填既有資料：建立觸發器已鎖住兩張表的寫入直到本交易結束，回填期間不會漏算或重複計算
+TRUNCATE order_daily_rollup, shipment_daily_rollup;
+
+INSERT INTO order_daily_rollup (day, status, order_count, amount_total)
+SELECT rollup_day(created_at), status, COUNT(*), SUM(amount)
+FROM orders
+WHERE created_at IS NOT NULL
+GROUP BY 1, 2;
+
+INSERT INTO shipment_daily_rollup (day, status, shipment_count)
+SELECT rollup_day(created_at), status, COUNT(*)
+FROM shipments
+WHERE created_at IS NOT NULL
+GROUP BY 1, 2;
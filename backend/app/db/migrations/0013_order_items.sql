@@ -0,0 +1,17 @@
+-- 訂單明細：每筆訂單的每個商品一列，取代只能以字串解析的 orders.item_names
+--   product_id：商品刪除後保留明細，改為 NULL；product_name 保存下單當時的商品名稱
+--   unit_price：下單當時的單價；由 item_names 回填的舊訂單若無法確定單價則為 NULL
+--   舊訂單以 python -m tools.backfill_order_items 分批回填
+
+CREATE TABLE IF NOT EXISTS order_items (
+    order_id      VARCHAR(50) NOT NULL REFERENCES orders(order_id) ON DELETE CASCADE,
+    line_no       SMALLINT NOT NULL,
+    product_id    INTEGER REFERENCES products(id) ON DELETE SET NULL,
+    product_name  VARCHAR(255) NOT NULL,
+    quantity      INTEGER NOT NULL CHECK (quantity > 0),
+    unit_price    NUMERIC(10,2),
+    PRIMARY KEY (order_id, line_no)
+);
+
+-- 單一商品的銷售（各商品銷量、含某商品的訂單）
+CREATE INDEX IF NOT EXISTS idx_order_items_product_order ON order_items (product_id, order_id);
@@ -0,0 +1,14 @@
+-- 退貨物流分成三段：短交易登記退貨物流 → 不持有連線呼叫綠界 → 短交易以 compare-and-set 寫入結果
+--   呼叫綠界期間退貨物流為 pending_external，同一訂單的重複申請會被擋下；
+--   綠界失敗時改為 failed，行程在呼叫期間中斷而逾時未完成的由排程改為 expired
+--   last_error 記錄最後一次失敗原因
+
+ALTER TABLE return_logistics ADD COLUMN IF NOT EXISTS last_error TEXT;
+
+-- 登記 pending_external 時綠界尚未回傳物流編號，logistics_id 要到第三段才寫入（失敗或逾時則一直沒有）
+ALTER TABLE return_logistics ALTER COLUMN logistics_id DROP NOT NULL;
+
+-- 逾時清理只掃描仍在等待綠界的資料
+CREATE INDEX IF NOT EXISTS idx_return_logistics_pending
+    ON return_logistics (updated_at)
+    WHERE status = 'pending_external';
@@ -0,0 +1,24 @@
+-- 綠界付款通知收件匣：/api/ecpay/notify 只做欄位檢查並寫入一筆，立即回應 1|OK
+-- 由背景工作（utils/ecpay_notify.py）分批取出，更新訂單狀態並建立出貨單
+--   processed_at：處理完成時間，NULL 表示尚未處理
+--   attempts / last_error：處理失敗的次數與原因，失敗達上限後不再自動重試
+
+CREATE TABLE IF NOT EXISTS ecpay_inbound_events (
+    id                 BIGSERIAL PRIMARY KEY,
+    merchant_trade_no  VARCHAR(50) NOT NULL,
+    rtn_code           VARCHAR(20) NOT NULL,
+    payload            JSONB NOT NULL,
+    received_at        TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    processed_at       TIMESTAMPTZ,
+    attempts           INTEGER NOT NULL DEFAULT 0,
+    last_error         TEXT
+);
+
+-- 背景工作只掃描尚未處理的通知
+CREATE INDEX IF NOT EXISTS idx_ecpay_inbound_events_unprocessed
+    ON ecpay_inbound_events (id)
+    WHERE processed_at IS NULL;
+
+-- 依訂單查詢收到的通知（客服追查）
+CREATE INDEX IF NOT EXISTS idx_ecpay_inbound_events_trade_no
+    ON ecpay_inbound_events (merchant_trade_no);
@@ -0,0 +1,28 @@
+-- migrate:no-transaction
+-- 付款結算冪等：
+--   ecpay_processed_trades：已處理的綠界交易（TradeNo + RtnCode），重送的相同通知直接略過
+--   shipments.order_id 改為唯一：每筆訂單只會有一張出貨單，重複的付款成功通知以 ON CONFLICT 略過
+-- 先刪除既有的重複出貨單（保留已有進度的那張，都未處理時保留最早建立的），再以 CONCURRENTLY 建立唯一索引
+-- 新版的結算以 ON CONFLICT (order_id) 建立出貨單，需先套用此 migration 再部署
+
+CREATE TABLE IF NOT EXISTS ecpay_processed_trades (
+    trade_no           VARCHAR(20) NOT NULL,
+    rtn_code           VARCHAR(20) NOT NULL,
+    merchant_trade_no  VARCHAR(50) NOT NULL,
+    processed_at       TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (trade_no, rtn_code)
+);
+
+DELETE FROM shipments s
+USING (
+    SELECT shipment_id,
+           ROW_NUMBER() OVER (PARTITION BY order_id ORDER BY status = 'pending', shipment_id) AS rn
+    FROM shipments
+) d
+WHERE s.shipment_id = d.shipment_id AND d.rn > 1;
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_shipments_order_id
+    ON shipments (order_id);
+
+-- 唯一索引已涵蓋以訂單編號查詢出貨單
+DROP INDEX CONCURRENTLY IF EXISTS idx_shipments_order_id;
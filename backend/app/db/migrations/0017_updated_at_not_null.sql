@@ -0,0 +1,14 @@
+-- orders.updated_at 在 0001 建表時允許 NULL；0007 的 ADD COLUMN IF NOT EXISTS 遇到已存在的欄位不會改變定義，
+-- 舊資料庫中的 NULL 會讓訂單明細（與單一商品）的 ETag 無法產生
+--   以 created_at 補上 NULL（created_at 也為 NULL 時用執行 migration 的時間）後設為 NOT NULL；products 一併處理
+--   補值期間停用 touch_updated_at 觸發器，避免所有資料的最後修改時間都變成執行 migration 的時間
+
+ALTER TABLE orders DISABLE TRIGGER trg_orders_touch_updated_at;
+UPDATE orders SET updated_at = COALESCE(updated_at, created_at, NOW()) WHERE updated_at IS NULL;
+ALTER TABLE orders ENABLE TRIGGER trg_orders_touch_updated_at;
+ALTER TABLE orders ALTER COLUMN updated_at SET NOT NULL;
+
+ALTER TABLE products DISABLE TRIGGER trg_products_touch_updated_at;
+UPDATE products SET updated_at = COALESCE(updated_at, created_at, NOW()) WHERE updated_at IS NULL;
+ALTER TABLE products ENABLE TRIGGER trg_products_touch_updated_at;
+ALTER TABLE products ALTER COLUMN updated_at SET NOT NULL;
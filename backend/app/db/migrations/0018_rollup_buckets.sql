@@ -0,0 +1,101 @@
+-- 每日彙總表分桶：0012 的觸發器讓每筆結帳都更新同一列 (今天, 'pending')，
+-- 同時結帳的交易在這一列上排隊，付款通知的批次也會鎖住同一列直到提交
+--   每個 (日期, 狀態) 拆成最多 16 列（bucket），寫入時依連線（pg_backend_pid）選擇 bucket，
+--   不同連線上的交易大多寫到不同列，不再互相等待；同一個 statement 仍只對每個 (日期, 狀態) 寫入一列
+--   讀取時加總所有 bucket（儀表板查詢原本就以 SUM 彙總，不需修改）
+--   既有資料留在 bucket 0；要調整桶數只需重新定義 rollup_bucket()
+
+ALTER TABLE order_daily_rollup ADD COLUMN IF NOT EXISTS bucket SMALLINT NOT NULL DEFAULT 0;
+ALTER TABLE order_daily_rollup DROP CONSTRAINT IF EXISTS order_daily_rollup_pkey;
+ALTER TABLE order_daily_rollup ADD CONSTRAINT order_daily_rollup_pkey PRIMARY KEY (day, status, bucket);
+
+ALTER TABLE shipment_daily_rollup ADD COLUMN IF NOT EXISTS bucket SMALLINT NOT NULL DEFAULT 0;
+ALTER TABLE shipment_daily_rollup DROP CONSTRAINT IF EXISTS shipment_daily_rollup_pkey;
+ALTER TABLE shipment_daily_rollup ADD CONSTRAINT shipment_daily_rollup_pkey PRIMARY KEY (day, status, bucket);
+
+CREATE OR REPLACE FUNCTION rollup_bucket() RETURNS SMALLINT
+LANGUAGE sql STABLE AS $$
+    SELECT (pg_backend_pid() % 16)::smallint
+$$;
+
+-- 與 0012 相同（同樣略過 created_at 為 NULL 的資料），只是寫入這個連線的 bucket
+CREATE OR REPLACE FUNCTION order_rollup_apply() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO order_daily_rollup AS r (day, status, bucket, order_count, amount_total)
+        SELECT rollup_day(created_at), status, rollup_bucket(), COUNT(*), SUM(amount)
+        FROM new_rows
+        WHERE created_at IS NOT NULL
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+        ON CONFLICT (day, status, bucket) DO UPDATE
+        SET order_count = r.order_count + EXCLUDED.order_count,
+            amount_total = r.amount_total + EXCLUDED.amount_total;
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO order_daily_rollup AS r (day, status, bucket, order_count, amount_total)
+        SELECT day, status, rollup_bucket(), SUM(n), SUM(amount)
+        FROM (
+            SELECT rollup_day(created_at) AS day, status, 1 AS n, amount FROM new_rows WHERE created_at IS NOT NULL
+            UNION ALL
+            SELECT rollup_day(created_at), status, -1, -amount FROM old_rows WHERE created_at IS NOT NULL
+        ) AS delta
+        GROUP BY day, status
+        HAVING SUM(n) <> 0 OR SUM(amount) <> 0
+        ORDER BY day, status
+        ON CONFLICT (day, status, bucket) DO UPDATE
+        SET order_count = r.order_count + EXCLUDED.order_count,
+            amount_total = r.amount_total + EXCLUDED.amount_total;
+    ELSE
+        INSERT INTO order_daily_rollup AS r (day, status, bucket, order_count, amount_total)
+        SELECT rollup_day(created_at), status, rollup_bucket(), -COUNT(*), -SUM(amount)
+        FROM old_rows
+        WHERE created_at IS NOT NULL
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+        ON CONFLICT (day, status, bucket) DO UPDATE
+        SET order_count = r.order_count + EXCLUDED.order_count,
+            amount_total = r.amount_total + EXCLUDED.amount_total;
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION shipment_rollup_apply() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO shipment_daily_rollup AS r (day, status, bucket, shipment_count)
+        SELECT rollup_day(created_at), status, rollup_bucket(), COUNT(*)
+        FROM new_rows
+        WHERE created_at IS NOT NULL
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+        ON CONFLICT (day, status, bucket) DO UPDATE
+        SET shipment_count = r.shipment_count + EXCLUDED.shipment_count;
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO shipment_daily_rollup AS r (day, status, bucket, shipment_count)
+        SELECT day, status, rollup_bucket(), SUM(n)
+        FROM (
+            SELECT rollup_day(created_at) AS day, status, 1 AS n FROM new_rows WHERE created_at IS NOT NULL
+            UNION ALL
+            SELECT rollup_day(created_at), status, -1 FROM old_rows WHERE created_at IS NOT NULL
+        ) AS delta
+        GROUP BY day, status
+        HAVING SUM(n) <> 0
+        ORDER BY day, status
+        ON CONFLICT (day, status, bucket) DO UPDATE
+        SET shipment_count = r.shipment_count + EXCLUDED.shipment_count;
+    ELSE
+        INSERT INTO shipment_daily_rollup AS r (day, status, bucket, shipment_count)
+        SELECT rollup_day(created_at), status, rollup_bucket(), -COUNT(*)
+        FROM old_rows
+        WHERE created_at IS NOT NULL
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+        ON CONFLICT (day, status, bucket) DO UPDATE
+        SET shipment_count = r.shipment_count + EXCLUDED.shipment_count;
+    END IF;
+    RETURN NULL;
+END
+$$;
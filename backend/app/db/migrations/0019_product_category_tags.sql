@@ -0,0 +1,10 @@
+-- migrate:no-transaction
+-- 商品分類可多選，以「#」分隔存在 products.category（例如 "beauty#health"）
+-- 分類頁以 string_to_array(category, '#') @> ARRAY[分類] 比對其中一個分類，改用該運算式的 GIN 索引；
+-- 以整個 category 欄位排序的 idx_products_category_created_id 只適用單一分類，刪除
+-- （GIN 索引不支援 = ANY(...)，查詢需寫成 @> 才能使用索引；分類內的排序由 Bitmap 取出後再排序）
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_products_category_tags
+    ON products USING GIN (string_to_array(category, '#'));
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_products_category_created_id;
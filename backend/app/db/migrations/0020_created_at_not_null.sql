@@ -0,0 +1,27 @@
+-- keyset 分頁（商品列表、顧客訂單、後台訂單 / 出貨 / 客戶列表）依 (created_at, id) 排序，
+-- 正式環境的 created_at 允許 NULL：NULL 排在最前面，產生的 next_cursor 帶著 null，
+-- decode_cursor 依型別解析時會拒絕（400），之後的資料就翻不到
+--   補上 NULL 後設為 NOT NULL，分頁查詢不需要 COALESCE，仍可使用 (created_at, id) 索引
+--   補值：訂單用付款時間或最後修改時間，商品用最後修改時間，出貨單用所屬訂單的付款時間（付款成功時建立）或建立時間，
+--   都沒有時用執行 migration 的時間
+--   補值期間停用 touch_updated_at 觸發器（同 0017）；每日彙總的 UPDATE 觸發器保持啟用，
+--   補上 created_at 的訂單與出貨單會在這時計入彙總（0012 略過 created_at 為 NULL 的資料）
+--   程式寫入時都會帶 created_at（或使用預設值），不受 NOT NULL 影響
+
+ALTER TABLE orders DISABLE TRIGGER trg_orders_touch_updated_at;
+UPDATE orders SET created_at = COALESCE(paid_at, updated_at, NOW()) WHERE created_at IS NULL;
+ALTER TABLE orders ENABLE TRIGGER trg_orders_touch_updated_at;
+ALTER TABLE orders ALTER COLUMN created_at SET NOT NULL;
+
+ALTER TABLE products DISABLE TRIGGER trg_products_touch_updated_at;
+UPDATE products SET created_at = COALESCE(updated_at, NOW()) WHERE created_at IS NULL;
+ALTER TABLE products ENABLE TRIGGER trg_products_touch_updated_at;
+ALTER TABLE products ALTER COLUMN created_at SET NOT NULL;
+
+UPDATE shipments s SET created_at = COALESCE(o.paid_at, o.created_at)
+FROM orders o
+WHERE o.order_id = s.order_id AND s.created_at IS NULL;
+ALTER TABLE shipments ALTER COLUMN created_at SET NOT NULL;
+
+UPDATE customers SET created_at = NOW() WHERE created_at IS NULL;
+ALTER TABLE customers ALTER COLUMN created_at SET NOT NULL;
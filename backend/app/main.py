@@ -3,7 +3,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.requests import Request
 from fastapi.responses import JSONResponse, HTMLResponse
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
-from psycopg2 import errors
+from psycopg import errors
 from datetime import datetime, timedelta
 from routers import customers, verify, pay, orders, admin
 from pydantic import BaseModel
@@ -20,7 +20,15 @@ import pytz
 app = FastAPI()
 
 #DB
-from db.db import get_db_cursor
+from db.db import get_db_cursor, init_async_pool, close_async_pool
+from db.listener import register_listener, start_listener, stop_listener
+from utils.cache import catalog_cache, clear_catalog_caches, dashboard_cache, DASHBOARD_CACHE_REFRESH_INTERVAL
+from utils.analytics import start_analytics, stop_analytics
+from utils.ecpay_client import close_ecpay_client
+from utils.ecpay_notify import wake_notify_worker, start_notify_worker, stop_notify_worker
+from utils.pagination import decode_cursor, paginate
+from utils.http_cache import conditional_response
+from utils.json_response import render_json
 
 #CORS 設定
 from middleware import setup_cors
@@ -45,6 +53,30 @@ app.include_router(orders.router)
 # 引入後台 API 路由
 app.include_router(admin.router)
 
+# 商品變更時（任何 Pod 的後台操作）資料庫會發出 NOTIFY catalog_changed，清除本 Pod 的商品快取
+register_listener("catalog_changed", lambda payload: clear_catalog_caches())
+register_listener("dashboard_changed", lambda payload: dashboard_cache.clear())
+# 綠界付款通知寫入收件匣時（任何 Pod）喚醒本 Pod 的付款通知背景工作
+register_listener("ecpay_inbound", wake_notify_worker)
+
+# 啟動時建立非同步連線池、LISTEN 連線、儀表板快取與銷售分析資料的背景重新載入、付款通知背景工作，關閉時釋放
+@app.on_event("startup")
+async def startup():
+    await init_async_pool()
+    start_listener()
+    dashboard_cache.start_refresh(DASHBOARD_CACHE_REFRESH_INTERVAL)
+    start_analytics()
+    start_notify_worker()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await stop_notify_worker()
+    await stop_analytics()
+    await dashboard_cache.stop_refresh()
+    await close_ecpay_client()
+    await stop_listener()
+    await close_async_pool()
+
 #測試API是否正常
 @app.get("/health")
 async def health():
@@ -54,7 +86,7 @@ async def health():
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     print(f"❌ 全域例外錯誤: {exc}")
-    # 若為 psycopg2 的特定資料庫錯誤，給前端更明確提示
+    # 若為 psycopg 的特定資料庫錯誤，給前端更明確提示
     if isinstance(exc, errors.StringDataRightTruncation):
         return JSONResponse({"error": "❌ 文字長度超過限制！"}, status_code=400)
     if isinstance(exc, errors.UniqueViolation):
@@ -65,60 +97,122 @@ async def global_exception_handler(request: Request, exc: Exception):
         content={"error": "❌ 伺服器錯誤，請稍後再試！"}
     )
 
-# 取得所有商品
+# 商品列表每頁筆數（預設值與上限）
+PRODUCTS_PAGE_SIZE = int(os.getenv("PRODUCTS_PAGE_SIZE", 20))
+PRODUCTS_PAGE_MAX = int(os.getenv("PRODUCTS_PAGE_MAX", 100))
+
+# 取得商品列表（keyset 分頁）
+# query：全文搜尋（search_vector，支援中日文），依相關度排序；category：分類篩選（多分類商品符合其中之一即列出）
+# 排序固定為 (created_at, id) 由新到舊，搜尋時前面再加上相關度；
+# 回應的 next_cursor 帶回 cursor 參數即可取得下一頁，為 null 表示沒有下一頁
+# 結果放在商品快取（catalog_cache），同樣的條件在 TTL 內不再查詢資料庫
+# ETag 為商品目錄版本（catalog_meta.version），任何商品異動都會改變
+# 快取未命中時從主庫讀取：收到 catalog_changed 清除快取後若改讀落後的唯讀副本，
+# 舊資料與舊 ETag 會被放回共用快取直到 TTL 到期（命中快取時不會借用連線）
 @app.get("/api/products")
-async def get_products(query: str = "", category: str = "", cursor=Depends(get_db_cursor)):
-    sql_query = "SELECT id, name, price, description, image_url, created_at, category FROM products"
-    params = []
-    conditions = []
-
-    if query:
-        conditions.append("(name ILIKE %s OR description ILIKE %s)")
-        params.extend([f"%{query}%", f"%{query}%"])
-
-    if category:
-        conditions.append("category ILIKE %s")
-        params.append(f"%{category}%")
-
-    if conditions:
-        sql_query += " WHERE " + " AND ".join(conditions)
-    
-    sql_query += " ORDER BY created_at DESC"
+async def get_products(
+    request: Request,
+    query: str = "",
+    category: str = "",
+    limit: int = Query(PRODUCTS_PAGE_SIZE, ge=1, le=PRODUCTS_PAGE_MAX),
+    page_cursor: str = Query("", alias="cursor"),
+    cursor=Depends(get_db_cursor)
+):
+    async def load():
+        # 先讀版本再讀資料：兩者之間若有商品異動，資料只會比版本新，下次請求版本不同就會重新取得
+        await cursor.execute("SELECT version, updated_at FROM catalog_meta")
+        meta = await cursor.fetchone()
+
+        sql_query = "SELECT id, name, price, description, image_url, created_at, category"
+        params = []
+        conditions = []
+
+        if query:
+            sql_query += ", ts_rank(search_vector, q) AS rank FROM products, product_search_query(%s) AS q"
+            params.append(query)
+            conditions.append("search_vector @@ q")
+            sort_columns = "ts_rank(search_vector, q), created_at, id"
+            sort_params = "%s::real, %s::timestamptz, %s"
+            order_by = "ts_rank(search_vector, q) DESC, created_at DESC, id DESC"
+        else:
+            sql_query += " FROM products"
+            sort_columns = "created_at, id"
+            sort_params = "%s::timestamptz, %s"
+            order_by = "created_at DESC, id DESC"
+
+        if category:
+            # 商品可有多個分類（以「#」分隔），符合其中之一即列出；寫成 @> 才能使用 GIN 索引 (0019)
+            conditions.append("string_to_array(category, '#') @> ARRAY[%s]::text[]")
+            params.append(category)
+
+        if page_cursor:
+            conditions.append(f"({sort_columns}) < ({sort_params})")
+            params.extend(decode_cursor(page_cursor, ("number", "timestamp", "int") if query else ("timestamp", "int")))
+
+        if conditions:
+            sql_query += " WHERE " + " AND ".join(conditions)
+
+        sql_query += f" ORDER BY {order_by} LIMIT %s"
+        params.append(limit + 1)
+
+        await cursor.execute(sql_query, tuple(params))
+        rows, next_cursor = paginate(
+            await cursor.fetchall(), limit,
+            key=lambda row: (row["rank"], row["created_at"], row["id"]) if query else (row["created_at"], row["id"])
+        )
+        return {
+            "body": render_json({"products": [row[:7] for row in rows], "next_cursor": next_cursor}),
+            "etag": f'"catalog-{meta["version"]}"',
+            "last_modified": meta["updated_at"],
+        }
 
-    cursor.execute(sql_query, tuple(params))
-    
-    products = cursor.fetchall()
-    return products
+    entry = await catalog_cache.get_or_load(("products", query, category, limit, page_cursor), load)
+    return conditional_response(request, **entry)
 
 # 取得單一商品 (根據 ID)
+# ETag / Last-Modified 依商品的 updated_at，其他商品異動不影響
+# 與商品列表相同，快取未命中時從主庫讀取
 @app.get("/api/products/{product_id}")
-async def get_product_by_id(product_id: int, cursor=Depends(get_db_cursor)):
-    try:
-        cursor.execute(
+async def get_product_by_id(product_id: int, request: Request, cursor=Depends(get_db_cursor)):
+    async def load():
+        await cursor.execute(
             """
-            SELECT id, name, price, description, image_url, created_at, category
+            SELECT id, name, price, description, image_url, created_at, category,
+                   COALESCE(updated_at, created_at) AS updated_at
             FROM products
             WHERE id = %s
             """,
             (product_id,)
         )
-        product = cursor.fetchone()
-
-        if product:
-            # 將查詢結果轉換為字典以便 JSON 序列化
-            product_dict = {
-                "id": product[0],
-                "name": product[1],
-                "price": float(product[2]), # 確保價格是數字類型
-                "description": product[3],
-                "image_url": product[4],
-                "created_at": product[5].isoformat() if product[5] else None, # 轉換日期時間格式
-                "category": product[6]
-            }
-            return JSONResponse(product_dict)
+        product = await cursor.fetchone()
+        if not product:
+            return None  # 不存在的商品也快取，避免重複查詢
+        # 將查詢結果轉換為字典以便 JSON 序列化
+        product_dict = {
+            "id": product[0],
+            "name": product[1],
+            "price": float(product[2]), # 確保價格是數字類型
+            "description": product[3],
+            "image_url": product[4],
+            "created_at": product[5].isoformat() if product[5] else None, # 轉換日期時間格式
+            "category": product[6]
+        }
+        return {
+            "body": render_json(product_dict),
+            "etag": f'"product-{product[0]}-{int(product[7].timestamp() * 1_000_000)}"',
+            "last_modified": product[7],
+        }
+
+    try:
+        entry = await catalog_cache.get_or_load(("product", product_id), load)
+
+        if entry:
+            return conditional_response(request, **entry)
         else:
             raise HTTPException(status_code=404, detail="Product not found")
 
+    except HTTPException as e:
+        raise e
     except Exception as e:
         print(f"❌ 後端查詢單一商品錯誤 (ID: {product_id})：{str(e)}")
-        raise HTTPException(status_code=500, detail="Internal server error")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Internal server error")
@@ -1,11 +1,18 @@
 from fastapi import APIRouter, Request, Depends
 from fastapi.responses import JSONResponse
-from db.db import get_db_cursor
+from db.db import get_db_cursor, get_read_db_cursor, read_db_cursor
+from utils.cache import clear_catalog_caches, dashboard_cache
+from utils.json_response import FastJSONResponse
+from utils.pagination import decode_cursor, paginate
+from utils.export import streaming_export
+from utils import analytics
 from config import verify_admin_jwt, JWT_SECRET_KEY, JWT_ALGORITHM
 from fastapi import Query, HTTPException
-from psycopg2 import errors
+from psycopg import errors
 from pydantic import BaseModel
-from datetime import datetime, timedelta
+from typing import Optional
+from datetime import datetime, timedelta, timezone, date
+import os
 import random
 import bcrypt
 import uuid
@@ -15,59 +22,157 @@ router = APIRouter()
 
 # 後台載入商品資料
 @router.get("/api/admin/products")
-async def admin_get_products(auth=Depends(verify_admin_jwt), cursor=Depends(get_db_cursor)):
+async def admin_get_products(auth=Depends(verify_admin_jwt), cursor=Depends(get_read_db_cursor)):
     try:
-        cursor.execute("""
+        await cursor.execute("""
             SELECT id, name, price, description, image_url, created_at, category
             FROM products
             ORDER BY created_at DESC
-        """)
-
-        products = []
-        for row in cursor.fetchall():
-             products.append({
-                "id": row[0],
-                "name": row[1],
-                "price": float(row[2]),
-                "description": row[3],
-                "image_url": row[4],
-                "created_at": row[5].isoformat() if row[5] else None,
-                "category": row[6]
-            })
-        
-        return JSONResponse(products)
+        """, json_rows=True)
+        return FastJSONResponse(await cursor.fetchall())
 
+    except HTTPException as e:
+        raise e
     except Exception as e:
         print("❌ 後台載入商品資料錯誤：", str(e))
         return JSONResponse({"error": "無法載入商品資料"}, status_code=500)
     
-# 後台取得訂單資料
+# 後台列表每頁筆數（預設值與上限）
+ADMIN_LIST_PAGE_SIZE = int(os.getenv("ADMIN_LIST_PAGE_SIZE", 50))
+ADMIN_LIST_PAGE_MAX = int(os.getenv("ADMIN_LIST_PAGE_MAX", 200))
+
+# created_at 的日期區間條件（台灣時間的日期，含迄日當天）
+def _date_range(conditions, params, date_from, date_to):
+    if date_from:
+        conditions.append("created_at >= %s::date::timestamp AT TIME ZONE 'Asia/Taipei'")
+        params.append(date_from)
+    if date_to:
+        conditions.append("created_at < (%s::date + 1)::timestamp AT TIME ZONE 'Asia/Taipei'")
+        params.append(date_to)
+
+# 後台訂單可排序的欄位（白名單）：API 參數 → (資料表欄位, SQL 型別, 游標欄位型別)
+# 皆為 NOT NULL 欄位，搭配 order_id 做為同值時的排序依據
+ADMIN_ORDER_SORTS = {
+    "created_at": ("created_at", "timestamptz", "timestamp"),
+    "amount": ("amount", "numeric", "number"),
+}
+
+# 後台取得訂單資料（keyset 分頁）
+# 篩選：status、delivery_type、customer_id、date_from / date_to（台灣時間的日期，含當日）
+# 排序：sort=created_at|amount、order=desc|asc；next_cursor 帶回 cursor 參數取得下一頁
 @router.get("/api/admin/orders")
-async def admin_get_orders(auth=Depends(verify_admin_jwt), cursor=Depends(get_db_cursor)):
+async def admin_get_orders(
+    status: str = "",
+    delivery_type: str = "",
+    customer_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    sort: str = "created_at",
+    order: str = "desc",
+    limit: int = Query(ADMIN_LIST_PAGE_SIZE, ge=1, le=ADMIN_LIST_PAGE_MAX),
+    page_cursor: str = Query("", alias="cursor"),
+    auth=Depends(verify_admin_jwt),
+    cursor=Depends(get_read_db_cursor)
+):
+    if sort not in ADMIN_ORDER_SORTS or order not in ("asc", "desc"):
+        return JSONResponse({"error": "無效的排序方式"}, status_code=400)
+    column, cast, cursor_type = ADMIN_ORDER_SORTS[sort]
+
     try:
-        cursor.execute("SELECT id, order_id, amount, item_names, status, created_at, paid_at FROM orders ORDER BY created_at DESC")
-        rows = cursor.fetchall()
-
-        # 手動構建字典列表並格式化 datetime 欄位
-        formatted_orders = []
-        for row in rows:
-            order_dict = {
-                "id": row[0],
-                "order_id": row[1],
-                "amount": row[2],
-                "item_names": row[3],
-                "status": row[4],
-                "created_at": row[5].isoformat() if row[5] else None, # 格式化 datetime
-                "paid_at": row[6].isoformat() if row[6] else None    # 格式化 datetime
-            }
-            formatted_orders.append(order_dict)
-
-        return JSONResponse(formatted_orders)
+        conditions = []
+        params = []
+        if status:
+            conditions.append("status = %s")
+            params.append(status)
+        if delivery_type:
+            conditions.append("delivery_type = %s")
+            params.append(delivery_type)
+        if customer_id is not None:
+            conditions.append("customer_id = %s")
+            params.append(customer_id)
+        _date_range(conditions, params, date_from, date_to)
+        if page_cursor:
+            # 游標記錄產生時的排序方式，換了排序就不能沿用
+            cursor_sort, sort_value, last_order_id = decode_cursor(page_cursor, ("str", cursor_type, "str"))
+            if cursor_sort != f"{sort}:{order}":
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            conditions.append(f"({column}, order_id) {'<' if order == 'desc' else '>'} (%s::{cast}, %s)")
+            params.extend([sort_value, last_order_id])
+
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        direction = order.upper()
+        await cursor.execute(
+            f"""
+            SELECT id, order_id, amount, item_names, status, created_at, paid_at, customer_id, delivery_type
+            FROM orders{where}
+            ORDER BY {column} {direction}, order_id {direction}
+            LIMIT %s
+            """,
+            (*params, limit + 1),
+            json_rows=True
+        )
+        orders, next_cursor = paginate(
+            await cursor.fetchall(), limit,
+            key=lambda row: (f"{sort}:{order}", row[column], row["order_id"])
+        )
+        return FastJSONResponse({"orders": orders, "next_cursor": next_cursor})
 
+    except HTTPException as e:
+        raise e
     except Exception as e:
         print(f"❌ 後端查詢訂單錯誤： {e}")
         return JSONResponse({"error": "內部伺服器錯誤"}, status_code=500)
     
+# 匯出欄位
+ORDER_EXPORT_COLUMNS = [
+    "order_id", "amount", "item_names", "status", "created_at", "paid_at", "customer_id",
+    "delivery_type", "store_id", "store_name", "cvs_type", "address", "recipient_name", "recipient_phone",
+]
+SHIPMENT_EXPORT_COLUMNS = [
+    "shipment_id", "order_id", "recipient_name", "delivery_type", "store_id", "store_name", "cvs_type",
+    "address", "status", "created_at", "delivered_at", "picked_up_at", "return_store_name", "return_tracking_number",
+]
+
+# 後台匯出訂單（會計用）：format=csv|ndjson，依建立時間由舊到新串流輸出
+@router.get("/api/admin/export/orders")
+async def admin_export_orders(
+    format: str = "csv",
+    status: str = "",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    auth=Depends(verify_admin_jwt)
+):
+    conditions = []
+    params = []
+    if status:
+        conditions.append("status = %s")
+        params.append(status)
+    _date_range(conditions, params, date_from, date_to)
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    query = f"SELECT {', '.join(ORDER_EXPORT_COLUMNS)} FROM orders{where} ORDER BY created_at, order_id"
+    print(f"📤 [匯出] 訂單 format={format} status={status or '全部'} 期間={date_from}~{date_to}")
+    return streaming_export(query, params, format, ORDER_EXPORT_COLUMNS, f"orders_{datetime.now():%Y%m%d}")
+
+# 後台匯出出貨單：format=csv|ndjson，依建立時間由舊到新串流輸出
+@router.get("/api/admin/export/shipments")
+async def admin_export_shipments(
+    format: str = "csv",
+    status: str = "",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    auth=Depends(verify_admin_jwt)
+):
+    conditions = []
+    params = []
+    if status:
+        conditions.append("status = %s")
+        params.append(status)
+    _date_range(conditions, params, date_from, date_to)
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    query = f"SELECT {', '.join(SHIPMENT_EXPORT_COLUMNS)} FROM shipments{where} ORDER BY created_at, shipment_id"
+    print(f"📤 [匯出] 出貨單 format={format} status={status or '全部'} 期間={date_from}~{date_to}")
+    return streaming_export(query, params, format, SHIPMENT_EXPORT_COLUMNS, f"shipments_{datetime.now():%Y%m%d}")
+
 # 後台更新訂單狀態
 @router.post("/api/admin/update_order_status")
 async def update_order_status(request: Request, auth=Depends(verify_admin_jwt), cursor=Depends(get_db_cursor)):
@@ -82,13 +187,13 @@ async def update_order_status(request: Request, auth=Depends(verify_admin_jwt),
         if new_status not in ["pending", "success", "fail"]:
             return JSONResponse({"error": "無效的訂單狀態"}, status_code=400)
 
-        cursor.execute("SELECT status FROM orders WHERE order_id=%s", (order_id,))
-        order = cursor.fetchone()
+        await cursor.execute("SELECT status FROM orders WHERE order_id=%s", (order_id,))
+        order = await cursor.fetchone()
         
         if not order:
             return JSONResponse({"error": "找不到訂單"}, status_code=404)
 
-        cursor.execute("""
+        await cursor.execute("""
             UPDATE orders 
             SET status=%s, 
                 paid_at=CASE 
@@ -97,11 +202,15 @@ async def update_order_status(request: Request, auth=Depends(verify_admin_jwt),
                 END 
             WHERE order_id=%s
         """, (new_status, new_status, order_id))
+        await cursor.execute("SELECT pg_notify('dashboard_changed', %s)", (order_id,))  # 提交後通知各 Pod 清除儀表板快取
         
-        cursor.connection.commit()
+        await cursor.connection.commit()
+        dashboard_cache.clear()
 
         return JSONResponse({"message": "訂單狀態更新成功"})
 
+    except HTTPException as e:
+        raise e
     except Exception as e:
         print("❌ 更新訂單狀態錯誤：", str(e))
         return JSONResponse({"error": "更新訂單狀態失敗"}, status_code=500)
@@ -122,15 +231,18 @@ async def admin_add_product(request: Request, auth=Depends(verify_admin_jwt), cu
         return JSONResponse({"error": "❌ 商品名稱與價格為必填！"}, status_code=400)
 
     try:
-        cursor.execute("""
+        await cursor.execute("""
             INSERT INTO products (name, price, description, image_url, category)
             VALUES (%s, %s, %s, %s, %s)
         """, (name, price, description, image_url, category))
-        cursor.connection.commit()
+        await cursor.connection.commit()
+        clear_catalog_caches()
         return JSONResponse({"message": "✅ 商品已新增"})
     except errors.StringDataRightTruncation as e:
         # 資料過長
         return JSONResponse({"error": "❌ 文字長度超過限制，請修改再送出！"}, status_code=400)
+    except HTTPException as e:
+        raise e
     except Exception as e:
         print("❌ 新增商品時出錯：", e)
         return JSONResponse({"error": "❌ 新增商品失敗，請稍後再試！"}, status_code=500)
@@ -145,33 +257,69 @@ async def admin_update_product(id: int, request: Request, auth=Depends(verify_ad
     image_url = data.get("image_url", "")
     category = data.get("category", "")
 
-    cursor.execute("""
+    await cursor.execute("""
         UPDATE products
         SET name=%s, price=%s, description=%s, image_url=%s, category=%s
         WHERE id=%s
     """, (name, price, description, image_url, category, id))
-    cursor.connection.commit()
+    await cursor.connection.commit()
+    clear_catalog_caches()
     return JSONResponse({"message": "商品已更新"})
 
 #後台刪除商品
 @router.delete("/api/admin/products/{id}")
 async def admin_delete_product(id: int, auth=Depends(verify_admin_jwt), cursor=Depends(get_db_cursor)):
-    cursor.execute("DELETE FROM products WHERE id=%s", (id,))
-    cursor.connection.commit()
+    await cursor.execute("DELETE FROM products WHERE id=%s", (id,))
+    await cursor.connection.commit()
+    clear_catalog_caches()
     return JSONResponse({"message": "商品已刪除"})
 
-# 後台出貨管理
+# 後台出貨管理（keyset 分頁，依建立時間由新到舊）
+# 篩選：status、order_id；next_cursor 帶回 cursor 參數取得下一頁
 @router.get("/api/admin/shipments")
-async def admin_get_shipments(auth=Depends(verify_admin_jwt), cursor=Depends(get_db_cursor)):
-    print("🚚 準備查詢出貨資料")
+async def admin_get_shipments(
+    status: str = "",
+    order_id: str = "",
+    limit: int = Query(ADMIN_LIST_PAGE_SIZE, ge=1, le=ADMIN_LIST_PAGE_MAX),
+    page_cursor: str = Query("", alias="cursor"),
+    auth=Depends(verify_admin_jwt),
+    cursor=Depends(get_read_db_cursor)
+):
     try:
-        cursor.execute("SELECT shipment_id, order_id, recipient_name, address, status, created_at, return_store_name, return_tracking_number FROM shipments ORDER BY created_at DESC")
-        rows = cursor.fetchall()
-        print("✅ 查詢結果：", rows)
+        conditions = []
+        params = []
+        if status:
+            conditions.append("status = %s")
+            params.append(status)
+        if order_id:
+            conditions.append("order_id = %s")
+            params.append(order_id)
+        if page_cursor:
+            conditions.append("(created_at, shipment_id) < (%s::timestamptz, %s)")
+            params.extend(decode_cursor(page_cursor, ("timestamp", "int")))
+
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        await cursor.execute(
+            f"""
+            SELECT shipment_id, order_id, recipient_name, address, status, created_at, return_store_name, return_tracking_number
+            FROM shipments{where}
+            ORDER BY created_at DESC, shipment_id DESC
+            LIMIT %s
+            """,
+            (*params, limit + 1),
+            json_rows=True
+        )
+        shipments, next_cursor = paginate(
+            await cursor.fetchall(), limit, key=lambda row: (row["created_at"], row["shipment_id"])
+        )
+        print(f"🚚 查詢出貨資料：{len(shipments)} 筆")
+        return FastJSONResponse({"shipments": shipments, "next_cursor": next_cursor})
+
+    except HTTPException as e:
+        raise e
     except Exception as e:
-        print("❌ 出錯：", e)
-    shipments = [{"shipment_id": r[0], "order_id": r[1], "recipient_name": r[2], "address": r[3], "status": r[4], "created_at": str(r[5]), "return_store_name": r[6], "return_tracking_number": r[7]} for r in rows]
-    return JSONResponse(shipments)
+        print("❌ 查詢出貨資料錯誤：", e)
+        return JSONResponse({"error": "無法載入出貨資料"}, status_code=500)
 
 # 更新出貨單資料
 @router.post("/api/admin/update_shipment")
@@ -185,30 +333,54 @@ async def admin_update_shipment(request: Request, auth=Depends(verify_admin_jwt)
     if not shipment_id or not recipient_name or not address or not status_:
         return JSONResponse({"error": "❌ 缺少必要欄位"}, status_code=400)
 
-    cursor.execute("""
+    await cursor.execute("""
         UPDATE shipments SET recipient_name=%s, address=%s, status=%s
         WHERE shipment_id=%s
     """, (recipient_name, address, status_, shipment_id))
-    cursor.connection.commit()
+    await cursor.connection.commit()
     return JSONResponse({"message": "✅ 出貨資料已更新！"})
 
-#後台客戶管理
+#後台客戶管理（keyset 分頁，依註冊時間由新到舊）
+# q：搜尋姓名、Email、電話（search_vector，支援中日文與前綴比對）
 @router.get("/api/admin/customers")
-async def admin_get_customers(auth=Depends(verify_admin_jwt), cursor=Depends(get_db_cursor)):
-    cursor.execute("SELECT customer_id, name, email, phone, address, created_at FROM customers ORDER BY created_at DESC")
-    rows = cursor.fetchall()
-    customers = [
-        {
-            "customer_id": r[0],
-            "name": r[1],
-            "email": r[2],
-            "phone": r[3],
-            "address": r[4],
-            "created_at": str(r[5])
-        }
-        for r in rows
-    ]
-    return JSONResponse(customers)
+async def admin_get_customers(
+    q: str = "",
+    limit: int = Query(ADMIN_LIST_PAGE_SIZE, ge=1, le=ADMIN_LIST_PAGE_MAX),
+    page_cursor: str = Query("", alias="cursor"),
+    auth=Depends(verify_admin_jwt),
+    cursor=Depends(get_read_db_cursor)
+):
+    try:
+        conditions = []
+        params = []
+        if q.strip():
+            conditions.append("search_vector @@ customer_search_query(%s)")
+            params.append(q)
+        if page_cursor:
+            conditions.append("(created_at, customer_id) < (%s::timestamptz, %s)")
+            params.extend(decode_cursor(page_cursor, ("timestamp", "int")))
+
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        await cursor.execute(
+            f"""
+            SELECT customer_id, name, email, phone, address, created_at
+            FROM customers{where}
+            ORDER BY created_at DESC, customer_id DESC
+            LIMIT %s
+            """,
+            (*params, limit + 1),
+            json_rows=True
+        )
+        customers, next_cursor = paginate(
+            await cursor.fetchall(), limit, key=lambda row: (row["created_at"], row["customer_id"])
+        )
+        return FastJSONResponse({"customers": customers, "next_cursor": next_cursor})
+
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        print("❌ 查詢客戶資料錯誤：", e)
+        return JSONResponse({"error": "無法載入客戶資料"}, status_code=500)
 
 #後台客戶重置密碼
 @router.post("/api/admin/reset_customer_password")
@@ -225,8 +397,8 @@ async def admin_reset_customer_password(request: Request, auth=Depends(verify_ad
 
     # conn = get_db_conn()
     # cursor = conn.cursor()
-    cursor.execute("UPDATE customers SET password=%s WHERE customer_id=%s", (hashed_password, customer_id))
-    cursor.connection.commit()
+    await cursor.execute("UPDATE customers SET password=%s WHERE customer_id=%s", (hashed_password, customer_id))
+    await cursor.connection.commit()
     # cursor.close()
     # conn.close()
     return JSONResponse({"message": "✅ 密碼已重置（bcrypt 加密）"})
@@ -244,13 +416,13 @@ async def admin_update_customer(request: Request, auth=Depends(verify_admin_jwt)
 
     # conn = get_db_conn()
     # cursor = conn.cursor()
-    cursor.execute("""
+    await cursor.execute("""
         UPDATE customers
         SET name=%s, phone=%s, address=%s
         WHERE customer_id=%s
     """, (name, phone, address, customer_id))
 
-    cursor.connection.commit()
+    await cursor.connection.commit()
     # cursor.close()
     # conn.close()
 
@@ -266,20 +438,20 @@ async def create_admin(request: Request, auth=Depends(verify_admin_jwt), cursor=
         return JSONResponse({"error": "❌ 缺少必要欄位"}, status_code=400)
     hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
     try:
-        cursor.execute("INSERT INTO admin_users (username, password) VALUES (%s, %s)", (username, hashed_password))
-        cursor.connection.commit()
+        await cursor.execute("INSERT INTO admin_users (username, password) VALUES (%s, %s)", (username, hashed_password))
+        await cursor.connection.commit()
         return JSONResponse({"message": "✅ 管理員已新增"})
-    except psycopg2.IntegrityError:
+    except errors.IntegrityError:
         return JSONResponse({"error": "❌ 帳號已存在"}, status_code=400)
     finally:
         pass # 連線由依賴項管理，不需要手動關閉
 
 #顯示後台使用者
 @router.get("/api/admin/admin_users")
-async def admin_get_admin_users(auth=Depends(verify_admin_jwt), cursor=Depends(get_db_cursor)):
+async def admin_get_admin_users(auth=Depends(verify_admin_jwt), cursor=Depends(get_read_db_cursor)):
     # 讀取 id, username, created_at 和 notes 欄位
-    cursor.execute("SELECT id, username, created_at, notes FROM admin_users ORDER BY created_at")
-    rows = cursor.fetchall()
+    await cursor.execute("SELECT id, username, created_at, notes FROM admin_users ORDER BY created_at")
+    rows = await cursor.fetchall()
     # 返回包含 id 和 notes 的使用者列表
     return [{"id": r[0], "username": r[1], "created_at": str(r[2]), "notes": r[3]} for r in rows]
 
@@ -288,8 +460,8 @@ async def admin_get_admin_users(auth=Depends(verify_admin_jwt), cursor=Depends(g
 async def admin_delete_admin(admin_id: int, auth=Depends(verify_admin_jwt), cursor=Depends(get_db_cursor)):
     try:
         # 執行刪除操作
-        cursor.execute("DELETE FROM admin_users WHERE id=%s", (admin_id,))
-        cursor.connection.commit()
+        await cursor.execute("DELETE FROM admin_users WHERE id=%s", (admin_id,))
+        await cursor.connection.commit()
 
         # 檢查是否有行被刪除
         if cursor.rowcount == 0:
@@ -313,8 +485,8 @@ async def admin_update_admin(request: Request, auth=Depends(verify_admin_jwt), c
         raise HTTPException(status_code=400, detail="❌ 缺少管理員 ID")
     
     # 注意：這裡只允許更新 notes 欄位，如果需要更新其他欄位，需要修改這裡的 SQL 語句
-    cursor.execute("UPDATE admin_users SET notes=%s WHERE id=%s", (notes, admin_id))
-    cursor.connection.commit()
+    await cursor.execute("UPDATE admin_users SET notes=%s WHERE id=%s", (notes, admin_id))
+    await cursor.connection.commit()
     return JSONResponse({"message": "✅ 管理員資料已更新！"})
 
 #修改使用者密碼
@@ -329,8 +501,8 @@ async def update_admin_password(request: Request, auth=Depends(verify_admin_jwt)
     # bcrypt 重新產生雜湊
     hashed_password = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
     
-    cursor.execute("UPDATE admin_users SET password=%s WHERE username=%s", (hashed_password, username))
-    cursor.connection.commit()
+    await cursor.execute("UPDATE admin_users SET password=%s WHERE username=%s", (hashed_password, username))
+    await cursor.connection.commit()
     return JSONResponse({"message": "✅ 密碼已更新！"})
 
 # 後台管理員重置密碼
@@ -350,10 +522,12 @@ async def admin_reset_admin_password(request: Request, auth=Depends(verify_admin
 
     try:
         # 更新資料庫中的密碼
-        cursor.execute("UPDATE admin_users SET password=%s WHERE username=%s", (hashed_password, username))
-        cursor.connection.commit()
+        await cursor.execute("UPDATE admin_users SET password=%s WHERE username=%s", (hashed_password, username))
+        await cursor.connection.commit()
         # 返回新生成的明文密碼給前端 (請注意安全性)
         return JSONResponse({"message": "✅ 密碼已重置！", "new_password": new_password})
+    except HTTPException as e:
+        raise e
     except Exception as e:
         print(f"❌ 重置管理員密碼時出錯: {e}")
         raise HTTPException(status_code=500, detail="❌ 重置密碼失敗，請稍後再試！")
@@ -366,8 +540,8 @@ async def admin_login(request: Request, cursor=Depends(get_db_cursor)):
     password = data.get("password")
     if not username or not password:
         return JSONResponse({"error": "帳號或密碼為必填！"}, status_code=400)
-    cursor.execute("SELECT id, password FROM admin_users WHERE username=%s", (username,))
-    row = cursor.fetchone()
+    await cursor.execute("SELECT id, password FROM admin_users WHERE username=%s", (username,))
+    row = await cursor.fetchone()
     if not row or not bcrypt.checkpw(password.encode(), row["password"].encode()):
         return JSONResponse({"error": "帳號或密碼錯誤"}, status_code=401)
     admin_id = row["id"]
@@ -378,8 +552,8 @@ async def admin_login(request: Request, cursor=Depends(get_db_cursor)):
     }, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
     
     # 更新 current_token 實現後踢前機制
-    cursor.execute("UPDATE admin_users SET current_token=%s WHERE id=%s", (token, admin_id))
-    cursor.connection.commit()
+    await cursor.execute("UPDATE admin_users SET current_token=%s WHERE id=%s", (token, admin_id))
+    await cursor.connection.commit()
 
     return JSONResponse({
         "message": "登入成功",
@@ -389,79 +563,137 @@ async def admin_login(request: Request, cursor=Depends(get_db_cursor)):
     })
 
 # 儀表板統計 API
+# 台灣時間（無日光節約時間，固定 UTC+8）
+TAIPEI_TZ = timezone(timedelta(hours=8))
+# 儀表板可查詢的最長日期區間（天）
+DASHBOARD_MAX_DAYS = int(os.getenv("DASHBOARD_MAX_DAYS", 366))
+
+# 儀表板統計：全部由每日彙總表（order_daily_rollup / shipment_daily_rollup，見 migration 0012）
+# 以單一查詢取得，讀取量只與天數有關，與訂單總數無關；日期皆為台灣時間
+# 每個 (日期, 狀態) 分成多個 bucket（migration 0018），一律以 SUM 加總，不可只讀單列
+# 自行借用唯讀連線，請求與快取的背景重新載入都使用同一個函式
+async def _load_dashboard(start_date: date, end_date: date):
+    today = datetime.now(TAIPEI_TZ).date()
+    async with read_db_cursor() as cursor:
+        await cursor.execute("""
+            SELECT
+                (SELECT COALESCE(SUM(order_count), 0)::bigint FROM order_daily_rollup WHERE day = %s) AS today_order,
+                (SELECT COALESCE(SUM(order_count), 0)::bigint FROM order_daily_rollup WHERE status = 'pending') AS unpaid_order,
+                (SELECT COALESCE(SUM(shipment_count), 0)::bigint FROM shipment_daily_rollup WHERE status = 'pending') AS unshipped_order,
+                (SELECT COALESCE(SUM(amount_total), 0) FROM order_daily_rollup WHERE status = 'success') AS total_sales,
+                ARRAY(
+                    SELECT COALESCE(SUM(r.order_count), 0)::bigint
+                    FROM generate_series(%s::date, %s::date, INTERVAL '1 day') AS d(day)
+                    LEFT JOIN order_daily_rollup r ON r.day = d.day::date
+                    GROUP BY d.day
+                    ORDER BY d.day
+                ) AS counts
+        """, (today, start_date, end_date))
+        row = await cursor.fetchone()
+
+    days = (end_date - start_date).days + 1
+    return {
+        "todayOrder": row[0],
+        "unpaidOrder": row[1],
+        "unshippedOrder": row[2],
+        "totalSales": float(row[3]),
+        "orderChart": {
+            "dates": [(start_date + timedelta(days=i)).strftime('%m/%d') for i in range(days)],
+            "counts": row[4]
+        }
+    }
+
+# 儀表板統計 API：結果依日期區間放在 dashboard_cache（stale-while-revalidate），
+# 多位管理員同時開著儀表板時共用同一份結果；訂單狀態異動時清除
 @router.get("/api/admin/dashboard_summary")
 async def admin_dashboard_summary(
-    start_date: str = Query(None),
-    end_date: str = Query(None),
-    auth=Depends(verify_admin_jwt),
-    cursor=Depends(get_db_cursor)
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    auth=Depends(verify_admin_jwt)
 ):
     try:
-        # 今日訂單數
-        cursor.execute("""
-            SELECT COUNT(*) FROM orders WHERE DATE(created_at) = CURRENT_DATE
-        """)
-        today_order = cursor.fetchone()[0]
-
-        # 未付款訂單數
-        cursor.execute("""
-            SELECT COUNT(*) FROM orders WHERE status = 'pending'
-        """)
-        unpaid_order = cursor.fetchone()[0]
-
-        # 未出貨訂單數
-        cursor.execute("""
-            SELECT COUNT(*) FROM shipments WHERE status = 'pending'
-        """)
-        unshipped_order = cursor.fetchone()[0]
-
-        # 總營業額（已付款訂單）
-        cursor.execute("""
-            SELECT COALESCE(SUM(amount), 0) FROM orders WHERE status = 'success'
-        """)
-        total_sales = float(cursor.fetchone()[0])
-
-        # 處理日期區間
-        from datetime import datetime, timedelta
-        today = datetime.now().date()
         if not start_date or not end_date:
-            end_date = today.strftime('%Y-%m-%d')
-            start_date = (today - timedelta(days=29)).strftime('%Y-%m-%d')
-        # 查詢區間訂單數
-        cursor.execute("""
-            SELECT TO_CHAR(created_at, 'MM/DD') as day, COUNT(*)
-            FROM orders
-            WHERE DATE(created_at) BETWEEN %s AND %s
-            GROUP BY day
-            ORDER BY day
-        """, (start_date, end_date))
-        rows = cursor.fetchall()
-        date_map = {r[0]: r[1] for r in rows}
-        # 產生區間所有日期
-        start_dt = datetime.strptime(start_date, '%Y-%m-%d')
-        end_dt = datetime.strptime(end_date, '%Y-%m-%d')
-        dates = [(start_dt + timedelta(days=i)).strftime('%m/%d') for i in range((end_dt - start_dt).days + 1)]
-        counts = [date_map.get(d, 0) for d in dates]
-
-        return JSONResponse({
-            "todayOrder": today_order,
-            "unpaidOrder": unpaid_order,
-            "unshippedOrder": unshipped_order,
-            "totalSales": total_sales,
-            "orderChart": {
-                "dates": dates,
-                "counts": counts
-            }
-        })
+            end_date = datetime.now(TAIPEI_TZ).date()
+            start_date = end_date - timedelta(days=29)
+        days = (end_date - start_date).days + 1
+        if days < 1 or days > DASHBOARD_MAX_DAYS:
+            return JSONResponse({"error": f"日期區間需介於 1 到 {DASHBOARD_MAX_DAYS} 天"}, status_code=400)
+
+        summary = await dashboard_cache.get_or_load(
+            (start_date, end_date), lambda: _load_dashboard(start_date, end_date)
+        )
+        return JSONResponse(summary)
+    except HTTPException as e:
+        raise e
     except Exception as e:
         print("❌ 儀表板統計 API 錯誤：", e)
         return JSONResponse({"error": "無法取得儀表板統計資料"}, status_code=500)
 
+# 銷售分析：由行程內的欄式資料（utils/analytics.py，定期自唯讀副本載入）統計，不查詢資料庫
+# by：hour（時段）、weekday（星期）、day、month，或分類欄位 status、delivery_type、cvs_type
+# date_from / date_to 為台灣時間的日期（含當日）；資料最多延遲 ANALYTICS_REFRESH_INTERVAL 秒
+@router.get("/api/admin/analytics/orders")
+async def admin_analytics_orders(
+    by: str = "day",
+    status: str = "",
+    delivery_type: str = "",
+    cvs_type: str = "",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    auth=Depends(verify_admin_jwt)
+):
+    return await _analytics_response(
+        "orders", by, date_from, date_to,
+        {"status": status, "delivery_type": delivery_type, "cvs_type": cvs_type},
+    )
+
+# 商品銷售（訂單明細）：by 另可用 category（商品分類）、product（商品名稱），統計數量與銷售額
+@router.get("/api/admin/analytics/items")
+async def admin_analytics_items(
+    by: str = "category",
+    status: str = "",
+    delivery_type: str = "",
+    category: str = "",
+    product: str = "",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    auth=Depends(verify_admin_jwt)
+):
+    return await _analytics_response(
+        "items", by, date_from, date_to,
+        {"status": status, "delivery_type": delivery_type, "category": category, "product": product},
+    )
+
+@router.get("/api/admin/analytics/shipments")
+async def admin_analytics_shipments(
+    by: str = "day",
+    status: str = "",
+    delivery_type: str = "",
+    cvs_type: str = "",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    auth=Depends(verify_admin_jwt)
+):
+    return await _analytics_response(
+        "shipments", by, date_from, date_to,
+        {"status": status, "delivery_type": delivery_type, "cvs_type": cvs_type},
+    )
+
+async def _analytics_response(dataset, by, date_from, date_to, filters):
+    if by not in analytics.dimensions(dataset):
+        return JSONResponse({"error": f"不支援的分組方式：{by}"}, status_code=400)
+    try:
+        snapshot = await analytics.get_snapshot()
+        return FastJSONResponse(analytics.group_by(snapshot, dataset, by, date_from, date_to, filters))
+    except Exception as e:
+        print("❌ 銷售分析 API 錯誤：", e)
+        return JSONResponse({"error": "無法取得分析資料"}, status_code=500)
+
 # 自動完成出貨單
 @router.post("/api/admin/auto_complete_shipments")
 async def auto_complete_shipments(auth=Depends(verify_admin_jwt), cursor=Depends(get_db_cursor)):
     try:
-        cursor.execute("""
+        await cursor.execute("""
             UPDATE shipments
             SET status = 'completed'
             WHERE status = 'shipped'
@@ -469,9 +701,11 @@ async def auto_complete_shipments(auth=Depends(verify_admin_jwt), cursor=Depends
               AND delivered_at < NOW() - INTERVAL '7 days'
             RETURNING order_id;
         """)
-        updated = cursor.fetchall()
-        cursor.connection.commit()
+        updated = await cursor.fetchall()
+        await cursor.connection.commit()
         return {"message": f"自動完成 {len(updated)} 筆出貨單", "order_ids": [row[0] for row in updated]}
+    except HTTPException as e:
+        raise e
     except Exception as e:
         print(f"❌ 自動完成出貨單錯誤：{e}")
         return {"error": "自動完成失敗"}
@@ -489,20 +723,22 @@ async def mock_delivered(
     order_id = req.order_id
     try:
         # 先檢查訂單狀態是否為已出貨
-        cursor.execute("SELECT status FROM shipments WHERE order_id = %s", (order_id,))
-        row = cursor.fetchone()
+        await cursor.execute("SELECT status FROM shipments WHERE order_id = %s", (order_id,))
+        row = await cursor.fetchone()
         if not row:
             return {"error": "找不到出貨單"}
         if row[0] != 'shipped':
             return {"error": "只有已出貨狀態才能模擬到店"}
         # 同時更新 delivered_at 與 status
-        cursor.execute("""
+        await cursor.execute("""
             UPDATE shipments 
             SET delivered_at = NOW(), status = 'arrived'
             WHERE order_id = %s
         """, (order_id,))
-        cursor.connection.commit()
+        await cursor.connection.commit()
         return {"message": f"已模擬到店，order_id: {order_id}"}
+    except HTTPException as e:
+        raise e
     except Exception as e:
         print(f"❌ 模擬到店錯誤：{e}")
         return {"error": "模擬到店失敗"}
\ No newline at end of file
@@ -4,7 +4,6 @@ from db.db import get_db_cursor
 from datetime import datetime, timedelta
 from utils.email import send_verification_email, send_reset_password_email
 from config import JWT_SECRET_KEY, JWT_ALGORITHM, FRONTEND_URL, verify_customer_jwt
-import psycopg2.extras
 import bcrypt
 import uuid
 import jwt
@@ -30,29 +29,29 @@ async def customer_register(request: Request, background_tasks: BackgroundTasks,
             return JSONResponse({"error": "缺少必要欄位"}, status_code=400)
 
         # 檢查 Email 是否已存在
-        cursor.execute("SELECT customer_id, username, is_verified, token_expiry FROM customers WHERE email = %s", (email,))
-        existing_email_record = cursor.fetchone()
+        await cursor.execute("SELECT customer_id, username, is_verified, token_expiry FROM customers WHERE email = %s", (email,))
+        existing_email_record = await cursor.fetchone()
         if existing_email_record:
             customer_id, _, is_verified, token_expiry = existing_email_record
             if is_verified:
                 return JSONResponse({"error": "Email 已被使用"}, status_code=400)
             elif token_expiry and datetime.utcnow() > token_expiry.replace(tzinfo=None):
-                cursor.execute("DELETE FROM customers WHERE customer_id = %s", (customer_id,))
-                cursor.connection.commit()
+                await cursor.execute("DELETE FROM customers WHERE customer_id = %s", (customer_id,))
+                await cursor.connection.commit()
             else:
                 remaining_seconds = max(0, int((token_expiry.replace(tzinfo=None) - datetime.utcnow()).total_seconds()))
                 return JSONResponse({"error": "Email 已被使用且尚待驗證", "retry_after_seconds": remaining_seconds}, status_code=400)
 
         # 檢查 Username 是否已存在
-        cursor.execute("SELECT customer_id, email, is_verified, token_expiry FROM customers WHERE username = %s", (username,))
-        existing_username_record = cursor.fetchone()
+        await cursor.execute("SELECT customer_id, email, is_verified, token_expiry FROM customers WHERE username = %s", (username,))
+        existing_username_record = await cursor.fetchone()
         if existing_username_record:
             customer_id_un, _, is_verified_un, token_expiry_un = existing_username_record
             if is_verified_un:
                 return JSONResponse({"error": "使用者名稱已被使用"}, status_code=400)
             elif token_expiry_un and datetime.utcnow() > token_expiry_un.replace(tzinfo=None):
-                cursor.execute("DELETE FROM customers WHERE customer_id = %s", (customer_id_un,))
-                cursor.connection.commit()
+                await cursor.execute("DELETE FROM customers WHERE customer_id = %s", (customer_id_un,))
+                await cursor.connection.commit()
             else:
                 remaining_seconds = max(0, int((token_expiry_un.replace(tzinfo=None) - datetime.utcnow()).total_seconds()))
                 return JSONResponse({"error": "使用者名稱已被使用且尚待驗證", "retry_after_seconds": remaining_seconds}, status_code=400)
@@ -62,7 +61,7 @@ async def customer_register(request: Request, background_tasks: BackgroundTasks,
         verification_token = str(uuid.uuid4())
         token_expiry = datetime.utcnow() + timedelta(minutes=5)
 
-        cursor.execute(
+        await cursor.execute(
             """
             INSERT INTO customers (username, email, password, name, phone, address,
                                    is_verified, verification_token, token_expiry, created_at)
@@ -70,7 +69,7 @@ async def customer_register(request: Request, background_tasks: BackgroundTasks,
             """,
             (username, email, hashed_password, name, phone, address, False, verification_token, token_expiry)
         )
-        cursor.connection.commit()
+        await cursor.connection.commit()
 
         # 發送驗證信
         verification_link = f"{FRONTEND_URL}/verify-email?token={verification_token}"
@@ -79,6 +78,8 @@ async def customer_register(request: Request, background_tasks: BackgroundTasks,
         print(f"✅ [註冊] 使用者 '{username}' 註冊成功")
         return JSONResponse({"message": "註冊成功，請檢查您的 Email"})
     
+    except HTTPException as e:
+        raise e
     except Exception as e:
         print(f"❌ [註冊] 錯誤：{e}")
         return JSONResponse({"error": "註冊失敗，請稍後再試"}, status_code=500)
@@ -94,12 +95,12 @@ async def customer_login(request: Request, cursor=Depends(get_db_cursor)):
         return JSONResponse({"error": "帳號或密碼為必填！"}, status_code=400)
 
     # 使用單一查詢獲取所有需要的資訊
-    cursor.execute("""
+    await cursor.execute("""
         SELECT customer_id, username, name, email, phone, address, password, is_verified 
         FROM customers 
         WHERE username=%s
     """, (username,))
-    row = cursor.fetchone()
+    row = await cursor.fetchone()
     
     if not row:
         return JSONResponse({"error": "帳號或密碼錯誤"}, status_code=401)
@@ -119,8 +120,8 @@ async def customer_login(request: Request, cursor=Depends(get_db_cursor)):
     }, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
     
     # 使用單一查詢更新 token
-    cursor.execute("UPDATE customers SET current_token=%s WHERE customer_id=%s", (token, customer_id))
-    cursor.connection.commit()
+    await cursor.execute("UPDATE customers SET current_token=%s WHERE customer_id=%s", (token, customer_id))
+    await cursor.connection.commit()
 
     # 構建用戶資料（不包含密碼）
     customer_data = {
@@ -153,12 +154,12 @@ async def verify_token(request: Request, cursor=Depends(get_db_cursor)):
         username = payload.get("username")
         
         # 檢查 token 是否與資料庫中的相符
-        cursor.execute("""
+        await cursor.execute("""
             SELECT customer_id, username, name, email, phone, address, current_token
             FROM customers 
             WHERE customer_id=%s AND username=%s
         """, (customer_id, username))
-        row = cursor.fetchone()
+        row = await cursor.fetchone()
         
         if not row:
             return JSONResponse({"error": "找不到用戶"}, status_code=401)
@@ -187,6 +188,8 @@ async def verify_token(request: Request, cursor=Depends(get_db_cursor)):
         return JSONResponse({"error": "認證令牌已過期"}, status_code=401)
     except jwt.InvalidTokenError:
         return JSONResponse({"error": "無效的認證令牌"}, status_code=401)
+    except HTTPException as e:
+        raise e
     except Exception as e:
         print(f"❌ [Token 驗證] 發生錯誤：{str(e)}")
         return JSONResponse({"error": "驗證過程發生錯誤"}, status_code=500)
@@ -200,13 +203,13 @@ async def verify_token(auth=Depends(verify_customer_jwt), cursor=Depends(get_db_
             raise HTTPException(status_code=401, detail="無效的 token")
 
         # 查詢客戶資料
-        cursor.execute("""
+        await cursor.execute("""
             SELECT customer_id, email, name, phone
             FROM customers
             WHERE customer_id = %s
         """, (customer_id,))
         
-        customer = cursor.fetchone()
+        customer = await cursor.fetchone()
         if not customer:
             raise HTTPException(status_code=404, detail="找不到客戶資料")
 
@@ -230,15 +233,15 @@ async def forgot_password(request: Request, background_tasks: BackgroundTasks, c
     email = data.get("email")
     if not email:
         return JSONResponse({"error": "請輸入 Email"}, status_code=400)
-    cursor.execute("SELECT customer_id, username FROM customers WHERE email=%s", (email,))
-    row = cursor.fetchone()
+    await cursor.execute("SELECT customer_id, username FROM customers WHERE email=%s", (email,))
+    row = await cursor.fetchone()
     if not row:
         return JSONResponse({"error": "查無此信箱"}, status_code=404)
     customer_id, username = row[0], row[1]
     reset_token = str(uuid.uuid4())
     expiry = datetime.utcnow() + timedelta(minutes=30)
-    cursor.execute("UPDATE customers SET reset_token=%s, reset_token_expiry=%s WHERE customer_id=%s", (reset_token, expiry, customer_id))
-    cursor.connection.commit()
+    await cursor.execute("UPDATE customers SET reset_token=%s, reset_token_expiry=%s WHERE customer_id=%s", (reset_token, expiry, customer_id))
+    await cursor.connection.commit()
     reset_link = f"{FRONTEND_URL}/reset-password?token={reset_token}"
     background_tasks.add_task(send_reset_password_email, email, username, reset_link)
     return JSONResponse({"message": f"此信箱 {email} 有註冊，已寄送重設密碼信（帳號：{username}）"})
@@ -250,14 +253,14 @@ async def reset_password(request: Request, cursor=Depends(get_db_cursor)):
     new_password = data.get("new_password")
     if not token or not new_password:
         return JSONResponse({"error": "缺少必要參數"}, status_code=400)
-    cursor.execute("SELECT customer_id, reset_token_expiry FROM customers WHERE reset_token=%s", (token,))
-    row = cursor.fetchone()
+    await cursor.execute("SELECT customer_id, reset_token_expiry FROM customers WHERE reset_token=%s", (token,))
+    row = await cursor.fetchone()
     if not row:
         return JSONResponse({"error": "重設連結無效，請重新申請。"}, status_code=400)
     customer_id, expiry = row[0], row[1]
     if not expiry or datetime.utcnow() > expiry.replace(tzinfo=None):
         return JSONResponse({"error": "重設連結已過期，請重新申請。"}, status_code=400)
     hashed_password = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-    cursor.execute("UPDATE customers SET password=%s, reset_token=NULL, reset_token_expiry=NULL WHERE customer_id=%s", (hashed_password, customer_id))
-    cursor.connection.commit()
+    await cursor.execute("UPDATE customers SET password=%s, reset_token=NULL, reset_token_expiry=NULL WHERE customer_id=%s", (hashed_password, customer_id))
+    await cursor.connection.commit()
     return JSONResponse({"message": "密碼已重設成功，請用新密碼登入。"})
\ No newline at end of file
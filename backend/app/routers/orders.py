@@ -1,86 +1,100 @@
-from fastapi import APIRouter, Depends, Request, HTTPException
-from fastapi.responses import JSONResponse
-from db.db import get_db_cursor
+from fastapi import APIRouter, Depends, Request, HTTPException, Query
+from fastapi.responses import JSONResponse, Response
+from db.db import get_db_cursor, get_read_db_cursor, get_conn_and_cursor
 from typing import Optional
 from config import verify_customer_jwt
+from utils.http_cache import conditional_response
+from utils.json_response import render_json, FastJSONResponse
+from utils.pagination import decode_cursor, paginate
+from utils.cache import order_count_cache
+from utils import ecpay, ecpay_client
+from routers.pay import scheduler
 from datetime import datetime, timezone
+import os
 import random
-import requests
-import hashlib
-import urllib.parse
 
 router = APIRouter()
 
-# 顧客訂單
+# 不會再變動的訂單狀態，訂單明細可讓用戶端快取
+ORDER_TERMINAL_STATUSES = ("completed", "cancelled", "fail")
+
+# 顧客訂單歷史每頁筆數上限；訂單數最多只算到 ORDER_COUNT_CAP 筆（顯示為「N+ 筆」）
+CUSTOMER_ORDERS_PAGE_MAX = int(os.getenv("CUSTOMER_ORDERS_PAGE_MAX", 50))
+ORDER_COUNT_CAP = int(os.getenv("ORDER_COUNT_CAP", 1000))
+
+# 顧客訂單（keyset 分頁）
+# 依 (created_at, order_id) 由新到舊，帶上一頁回傳的 next_cursor 取得下一頁；
+# 多查一筆判斷 has_more，不再每頁 COUNT(*)，翻到多舊的訂單每頁成本都相同
+# approx_total 為快取的大約筆數（最多算到 ORDER_COUNT_CAP），只在第一頁計算
 @router.get("/api/customers/{customer_id}/orders")
 async def get_customer_orders(
     customer_id: int, 
-    page: int = 1, 
-    limit: int = 10,
+    limit: int = Query(10, ge=1, le=CUSTOMER_ORDERS_PAGE_MAX),
+    page_cursor: str = Query("", alias="cursor"),
     auth=Depends(verify_customer_jwt), 
-    cursor=Depends(get_db_cursor)
+    cursor=Depends(get_read_db_cursor)
 ):
     try:
         # 验证 token 中的 customer_id 是否匹配
         if auth.get("customer_id") != customer_id:
             return JSONResponse({"error": "無權訪問此客戶的訂單"}, status_code=403)
 
-        # 計算總訂單數
-        cursor.execute("""
-            SELECT COUNT(*) as total
-            FROM orders
-            WHERE customer_id=%s
-        """, (customer_id,))
-        total = cursor.fetchone()["total"]
-
-        # 計算分頁
-        offset = (page - 1) * limit
+        conditions = "customer_id=%s"
+        params = [customer_id]
+        if page_cursor:
+            conditions += " AND (created_at, order_id) < (%s::timestamptz, %s)"
+            params.extend(decode_cursor(page_cursor, ("timestamp", "str")))
 
-        # 使用 LIMIT 和 OFFSET 進行分頁查詢
-        cursor.execute("""
+        await cursor.execute(f"""
             SELECT order_id, amount, item_names, status, created_at, paid_at
             FROM orders
-            WHERE customer_id=%s
-            ORDER BY created_at DESC
-            LIMIT %s OFFSET %s
-        """, (customer_id, limit, offset))
-        orders = cursor.fetchall()
-        
-        # 將 datetime 物件轉換為字串以便 JSON 序列化
-        formatted_orders = []
-        for order_row in orders:
-            # 將 DictRow 轉換為標準 Python 字典
-            order_dict = dict(order_row)
-            # 格式化 datetime 物件為字串以便 JSON 序列化
-            if order_dict.get('created_at'):
-                order_dict['created_at'] = order_dict['created_at'].isoformat()
-            if order_dict.get('paid_at'):
-                order_dict['paid_at'] = order_dict['paid_at'].isoformat()
-            formatted_orders.append(order_dict)
-
-        return JSONResponse({
-            "orders": formatted_orders,
-            "total": total,
-            "page": page,
+            WHERE {conditions}
+            ORDER BY created_at DESC, order_id DESC
+            LIMIT %s
+        """, (*params, limit + 1), json_rows=True)
+        orders, next_cursor = paginate(
+            await cursor.fetchall(), limit, key=lambda row: (row["created_at"], row["order_id"])
+        )
+
+        approx_total = order_count_cache.get(customer_id)
+        if approx_total is None and not page_cursor:
+            await cursor.execute("""
+                SELECT COUNT(*) AS total
+                FROM (SELECT 1 FROM orders WHERE customer_id=%s LIMIT %s) AS capped
+            """, (customer_id, ORDER_COUNT_CAP))
+            approx_total = (await cursor.fetchone())["total"]
+            order_count_cache.set(customer_id, approx_total)
+
+        return FastJSONResponse({
+            "orders": orders,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None,
             "limit": limit,
-            "total_pages": (total + limit - 1) // limit
+            "approx_total": approx_total,
+            "approx_total_capped": approx_total is not None and approx_total >= ORDER_COUNT_CAP
         })
 
+    except HTTPException as e:
+        raise e
     except Exception as e:
         print(f"❌ 後端查詢客戶 {customer_id} 訂單錯誤： {e}")
         return JSONResponse({"error": "內部伺服器錯誤"}, status_code=500)
 
 # 取得單筆訂單明細
+# 已結束的訂單（完成、取消、付款失敗）幾乎不再變動，回應帶 ETag / Last-Modified（依 orders.updated_at），
+# 用戶端再次查詢時未變更就回 304；尚未執行 0017 的資料庫 updated_at 可能為 NULL，以 created_at 代替
 @router.get("/api/orders/{order_id}")
-async def get_order_by_id(order_id: str, cursor=Depends(get_db_cursor)):
+async def get_order_by_id(order_id: str, request: Request, cursor=Depends(get_read_db_cursor)):
     try:
-        cursor.execute("""
-            SELECT order_id, amount, item_names, status, created_at, paid_at
+        await cursor.execute("""
+            SELECT order_id, amount, item_names, status, created_at, paid_at,
+                   COALESCE(updated_at, created_at) AS updated_at
             FROM orders WHERE order_id=%s
         """, (order_id,))
-        row = cursor.fetchone()
+        row = await cursor.fetchone()
         if not row:
             return JSONResponse({"error": "找不到訂單"}, status_code=404)
+
         order = {
             "order_id": row[0],
             "amount": row[1],
@@ -89,36 +103,47 @@ async def get_order_by_id(order_id: str, cursor=Depends(get_db_cursor)):
             "created_at": row[4].isoformat() if row[4] else None,
             "paid_at": row[5].isoformat() if row[5] else None
         }
-        return JSONResponse(order)
+        if row[3] in ORDER_TERMINAL_STATUSES:
+            return conditional_response(
+                request,
+                lambda: render_json(order),
+                etag=f'"order-{row[0]}-{int(row[6].timestamp() * 1_000_000)}"',
+                last_modified=row[6],
+                cache_control="private, no-cache",
+            )
+        return Response(content=render_json(order), media_type="application/json")  # 與上面相同以 render_json 序列化（Decimal 會轉成 float）
+    except HTTPException as e:
+        raise e
     except Exception as e:
         print(f"❌ 查詢單一訂單錯誤：{e}")
         return JSONResponse({"error": "查詢訂單失敗"}, status_code=500)
 
-# 取得訂單狀態
 @router.get("/api/orders/{order_id}/status")
 async def get_order_status(order_id: str, cursor=Depends(get_db_cursor)):
     try:
-        cursor.execute("SELECT status FROM orders WHERE order_id=%s", (order_id,))
-        row = cursor.fetchone()
+        await cursor.execute("SELECT status FROM orders WHERE order_id=%s", (order_id,))
+        row = await cursor.fetchone()
 
         if row:
             return JSONResponse({"order_id": order_id, "status": row[0]})
         else:
             return JSONResponse({"error": "Order not found"}, status_code=404)
 
+    except HTTPException as e:
+        raise e
     except Exception as e:
         print("❌ 後端查詢訂單狀態錯誤：", str(e))
         return JSONResponse({"error": "Internal server error"}, status_code=500)
     
 # 取得出貨單
 @router.get("/api/orders/{order_id}/shipment")
-async def get_order_shipment(order_id: str, cursor=Depends(get_db_cursor)):
+async def get_order_shipment(order_id: str, cursor=Depends(get_read_db_cursor)):
     try:
-        cursor.execute("""
+        await cursor.execute("""
             SELECT shipment_id, order_id, recipient_name, address, status, created_at
             FROM shipments WHERE order_id=%s
         """, (order_id,))
-        row = cursor.fetchone()
+        row = await cursor.fetchone()
         if not row:
             return JSONResponse({})
         shipment = {
@@ -130,6 +155,8 @@ async def get_order_shipment(order_id: str, cursor=Depends(get_db_cursor)):
             "created_at": row[5].isoformat() if row[5] else None
         }
         return JSONResponse(shipment)
+    except HTTPException as e:
+        raise e
     except Exception as e:
         print(f"❌ 查詢出貨單錯誤：{e}")
         return JSONResponse({"error": "查詢出貨單失敗"}, status_code=500)
@@ -143,8 +170,8 @@ async def mark_picked_up(order_id: str, auth=Depends(verify_customer_jwt), curso
             raise HTTPException(status_code=401, detail="客戶認證失敗")
 
         # 先檢查出貨單狀態是否為已到店，並確認是否為該客戶的訂單
-        cursor.execute("SELECT s.status, o.customer_id FROM shipments s JOIN orders o ON s.order_id = o.order_id WHERE s.order_id=%s", (order_id,))
-        row = cursor.fetchone()
+        await cursor.execute("SELECT s.status, o.customer_id FROM shipments s JOIN orders o ON s.order_id = o.order_id WHERE s.order_id=%s", (order_id,))
+        row = await cursor.fetchone()
         if not row:
             return JSONResponse({"error": "找不到出貨單或訂單"}, status_code=404)
         
@@ -158,8 +185,8 @@ async def mark_picked_up(order_id: str, auth=Depends(verify_customer_jwt), curso
             return JSONResponse({"error": "只有已到店狀態才能確認取貨"}, status_code=400)
         
         # 更新狀態為 'picked_up' 並記錄取貨時間
-        cursor.execute("UPDATE shipments SET status='picked_up', picked_up_at = NOW() WHERE order_id=%s", (order_id,))
-        cursor.connection.commit()
+        await cursor.execute("UPDATE shipments SET status='picked_up', picked_up_at = NOW() WHERE order_id=%s", (order_id,))
+        await cursor.connection.commit()
         return JSONResponse({"message": "狀態已更新為已取貨"})
     except HTTPException as e:
         raise e
@@ -175,8 +202,8 @@ async def complete_order(order_id: str, auth=Depends(verify_customer_jwt), curso
         if not customer_id:
             raise HTTPException(status_code=401, detail="客戶認證失敗")
 
-        cursor.execute("SELECT s.status, o.customer_id FROM shipments s JOIN orders o ON s.order_id = o.order_id WHERE s.order_id=%s", (order_id,))
-        row = cursor.fetchone()
+        await cursor.execute("SELECT s.status, o.customer_id FROM shipments s JOIN orders o ON s.order_id = o.order_id WHERE s.order_id=%s", (order_id,))
+        row = await cursor.fetchone()
         if not row:
             return JSONResponse({"error": "找不到出貨單或訂單"}, status_code=404)
         
@@ -189,8 +216,8 @@ async def complete_order(order_id: str, auth=Depends(verify_customer_jwt), curso
         if shipment_status != 'picked_up':
             return JSONResponse({"error": "只有已取貨狀態才能完成訂單"}, status_code=400)
         
-        cursor.execute("UPDATE shipments SET status='completed' WHERE order_id=%s", (order_id,))
-        cursor.connection.commit()
+        await cursor.execute("UPDATE shipments SET status='completed' WHERE order_id=%s", (order_id,))
+        await cursor.connection.commit()
         return JSONResponse({"message": "訂單已完成"})
     except HTTPException as e:
         raise e
@@ -200,17 +227,17 @@ async def complete_order(order_id: str, auth=Depends(verify_customer_jwt), curso
            
 # 取消訂單（未付款才可）
 @router.post("/api/orders/{order_id}/cancel")
-def cancel_order(order_id: str, cursor=Depends(get_db_cursor)):
-    cursor.execute("SELECT status FROM orders WHERE order_id = %s", (order_id,))
-    row = cursor.fetchone()
+async def cancel_order(order_id: str, cursor=Depends(get_db_cursor)):
+    await cursor.execute("SELECT status FROM orders WHERE order_id = %s", (order_id,))
+    row = await cursor.fetchone()
     if not row:
         return JSONResponse({"error": "找不到訂單"}, status_code=404)
 
     if row[0] != "pending":
         return JSONResponse({"error": "已付款訂單無法取消"}, status_code=400)
 
-    cursor.execute("UPDATE orders SET status = 'cancelled' WHERE order_id = %s", (order_id,))
-    cursor.connection.commit()
+    await cursor.execute("UPDATE orders SET status = 'cancelled' WHERE order_id = %s", (order_id,))
+    await cursor.connection.commit()
     return {"message": "訂單已取消"}
 
 # 顧客申請退貨
@@ -230,14 +257,14 @@ async def request_return(
             return JSONResponse({"error": "客戶認證失敗"}, status_code=401)
 
         # 檢查訂單是否存在且屬於該客戶
-        cursor.execute("""
+        await cursor.execute("""
             SELECT o.status, o.created_at, s.status as shipment_status
             FROM orders o
             LEFT JOIN shipments s ON o.order_id = s.order_id
             WHERE o.order_id = %s AND o.customer_id = %s
         """, (order_id, customer_id))
         
-        row = cursor.fetchone()
+        row = await cursor.fetchone()
         if not row:
             return JSONResponse({"error": "找不到訂單或訂單不屬於該客戶"}, status_code=404)
             
@@ -256,7 +283,7 @@ async def request_return(
             return JSONResponse({"error": "已超過退貨期限（14天）"}, status_code=400)
             
         # 更新訂單狀態為退貨申請中
-        cursor.execute("""
+        await cursor.execute("""
             UPDATE orders 
             SET status = 'return_requested', 
                 return_reason = %s,
@@ -264,15 +291,45 @@ async def request_return(
             WHERE order_id = %s
         """, (return_reason, order_id))
         
-        cursor.connection.commit()
+        await cursor.connection.commit()
         return JSONResponse({"message": "退貨申請已提交"})
         
+    except HTTPException as e:
+        raise e
     except Exception as e:
-        cursor.connection.rollback()
+        await cursor.connection.rollback()
         print(f"❌ [退貨申請] 發生錯誤：{str(e)}")
         return JSONResponse({"error": "退貨申請失敗"}, status_code=500)
 
+# 等待綠界超過此時間（秒）仍未完成的退貨物流（例如呼叫期間行程中斷），視為逾時
+RETURN_PENDING_TIMEOUT = int(os.getenv("RETURN_PENDING_TIMEOUT", 600))
+
+# 將逾時的退貨物流改為 expired，顧客可重新申請；綠界可能已建立物流單，記錄訂單編號供人工確認
+def expire_pending_returns():
+    with get_conn_and_cursor() as (conn, cursor):
+        try:
+            cursor.execute("""
+                UPDATE return_logistics
+                SET status = 'expired',
+                    last_error = '等待綠界回應逾時',
+                    updated_at = NOW()
+                WHERE status = 'pending_external'
+                  AND updated_at < NOW() - make_interval(secs => %s)
+                RETURNING order_id
+            """, (RETURN_PENDING_TIMEOUT,))
+            expired = cursor.fetchall()
+            conn.commit()
+
+            if expired:
+                print(f"⚠️ 退貨物流等待綠界逾時（請確認綠界是否已建立物流單）：{[row['order_id'] for row in expired]}")
+        except Exception as e:
+            print(f"❌ 檢查逾時退貨物流時發生錯誤：{str(e)}")
+
+# 每 5 分鐘執行一次檢查
+scheduler.add_job(expire_pending_returns, 'interval', minutes=5)
+
 # 設定退貨物流（選擇超商門市，並建立綠界物流單）
+# 呼叫綠界期間不持有資料庫連線：短交易登記 → 呼叫綠界 → 短交易寫入結果
 @router.post("/api/orders/{order_id}/set-return-logistics")
 async def set_return_logistics(
     order_id: str, 
@@ -317,13 +374,13 @@ async def set_return_logistics(
         if not ecpay_cvs_type:
             return JSONResponse({"error": f"不支援的超商類型：{cvs_type}"}, status_code=400)
 
-        # 檢查訂單狀態是否允許退貨
-        cursor.execute("""
+        # 第一段（短交易）：檢查訂單並登記退貨物流為 pending_external，提交後即歸還連線
+        await cursor.execute("""
             SELECT status, customer_id 
             FROM orders 
             WHERE order_id = %s
         """, (order_id,))
-        order = cursor.fetchone()
+        order = await cursor.fetchone()
         
         if not order:
             return JSONResponse({"error": "找不到訂單"}, status_code=404)
@@ -333,8 +390,30 @@ async def set_return_logistics(
             
         if order["status"] not in ["shipped", "delivered", "completed"]:
             return JSONResponse({"error": "訂單狀態不允許退貨"}, status_code=400)
-
-        # 呼叫綠界API建立物流單
+        order_status = order["status"]
+
+        # 同一訂單已有等待綠界中的申請（且未逾時）時不重複建立物流單
+        await cursor.execute("""
+            INSERT INTO return_logistics (
+                order_id, store_id, store_name, cvs_type, status, created_at, updated_at
+            ) VALUES (%s, %s, %s, %s, 'pending_external', NOW(), NOW())
+            ON CONFLICT (order_id) DO UPDATE
+            SET store_id = EXCLUDED.store_id,
+                store_name = EXCLUDED.store_name,
+                cvs_type = EXCLUDED.cvs_type,
+                status = EXCLUDED.status,
+                last_error = NULL,
+                updated_at = NOW()
+            WHERE return_logistics.status <> 'pending_external'
+               OR return_logistics.updated_at < NOW() - make_interval(secs => %s)
+            RETURNING order_id
+        """, (order_id, store_id, store_name, ecpay_cvs_type, RETURN_PENDING_TIMEOUT))
+        if not await cursor.fetchone():
+            await cursor.connection.rollback()
+            return JSONResponse({"error": "退貨物流建立中，請稍候"}, status_code=409)
+        await cursor.connection.commit()
+
+        # 第二段：呼叫綠界API建立物流單（不持有資料庫連線）
         merchant_id = "2000132"
         hash_key = "5294y06JbISpM5x9"
         hash_iv = "v77hoKGq4kWxNNIS"
@@ -360,68 +439,70 @@ async def set_return_logistics(
             "ReturnStoreID": store_id,
             "PlatformID": "",
         }
-        params["CheckMacValue"] = gen_check_mac_value(params, hash_key, hash_iv)
+        ecpay.sign(params, hash_key, hash_iv)
 
-        url = "https://logistics-stage.ecpay.com.tw/Express/Create"
+        error = None
         try:
-            resp = requests.post(url, data=params, timeout=10)  # 設置 10 秒超時
-            result = resp.text
+            result = await ecpay_client.post_form("/Express/Create", params)
             print(f"綠界回應：{result}")
 
-            # 解析綠界回傳內容
-            ecpay_result = dict(item.split('=') for item in result.split('&') if '=' in item)
+            # 解析綠界回傳內容（RtnCode 300 表示已收到訂單資料）
+            ecpay_result, rtn_error = ecpay.parse_response(result)
             logistics_id = ecpay_result.get("AllPayLogisticsID")
             rtn_code = ecpay_result.get("RtnCode")
-            rtn_msg = ecpay_result.get("RtnMsg")
-
-            if rtn_code != "1" or not logistics_id:
-                return JSONResponse({"error": f"綠界建立物流單失敗: {rtn_msg}"}, status_code=400)
-
-        except requests.exceptions.Timeout:
-            return JSONResponse({"error": "綠界 API 請求超時"}, status_code=504)
-        except requests.exceptions.RequestException as e:
-            return JSONResponse({"error": f"綠界 API 請求失敗: {str(e)}"}, status_code=502)
-
-        try:
-            # 開始交易
-            cursor.execute("BEGIN")
-
-            # 寫入 return_logistics 資料表
-            cursor.execute("""
-                INSERT INTO return_logistics (
-                    order_id, 
-                    logistics_id, 
-                    store_id, 
-                    store_name, 
-                    cvs_type, 
-                    status, 
-                    created_at
-                ) VALUES (%s, %s, %s, %s, %s, %s, NOW())
-                ON CONFLICT (order_id) DO UPDATE
-                SET logistics_id = EXCLUDED.logistics_id,
-                    store_id = EXCLUDED.store_id,
-                    store_name = EXCLUDED.store_name,
-                    cvs_type = EXCLUDED.cvs_type,
-                    status = EXCLUDED.status,
+            rtn_msg = rtn_error or ecpay_result.get("RtnMsg")
+
+            if rtn_code not in ("1", "300") or not logistics_id:
+                error = (400, f"綠界建立物流單失敗: {rtn_msg}")
+
+        except ecpay_client.EcpayTimeout:
+            error = (504, "綠界 API 請求超時")
+        except ecpay_client.EcpayUnavailable:
+            error = (503, "綠界服務暫時無法使用，請稍後再試")
+        except ecpay_client.EcpayError as e:
+            error = (502, f"綠界 API 請求失敗: {str(e)}")
+
+        # 第三段（短交易）：寫入結果
+        if error:
+            await cursor.execute("""
+                UPDATE return_logistics
+                SET status = 'failed',
+                    last_error = %s,
                     updated_at = NOW()
-            """, (order_id, logistics_id, store_id, store_name, ecpay_cvs_type, "created"))
+                WHERE order_id = %s AND status = 'pending_external'
+            """, (error[1], order_id))
+            await cursor.connection.commit()
+            return JSONResponse({"error": error[1]}, status_code=error[0])
 
-            # 更新訂單狀態為退貨處理中
-            cursor.execute("""
-                UPDATE orders 
-                SET status = 'return_processing',
+        # compare-and-set：呼叫綠界期間訂單狀態若已被變更（例如後台取消），不覆寫
+        await cursor.execute("""
+            UPDATE orders 
+            SET status = 'return_processing',
+                updated_at = NOW()
+            WHERE order_id = %s AND status = %s
+            RETURNING order_id
+        """, (order_id, order_status))
+        if not await cursor.fetchone():
+            await cursor.execute("""
+                UPDATE return_logistics
+                SET logistics_id = %s,
+                    status = 'failed',
+                    last_error = '建立物流單期間訂單狀態已變更',
                     updated_at = NOW()
                 WHERE order_id = %s
-            """, (order_id,))
-
-            # 提交交易
-            cursor.execute("COMMIT")
-
-        except Exception as e:
-            # 發生錯誤時回滾交易
-            cursor.execute("ROLLBACK")
-            print(f"❌ 資料庫操作失敗：{str(e)}")
-            return JSONResponse({"error": "資料庫操作失敗"}, status_code=500)
+            """, (logistics_id, order_id))
+            await cursor.connection.commit()
+            print(f"❌ [設定退貨物流] 訂單 {order_id} 狀態已變更，綠界物流單 {logistics_id} 需人工確認")
+            return JSONResponse({"error": "訂單狀態已變更，請聯繫客服"}, status_code=409)
+
+        await cursor.execute("""
+            UPDATE return_logistics
+            SET logistics_id = %s,
+                status = 'created',
+                updated_at = NOW()
+            WHERE order_id = %s
+        """, (logistics_id, order_id))
+        await cursor.connection.commit()
 
         return JSONResponse({
             "logistics_id": logistics_id,
@@ -432,6 +513,8 @@ async def set_return_logistics(
             "order_status": "return_processing"
         })
 
+    except HTTPException as e:
+        raise e
     except Exception as e:
         print(f"❌ [設定退貨物流] 發生錯誤：{str(e)}")
         return JSONResponse({"error": "設定退貨物流失敗"}, status_code=500)
@@ -446,7 +529,7 @@ async def get_return_status(
     try:
         customer_id = auth.get("customer_id")
         
-        cursor.execute("""
+        await cursor.execute("""
             SELECT 
                 o.status as order_status,
                 o.return_reason,
@@ -460,7 +543,7 @@ async def get_return_status(
             WHERE o.order_id = %s AND o.customer_id = %s
         """, (order_id, customer_id))
         
-        row = cursor.fetchone()
+        row = await cursor.fetchone()
         if not row:
             return JSONResponse({"error": "找不到退貨記錄"}, status_code=404)
             
@@ -474,13 +557,8 @@ async def get_return_status(
             "updated_at": row["updated_at"].isoformat() if row["updated_at"] else None
         })
         
+    except HTTPException as e:
+        raise e
     except Exception as e:
         print(f"❌ [查詢退貨狀態] 發生錯誤：{str(e)}")
         return JSONResponse({"error": "查詢退貨狀態失敗"}, status_code=500)
-
-def gen_check_mac_value(params, hash_key, hash_iv):
-    sorted_params = sorted(params.items())
-    encode_str = f"HashKey={hash_key}&" + "&".join(f"{k}={v}" for k, v in sorted_params) + f"&HashIV={hash_iv}"
-    encode_str = urllib.parse.quote_plus(encode_str).lower()
-    check_mac = hashlib.md5(encode_str.encode('utf-8')).hexdigest().upper()
-    return check_mac
\ No newline at end of file
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Request, Depends
-from fastapi.responses import JSONResponse, HTMLResponse
-from db.db import get_db_cursor, get_sync_db_cursor_and_conn, global_pool, get_conn_and_cursor
+from fastapi import APIRouter, Request, Depends, HTTPException
+from fastapi.responses import JSONResponse, HTMLResponse, PlainTextResponse
+from db.db import get_db_cursor, get_conn_and_cursor
+from utils.cache import order_count_cache
+from utils.pricing import quote_cart, PricingError
+from utils.ecpay_notify import enqueue
+from utils import ecpay
+from utils.json_response import FastJSONResponse
+from decimal import Decimal, ROUND_HALF_UP
 from datetime import datetime, timedelta
 import random
-import hashlib
-import urllib.parse
 import os
 import jwt
 from apscheduler.schedulers.background import BackgroundScheduler
@@ -18,7 +22,7 @@ ECPAY_MERCHANT_ID = os.getenv("ECPAY_MERCHANT_ID")
 ECPAY_HASH_KEY = os.getenv("ECPAY_HASH_KEY")
 ECPAY_HASH_IV = os.getenv("ECPAY_HASH_IV")
 YOUR_DOMAIN = os.getenv("YOUR_DOMAIN")
-ECPAY_API_URL = "https://payment-stage.ecpay.com.tw/Cashier/AioCheckOut/V5"
+ECPAY_API_URL = os.getenv("ECPAY_API_URL", "https://payment-stage.ecpay.com.tw/Cashier/AioCheckOut/V5")  # 壓測時可指向 tools.ecpay_simulator
 
 # 檢查未收到回覆的訂單
 def check_pending_orders():
@@ -34,6 +38,8 @@ def check_pending_orders():
                 RETURNING order_id
             """)
             updated_orders = cursor.fetchall()
+            if updated_orders:
+                cursor.execute("SELECT pg_notify('dashboard_changed', 'timeout')")  # 通知各 Pod 清除儀表板快取
             conn.commit()
             
             if updated_orders:
@@ -44,13 +50,21 @@ def check_pending_orders():
 # 每 5 分鐘執行一次檢查
 scheduler.add_job(check_pending_orders, 'interval', minutes=5)
 
-# 產生 CheckMacValue
-def generate_check_mac_value(params: dict, hash_key: str, hash_iv: str) -> str:
-    sorted_params = sorted(params.items())
-    encode_str = f"HashKey={hash_key}&" + '&'.join([f"{k}={v}" for k, v in sorted_params]) + f"&HashIV={hash_iv}"
-    encode_str = urllib.parse.quote_plus(encode_str).lower()
-    check_mac = hashlib.md5(encode_str.encode('utf-8')).hexdigest().upper()
-    return check_mac
+# 購物車報價：以資料庫的商品名稱與價格重新計算（結帳時 pay() 也以同樣方式計價）
+# 使用主庫連線，避免把副本延遲的舊價格放進結帳共用的價格快取
+@router.post("/cart/quote")
+async def cart_quote(request: Request, cursor=Depends(get_db_cursor)):
+    try:
+        data = await request.json()
+        quote = await quote_cart(cursor, data.get("products"))
+        return FastJSONResponse(quote)
+    except PricingError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        print("❌ 購物車報價錯誤：", str(e))
+        return JSONResponse({"error": "無法計算購物車金額"}, status_code=500)
 
 # 建立訂單並取得綠界付款參數
 @router.post("/pay")
@@ -91,8 +105,6 @@ async def pay(request: Request, cursor=Depends(get_db_cursor)):
         serial_number = f"{random.randint(0, 999999):06d}"
         order_id = f"{date_time_str}{serial_number}"
 
-        amount = sum(item["price"] * item["quantity"] for item in products)
-        item_names = "#".join([f"{item['name']} x {item['quantity']}" for item in products])
         trade_date = now.strftime("%Y/%m/%d %H:%M:%S")
 
         # 超商類型代碼轉換
@@ -115,8 +127,17 @@ async def pay(request: Request, cursor=Depends(get_db_cursor)):
             if not ecpay_cvs_type:
                 return JSONResponse({"error": f"不支援的超商類型：{cvs_type}"}, status_code=400)
 
+        # 以資料庫的商品價格計算金額（不採用前端傳來的價格）
+        try:
+            quote = await quote_cart(cursor, products)
+        except PricingError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        # 綠界 TotalAmount 須為整數（新台幣元）
+        amount = quote["total"].quantize(Decimal("1"), rounding=ROUND_HALF_UP)
+        item_names = "#".join(f"{line['name']} x {line['quantity']}" for line in quote["lines"])
+
         #寫入資料庫
-        cursor.execute("""
+        await cursor.execute("""
             INSERT INTO orders (
                 order_id, amount, item_names, status, created_at, customer_id,
                 delivery_type, store_id, store_name, cvs_type, address,
@@ -128,7 +149,23 @@ async def pay(request: Request, cursor=Depends(get_db_cursor)):
             delivery_type, store_id, store_name, ecpay_cvs_type, address,
             recipient_name, recipient_phone
         ))
-        cursor.connection.commit()
+        # 訂單明細與訂單在同一個交易寫入；計價後才被刪除的商品 product_id 記為 NULL
+        await cursor.execute("""
+            INSERT INTO order_items (order_id, line_no, product_id, product_name, quantity, unit_price)
+            SELECT %s, item.line_no, p.id, item.name, item.quantity, item.price
+            FROM unnest(%s::int[], %s::text[], %s::int[], %s::numeric[]) WITH ORDINALITY
+                 AS item(product_id, name, quantity, price, line_no)
+            LEFT JOIN products p ON p.id = item.product_id
+        """, (
+            order_id,
+            [line["product_id"] for line in quote["lines"]],
+            [line["name"] for line in quote["lines"]],
+            [line["quantity"] for line in quote["lines"]],
+            [line["unit_price"] for line in quote["lines"]],
+        ))
+        await cursor.connection.commit()
+        if str(customer_id).isdigit():
+            order_count_cache.delete(int(customer_id))  # 訂單歷史的大約筆數重新計算
         print("✅ 訂單已寫入資料庫！")
 
         # 綠界參數
@@ -137,7 +174,7 @@ async def pay(request: Request, cursor=Depends(get_db_cursor)):
             "MerchantTradeNo": order_id,
             "MerchantTradeDate": trade_date,
             "PaymentType": "aio",
-            "TotalAmount": amount,
+            "TotalAmount": int(amount),
             "TradeDesc": "綠界平台商測試",
             "ItemName": item_names,
             "ReturnURL": f"{YOUR_DOMAIN}/ecpay/notify",
@@ -146,108 +183,41 @@ async def pay(request: Request, cursor=Depends(get_db_cursor)):
             "OrderResultURL": f"{YOUR_DOMAIN}/pay/result",  # 新增此參數
             "PlatformID": ECPAY_MERCHANT_ID
         }
-        params["CheckMacValue"] = generate_check_mac_value(params, ECPAY_HASH_KEY, ECPAY_HASH_IV)
+        ecpay.sign(params, ECPAY_HASH_KEY, ECPAY_HASH_IV)
         print("✅ 送出的參數：", params)
 
         return JSONResponse({"ecpay_url": ECPAY_API_URL, "params": params, "order_id": order_id})
 
+    except HTTPException as e:
+        raise e
     except Exception as e:
         print("❌ 後端錯誤：", str(e))
         return JSONResponse({"error": "後端發生錯誤"}, status_code=500)
 
-# 處理綠界回調通知
+# 處理綠界回調通知：只驗證並寫入收件匣，立即回應 1|OK（訂單與出貨單由 utils.ecpay_notify 的背景工作處理）
 @router.post("/ecpay/notify")
 async def handle_ecpay_notification(request: Request, cursor=Depends(get_db_cursor)):
     try:
         # 接收綠界的回調資料
-        form_data = await request.form()
-        print("✅ 收到綠界回調：", dict(form_data))
-
-        # 取得必要參數
-        merchant_trade_no = form_data.get("MerchantTradeNo")
-        rtn_code = form_data.get("RtnCode")
-        rtn_msg = form_data.get("RtnMsg")
-        check_mac_value = form_data.get("CheckMacValue")
-        payment_date = form_data.get("PaymentDate")
-
-        # 驗證資料完整性
-        if not all([merchant_trade_no, rtn_code, rtn_msg, check_mac_value]):
+        form_data = dict(await request.form())
+        print("✅ 收到綠界回調：", form_data)
+
+        # 驗證資料完整性與 CheckMacValue（不通過的通知不寫入資料庫）
+        if not all(form_data.get(k) for k in ["MerchantTradeNo", "TradeNo", "RtnCode", "RtnMsg", "CheckMacValue"]):
             print("❌ 回調資料不完整")
             return JSONResponse({"error": "回調資料不完整"}, status_code=400)
+        if not ecpay.verify(form_data, ECPAY_HASH_KEY, ECPAY_HASH_IV):
+            print(f"❌ 回調 CheckMacValue 驗證失敗：{form_data.get('MerchantTradeNo')}")
+            return JSONResponse({"error": "CheckMacValue 驗證失敗"}, status_code=400)
 
-        # 更新訂單狀態
-        if rtn_code == "1":  # 付款成功
-            new_status = "success"
-        elif rtn_code in ["10300066", "385"]:  # 付款等待中
-            new_status = "pending"
-            rtn_msg = "交易處理中，等待銀行回覆"
-        elif rtn_code in ["10100248", "10100252", "10100254", "10100251"]:  # 信用卡常見錯誤
-            new_status = "fail"
-            error_messages = {
-                "10100248": "信用卡交易被拒絕",
-                "10100252": "信用卡額度不足",
-                "10100254": "信用卡交易失敗，請確認交易限制",
-                "10100251": "信用卡過期"
-            }
-            rtn_msg = error_messages.get(rtn_code, rtn_msg)
-        else:  # 其他所有錯誤
-            new_status = "fail"
-
-        cursor.execute("""
-            UPDATE orders
-            SET status = %s,
-                payment_message = %s,
-                paid_at = CASE WHEN %s = 'success' THEN %s::timestamp ELSE NULL END,
-                updated_at = NOW()
-            WHERE order_id = %s
-            RETURNING order_id, status
-        """, (new_status, rtn_msg, new_status, payment_date, merchant_trade_no))
-        
-        updated_order = cursor.fetchone()
-        cursor.connection.commit()
-
-        if not updated_order:
-            print(f"❌ 找不到訂單：{merchant_trade_no}")
-            return JSONResponse({"error": "找不到訂單"}, status_code=404)
-
-        print(f"✅ 訂單 {merchant_trade_no} 已更新為 {new_status}，原因：{rtn_msg}")
-
-        # 如果付款成功，建立出貨單
-        if new_status == "success":
-            try:
-                cursor.execute("""
-                    INSERT INTO shipments (
-                        order_id, 
-                        recipient_name,
-                        delivery_type,
-                        store_id,
-                        store_name,
-                        cvs_type,
-                        address,
-                        status,
-                        created_at
-                    )
-                    SELECT 
-                        order_id,
-                        recipient_name,
-                        delivery_type,
-                        store_id,
-                        store_name,
-                        cvs_type,
-                        address,
-                        'pending',
-                        NOW()
-                    FROM orders
-                    WHERE order_id = %s
-                """, (merchant_trade_no,))
-                cursor.connection.commit()
-                print(f"✅ 已為訂單 {merchant_trade_no} 建立出貨單")
-            except Exception as e:
-                print(f"❌ 建立出貨單時發生錯誤：{str(e)}")
-                # 不中斷處理，因為訂單狀態已更新成功
-
-        return "1|OK"
+        await enqueue(cursor, form_data)
+        await cursor.connection.commit()
+
+        # 綠界要求回應純文字 1|OK
+        return PlainTextResponse("1|OK")
 
+    except HTTPException as e:
+        raise e
     except Exception as e:
         print(f"❌ 處理綠界回調時發生錯誤：{str(e)}")
         return JSONResponse({"error": "處理回調時發生錯誤"}, status_code=500)
\ No newline at end of file
@@ -13,8 +13,8 @@ router = APIRouter()
 async def verify_email(token: str, cursor=Depends(get_db_cursor)):
     print(f"[Email 驗證] 收到 Email 驗證請求，Token: {token}")
     try:
-        cursor.execute("SELECT customer_id, username, is_verified, token_expiry FROM customers WHERE verification_token = %s", (token,))
-        customer = cursor.fetchone()
+        await cursor.execute("SELECT customer_id, username, is_verified, token_expiry FROM customers WHERE verification_token = %s", (token,))
+        customer = await cursor.fetchone()
         print(f"[Email 驗證] 資料庫查詢結果: {customer}")
 
         if not customer:
@@ -31,14 +31,14 @@ async def verify_email(token: str, cursor=Depends(get_db_cursor)):
         if token_expiry and datetime.utcnow() > token_expiry.replace(tzinfo=None):
             print(f"❌ [Email 驗證] 驗證失敗: 客戶 '{username}' 的 token 已過期。")
             # 清除過期的 token 和過期時間
-            cursor.execute("UPDATE customers SET verification_token = NULL, token_expiry = NULL WHERE customer_id = %s", (customer_id,))
-            cursor.connection.commit()
+            await cursor.execute("UPDATE customers SET verification_token = NULL, token_expiry = NULL WHERE customer_id = %s", (customer_id,))
+            await cursor.connection.commit()
             print(f"✅ [Email 驗證] 客戶 '{username}' 的過期 token 已被清除。")
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="驗證連結已過期，請重新註冊或申請新連結。")
 
         print(f"[Email 驗證] 嘗試更新客戶 '{username}' 為已驗證狀態。")
-        cursor.execute("UPDATE customers SET is_verified = TRUE, verification_token = NULL, token_expiry = NULL WHERE customer_id = %s", (customer_id,))
-        cursor.connection.commit()
+        await cursor.execute("UPDATE customers SET is_verified = TRUE, verification_token = NULL, token_expiry = NULL WHERE customer_id = %s", (customer_id,))
+        await cursor.connection.commit()
         print(f"✅ [Email 驗證] 客戶 '{username}' Email 已驗證成功並更新資料庫！")
 
         return JSONResponse({"message": "✅ Email 驗證成功！您現在可以登入。"})
@@ -62,8 +62,8 @@ async def resend_verification_email_endpoint(request: Request, cursor=Depends(ge
 
     try:
         print(f"[重新發送驗證信] 收到重新發送請求，Email: {email}")
-        cursor.execute("SELECT customer_id, username, is_verified FROM customers WHERE email = %s", (email,))
-        customer = cursor.fetchone()
+        await cursor.execute("SELECT customer_id, username, is_verified FROM customers WHERE email = %s", (email,))
+        customer = await cursor.fetchone()
 
         if not customer:
             print(f"❌ [重新發送驗證信] Email '{email}' 未註冊或不存在。")
@@ -82,11 +82,11 @@ async def resend_verification_email_endpoint(request: Request, cursor=Depends(ge
         print(f"[重新發送驗證信] 為 Email '{email}' 生成新 token: {verification_token}, 過期時間: {token_expiry}")
 
         # 更新資料庫中的 token 和過期時間
-        cursor.execute(
+        await cursor.execute(
             "UPDATE customers SET verification_token = %s, token_expiry = %s WHERE customer_id = %s",
             (verification_token, token_expiry, customer_id)
         )
-        cursor.connection.commit()
+        await cursor.connection.commit()
         print(f"✅ [重新發送驗證信] 資料庫已更新 Email '{email}' 的驗證 token。")
 
         # 重新發送驗證 Email
@@ -100,6 +100,8 @@ async def resend_verification_email_endpoint(request: Request, cursor=Depends(ge
             print(f"❌ [重新發送驗證信] 重新發送驗證信給 {email} 失敗。")
             return JSONResponse({"error": "重新發送驗證信失敗，請稍後再試。"}, status_code=500)
 
+    except HTTPException as e:
+        raise e
     except Exception as e:
         print(f"❌ [重新發送驗證信] 發生錯誤：{e}")
         return JSONResponse({"error": "內部伺服器錯誤"}, status_code=500)
@@ -108,8 +110,8 @@ async def resend_verification_email_endpoint(request: Request, cursor=Depends(ge
 @router.get("/check-verification-status/{email}")
 async def check_verification_status(email: str, cursor=Depends(get_db_cursor)):
     try:
-        cursor.execute("SELECT is_verified FROM customers WHERE email = %s", (email,))
-        result = cursor.fetchone()
+        await cursor.execute("SELECT is_verified FROM customers WHERE email = %s", (email,))
+        result = await cursor.fetchone()
         
         if not result:
             return JSONResponse({"verified": False, "message": "找不到此 Email。"})
@@ -120,6 +122,8 @@ async def check_verification_status(email: str, cursor=Depends(get_db_cursor)):
             "message": "已驗證成功" if is_verified else "尚未驗證"
         })
         
+    except HTTPException as e:
+        raise e
     except Exception as e:
         print(f"❌ [檢查驗證狀態] 發生錯誤：{e}")
         return JSONResponse(
@@ -0,0 +1,120 @@
+import re
+import time
+import argparse
+from decimal import Decimal
+
+# 由 orders.item_names（"商品名稱 x 數量#商品名稱 x 數量"）回填 order_items（在 backend/app 目錄下執行）：
+#   python -m tools.backfill_order_items                 每批 1,000 筆訂單，每批各自提交
+#   python -m tools.backfill_order_items --sleep 0.2     每批之間暫停，降低對線上資料庫的影響
+#   python -m tools.backfill_order_items --dry-run       只解析並統計，不寫入
+#
+# 可重複執行：已有明細的訂單會略過（包含上線後由 pay() 寫入明細的新訂單）
+# 商品以名稱對應目前的 products（名稱重複或已不存在時 product_id 為 NULL）
+# 單價：訂單只有一種商品時為 金額 ÷ 數量；多種商品時，若以目前售價計算的總額與訂單金額相符才採用，否則為 NULL
+
+import psycopg
+from db.db import _conninfo
+
+ITEM_PATTERN = re.compile(r"^(?P<name>.+) x (?P<quantity>[1-9]\d*)$")
+
+FETCH_ORDERS = """
+    SELECT o.id, o.order_id, o.amount, o.item_names
+    FROM orders o
+    WHERE o.id > %s
+      AND o.item_names IS NOT NULL AND o.item_names <> ''
+      AND NOT EXISTS (SELECT 1 FROM order_items i WHERE i.order_id = o.order_id)
+    ORDER BY o.id
+    LIMIT %s
+"""
+
+INSERT_ITEMS = """
+    INSERT INTO order_items (order_id, line_no, product_id, product_name, quantity, unit_price)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON CONFLICT (order_id, line_no) DO NOTHING
+"""
+
+# 拆解 item_names；商品名稱本身含有 "#" 時，與後段合併直到結尾為 " x 數量"
+def parse_item_names(item_names):
+    items, pending = [], ""
+    for part in item_names.split("#"):
+        pending = f"{pending}#{part}" if pending else part
+        match = ITEM_PATTERN.match(pending.strip())
+        if match:
+            items.append((match["name"], int(match["quantity"])))
+            pending = ""
+    if pending or not items:
+        return None
+    return items
+
+def load_products(conn):
+    products, duplicated = {}, set()
+    for product_id, name, price in conn.execute("SELECT id, name, price FROM products"):
+        if name in products:
+            duplicated.add(name)
+        products[name] = (product_id, price)
+    for name in duplicated:
+        del products[name]
+    return products
+
+def order_lines(order_id, amount, items, products):
+    matched = [products.get(name) for name, _ in items]
+    if len(items) == 1:
+        prices = [(Decimal(amount) / items[0][1]).quantize(Decimal("0.01"))]  # 正式環境 amount 為 INTEGER
+    elif all(matched) and sum(p[1] * quantity for p, (_, quantity) in zip(matched, items)) == amount:
+        prices = [p[1] for p in matched]
+    else:
+        prices = [None] * len(items)
+    return [
+        (order_id, line_no, product[0] if product else None, name, quantity, price)
+        for line_no, ((name, quantity), product, price) in enumerate(zip(items, matched, prices), start=1)
+    ]
+
+def backfill(batch_size, sleep, dry_run):
+    stats = {"orders": 0, "lines": 0, "unmatched": 0, "unpriced": 0, "unparsed": 0}
+    with psycopg.connect(_conninfo()) as conn:
+        products = load_products(conn)
+        print(f"📦 商品名稱對照 {len(products):,} 筆")
+        last_id, start = 0, time.perf_counter()
+        while True:
+            orders = conn.execute(FETCH_ORDERS, (last_id, batch_size)).fetchall()
+            if not orders:
+                break
+            last_id = orders[-1][0]
+            lines = []
+            for _, order_id, amount, item_names in orders:
+                items = parse_item_names(item_names)
+                if items is None:
+                    stats["unparsed"] += 1
+                    print(f"⚠️ 無法解析訂單 {order_id} 的商品：{item_names!r}")
+                    continue
+                rows = order_lines(order_id, amount, items, products)
+                stats["orders"] += 1
+                stats["lines"] += len(rows)
+                stats["unmatched"] += sum(1 for row in rows if row[2] is None)
+                stats["unpriced"] += sum(1 for row in rows if row[5] is None)
+                lines.extend(rows)
+
+            if dry_run:
+                conn.rollback()
+            else:
+                with conn.cursor() as cursor:
+                    cursor.executemany(INSERT_ITEMS, lines)
+                conn.commit()
+            print(f"✅ 已處理至訂單 id {last_id}：累計 {stats['orders']:,} 筆訂單、{stats['lines']:,} 筆明細"
+                  f"（{time.perf_counter() - start:.1f} 秒）")
+            if sleep:
+                time.sleep(sleep)
+    return stats
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="由 orders.item_names 回填 order_items")
+    parser.add_argument("--batch-size", type=int, default=1000, help="每批訂單數")
+    parser.add_argument("--sleep", type=float, default=0, help="每批之間暫停秒數")
+    parser.add_argument("--dry-run", action="store_true", help="只解析並統計，不寫入")
+    args = parser.parse_args()
+
+    stats = backfill(args.batch_size, args.sleep, args.dry_run)
+    print(f"📊 訂單 {stats['orders']:,} 筆、明細 {stats['lines']:,} 筆；"
+          f"對應不到商品 {stats['unmatched']:,} 筆、無法確定單價 {stats['unpriced']:,} 筆、無法解析 {stats['unparsed']:,} 筆訂單")
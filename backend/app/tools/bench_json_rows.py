@@ -0,0 +1,118 @@
+import time
+import argparse
+import json
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+# 列表 API 序列化效能比較（在 backend/app 目錄下執行）：
+#   python -m tools.bench_json_rows              以合成資料比較（預設 100,000 筆）
+#   python -m tools.bench_json_rows --db         改由資料庫 generate_series 產生資料，含取回結果列的成本
+#
+# 舊寫法：DictRow 結果列 → Python 迴圈建立 dict、isoformat() / float() → JSONResponse（標準庫 json）
+# 新寫法：json_rows 游標（dict 結果列、NUMERIC 讀成 float）→ FastJSONResponse（orjson）
+
+from fastapi.responses import JSONResponse
+from db.db import DictRow, _json_cursor, _conninfo
+from utils.json_response import FastJSONResponse
+
+COLUMNS = ["id", "order_id", "amount", "item_names", "status", "created_at", "paid_at"]
+
+DB_QUERY = """
+    SELECT g AS id,
+           to_char(g, 'FM00000000000000000000') AS order_id,
+           (g %% 5000 + 0.5)::numeric(12,2) AS amount,
+           '日本資生堂洗髮精 Shampoo 500ml x ' || (g %% 3 + 1) AS item_names,
+           CASE WHEN g %% 4 = 0 THEN 'pending' ELSE 'success' END AS status,
+           NOW() - g * INTERVAL '1 minute' AS created_at,
+           CASE WHEN g %% 4 = 0 THEN NULL ELSE NOW() - g * INTERVAL '1 minute' + INTERVAL '5 minutes' END AS paid_at
+    FROM generate_series(1, %s) AS g
+"""
+
+def synthetic_rows(n):
+    index = {name: i for i, name in enumerate(COLUMNS)}
+    base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    old, new = [], []
+    for i in range(n):
+        created_at = base + timedelta(minutes=i)
+        paid_at = None if i % 4 == 0 else created_at + timedelta(minutes=5)
+        values = [
+            i, f"{i:020d}", Decimal(f"{i % 5000}.50"), f"日本資生堂洗髮精 Shampoo 500ml x {i % 3 + 1}",
+            "pending" if i % 4 == 0 else "success", created_at, paid_at,
+        ]
+        old.append(DictRow(index, values))
+        new.append(dict(zip(COLUMNS, [float(v) if isinstance(v, Decimal) else v for v in values])))
+    return old, new
+
+def db_rows(n):
+    import psycopg
+    from db.db import dict_row
+    with psycopg.connect(_conninfo()) as conn:
+        start = time.perf_counter()
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(DB_QUERY, (n,))
+            old = cur.fetchall()
+        old_fetch = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with _json_cursor(conn) as cur:
+            cur.execute(DB_QUERY, (n,))
+            new = cur.fetchall()
+        new_fetch = time.perf_counter() - start
+    return old, new, old_fetch, new_fetch
+
+# 原本 admin_get_orders 的轉換方式
+def render_old(rows):
+    formatted = []
+    for row in rows:
+        formatted.append({
+            "id": row[0],
+            "order_id": row[1],
+            "amount": float(row[2]),
+            "item_names": row[3],
+            "status": row[4],
+            "created_at": row[5].isoformat() if row[5] else None,
+            "paid_at": row[6].isoformat() if row[6] else None,
+        })
+    return JSONResponse(formatted).body
+
+def render_new(rows):
+    return FastJSONResponse(rows).body
+
+def best_of(func, rows, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = func(rows)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(body)
+
+def report(name, elapsed, n, size=None):
+    line = f"{name:<28}{elapsed * 1000:>10.1f} ms{elapsed / n * 1e6:>10.2f} µs/列"
+    if size is not None:
+        line += f"{size / 1024 / 1024:>10.1f} MB"
+    print(line)
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="列表 API JSON 序列化效能比較")
+    parser.add_argument("--rows", type=int, default=100_000, help="資料筆數")
+    parser.add_argument("--repeat", type=int, default=5, help="重複次數（取最快一次）")
+    parser.add_argument("--db", action="store_true", help="由資料庫產生資料（需可連線的 PostgreSQL）")
+    args = parser.parse_args()
+
+    print(f"📊 {args.rows:,} 筆，重複 {args.repeat} 次取最快")
+    if args.db:
+        old_rows, new_rows, old_fetch, new_fetch = db_rows(args.rows)
+        report("取回結果列（DictRow）", old_fetch, args.rows)
+        report("取回結果列（json_rows）", new_fetch, args.rows)
+    else:
+        old_rows, new_rows = synthetic_rows(args.rows)
+
+    old_time, old_size = best_of(render_old, old_rows, args.repeat)
+    new_time, new_size = best_of(render_new, new_rows, args.repeat)
+    report("舊：迴圈轉換 + json", old_time, args.rows, old_size)
+    report("新：直接序列化 + orjson", new_time, args.rows, new_size)
+    assert json.loads(render_old(old_rows[:100])) == json.loads(render_new(new_rows[:100])), "兩種寫法輸出不一致"
+    print(f"✅ 序列化加速 {old_time / new_time:.1f} 倍")
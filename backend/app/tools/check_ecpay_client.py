@@ -0,0 +1,181 @@
+import sys
+import asyncio
+import argparse
+
+# 綠界用戶端（utils/ecpay_client.py）重試與斷路器行為檢查（在 backend/app 目錄下執行）：
+#   python -m tools.check_ecpay_client
+#       以 httpx.MockTransport 取代綠界，不連線任何外部服務、不需要資料庫；任一項不符即以非零狀態結束
+#
+# 檢查項目：
+#   1. 非冪等 POST（建立物流單）讀取逾時後不重試（請求可能已送達綠界）
+#   2. 連線失敗（請求未送出）會重試，之後成功即回傳結果
+#   3. 連續失敗達 ECPAY_BREAKER_THRESHOLD 次後斷路器斷開，之後的呼叫不再送出
+#   4. 冷卻後同時只放行一個試探請求；試探成功即關閉斷路器，失敗則再次斷開
+
+import httpx
+from utils import ecpay_client
+from utils.ecpay_client import EcpayTimeout, EcpayUnavailable
+
+BASE_URL = "http://ecpay.invalid"
+PATH = "/Express/Create"
+
+class MockEcpay:
+    def __init__(self, *responses, delay: float = 0):
+        # responses：依序回應的 httpx.Response 或例外，最後一個重複使用
+        self.responses = list(responses)
+        self.delay = delay
+        self.calls = 0
+
+    async def handler(self, request: httpx.Request):
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        response = self.responses[min(self.calls, len(self.responses)) - 1]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+def reset(mock: MockEcpay, threshold: int = 3, cooldown: float = 0.2, max_retries: int = 2):
+    # 每項檢查前重設模組狀態，並縮短退避與冷卻時間
+    ecpay_client._client = httpx.AsyncClient(transport=httpx.MockTransport(mock.handler))
+    ecpay_client._failures = 0
+    ecpay_client._open_until = 0.0
+    ecpay_client._probing = False
+    ecpay_client.ECPAY_BREAKER_THRESHOLD = threshold
+    ecpay_client.ECPAY_BREAKER_COOLDOWN = cooldown
+    ecpay_client.ECPAY_MAX_RETRIES = max_retries
+    ecpay_client.ECPAY_RETRY_BASE_DELAY = 0.001
+    ecpay_client.ECPAY_RETRY_MAX_DELAY = 0.01
+
+async def call(idempotent: bool = False):
+    return await ecpay_client.post_form(PATH, {"MerchantID": "2000132"}, idempotent=idempotent, base_url=BASE_URL)
+
+def ok(text: str = "1|RtnCode=300"):
+    return httpx.Response(200, text=text)
+
+def check(condition: bool, message: str):
+    if not condition:
+        raise AssertionError(message)
+
+async def check_no_retry_after_read_timeout():
+    mock = MockEcpay(httpx.ReadTimeout("read timeout"), ok())
+    reset(mock, threshold=10)
+    try:
+        await call()
+        check(False, "讀取逾時應拋出 EcpayTimeout")
+    except EcpayTimeout:
+        pass
+    check(mock.calls == 1, f"非冪等 POST 逾時後不應重試，實際送出 {mock.calls} 次")
+
+    # 對照：冪等呼叫逾時後會重試
+    mock = MockEcpay(httpx.ReadTimeout("read timeout"), ok())
+    reset(mock, threshold=10)
+    check(await call(idempotent=True) == "1|RtnCode=300", "冪等呼叫重試後應取得回應")
+    check(mock.calls == 2, f"冪等呼叫逾時後應重試一次，實際送出 {mock.calls} 次")
+
+async def check_retry_on_connect_error():
+    mock = MockEcpay(httpx.ConnectError("refused"), httpx.ConnectTimeout("connect timeout"), ok())
+    reset(mock, threshold=10, max_retries=2)
+    check(await call() == "1|RtnCode=300", "連線失敗重試後應取得回應")
+    check(mock.calls == 3, f"連線失敗應重試，實際送出 {mock.calls} 次")
+    check(ecpay_client.breaker_state() == "closed", "成功後斷路器應為關閉")
+
+    # 重試次數用完仍失敗時拋出 EcpayUnavailable
+    mock = MockEcpay(httpx.ConnectError("refused"))
+    reset(mock, threshold=10, max_retries=2)
+    try:
+        await call()
+        check(False, "連線一直失敗應拋出 EcpayUnavailable")
+    except EcpayUnavailable:
+        pass
+    check(mock.calls == 3, f"最多送出 1 + ECPAY_MAX_RETRIES 次，實際送出 {mock.calls} 次")
+
+async def check_breaker_opens():
+    mock = MockEcpay(httpx.Response(503))
+    reset(mock, threshold=3, cooldown=30, max_retries=0)
+    for _ in range(3):
+        try:
+            await call()
+        except EcpayUnavailable:
+            pass
+    check(mock.calls == 3, f"斷開前應送出 3 次，實際送出 {mock.calls} 次")
+    check(ecpay_client.breaker_state() == "open", f"連續失敗 3 次後斷路器應斷開，實際為 {ecpay_client.breaker_state()}")
+
+    try:
+        await call()
+        check(False, "斷路器斷開時應直接拋出 EcpayUnavailable")
+    except EcpayUnavailable:
+        pass
+    check(mock.calls == 3, "斷路器斷開時不應再呼叫綠界")
+
+async def _open_then_cool_down(mock: MockEcpay, cooldown: float):
+    reset(mock, threshold=2, cooldown=cooldown, max_retries=0)
+    for _ in range(2):
+        try:
+            await call()
+        except EcpayUnavailable:
+            pass
+    check(ecpay_client.breaker_state() == "open", "斷路器應已斷開")
+    await asyncio.sleep(cooldown + 0.05)
+    check(ecpay_client.breaker_state() == "half_open", "冷卻後應為半開")
+
+async def check_single_half_open_probe():
+    # 試探成功：同時 5 個呼叫只有 1 個送出，其餘直接失敗；之後斷路器關閉
+    mock = MockEcpay(httpx.Response(503), httpx.Response(503), ok(), delay=0.1)
+    await _open_then_cool_down(mock, cooldown=0.2)
+    results = await asyncio.gather(*(call() for _ in range(5)), return_exceptions=True)
+    sent = mock.calls - 2
+    succeeded = [r for r in results if r == "1|RtnCode=300"]
+    rejected = [r for r in results if isinstance(r, EcpayUnavailable)]
+    check(sent == 1, f"半開時應只放行 1 個試探請求，實際送出 {sent} 次")
+    check(len(succeeded) == 1 and len(rejected) == 4, f"應 1 個成功、4 個被拒，實際為 {results}")
+    check(ecpay_client.breaker_state() == "closed", "試探成功後斷路器應關閉")
+
+    # 試探失敗：再次斷開，冷卻前不再送出
+    mock = MockEcpay(httpx.Response(503), delay=0.1)
+    await _open_then_cool_down(mock, cooldown=0.2)
+    results = await asyncio.gather(*(call() for _ in range(5)), return_exceptions=True)
+    check(mock.calls - 2 == 1, f"半開時應只放行 1 個試探請求，實際送出 {mock.calls - 2} 次")
+    check(all(isinstance(r, EcpayUnavailable) for r in results), f"試探失敗時全部應失敗，實際為 {results}")
+    check(ecpay_client.breaker_state() == "open", "試探失敗後斷路器應再次斷開")
+
+    # 試探請求被取消時釋放名額，下一個呼叫可以再試探
+    mock = MockEcpay(httpx.Response(503), httpx.Response(503), ok(), delay=0.1)
+    await _open_then_cool_down(mock, cooldown=0.2)
+    probe = asyncio.create_task(call())
+    await asyncio.sleep(0.02)
+    probe.cancel()
+    try:
+        await probe
+    except asyncio.CancelledError:
+        pass
+    check(await call() == "1|RtnCode=300", "試探請求被取消後應可再次試探")
+
+CHECKS = [
+    ("非冪等 POST 讀取逾時不重試", check_no_retry_after_read_timeout),
+    ("連線失敗會重試", check_retry_on_connect_error),
+    ("連續失敗後斷路器斷開", check_breaker_opens),
+    ("半開時只放行一個試探請求", check_single_half_open_probe),
+]
+
+async def run() -> int:
+    failed = 0
+    for name, func in CHECKS:
+        try:
+            await func()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}：{e}")
+        finally:
+            await ecpay_client.close_ecpay_client()
+    return failed
+
+def main():
+    argparse.ArgumentParser(description="綠界用戶端重試與斷路器行為檢查").parse_args()
+    failed = asyncio.run(run())
+    print(f"{'❌' if failed else '✅'} {len(CHECKS) - failed}/{len(CHECKS)} 項通過")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,406 @@
+import os
+import time
+import random
+import asyncio
+import argparse
+from datetime import datetime
+
+# 綠界模擬器（壓力測試用，不連線綠界測試環境；在 backend/app 目錄下執行）：
+#   python -m tools.ecpay_simulator serve --port 18000
+#       模擬金流 AioCheckOut，以及物流 Express/Create、Helper/GetStoreList
+#       後端以環境變數指向模擬器：
+#         ECPAY_API_URL=http://127.0.0.1:18000/Cashier/AioCheckOut/V5
+#         ECPAY_LOGISTICS_API_URL=http://127.0.0.1:18000
+#   python -m tools.ecpay_simulator serve --rtn-code 1=90 --rtn-code 10100248=5 --rtn-code 385=5 \
+#       --notify-delay 0.5,2 --duplicate-rate 0.1 --notify-url http://127.0.0.1:8000/api/ecpay/notify
+#       付款結果依權重抽選 RtnCode，延遲 0.5~2 秒後通知 ReturnURL；10% 的通知會重複送出
+#   python -m tools.ecpay_simulator checkout --api http://127.0.0.1:8000 --orders 1000 --concurrency 50
+#       端到端結帳壓測：/api/pay → 模擬器付款 → 等待付款通知更新訂單狀態，統計吞吐量與延遲
+#
+# 執行中可調整設定、查看統計（方便以腳本切換情境）：
+#   curl -X POST localhost:18000/_simulator/config -H 'Content-Type: application/json' -d '{"create_fail_rate": 0.5}'
+#   curl localhost:18000/_simulator/stats
+#   curl -X POST localhost:18000/_simulator/reset
+#
+# CheckMacValue 與後端共用 utils.ecpay；驗證失敗的請求會被拒絕
+# 付款通知與綠界一樣，回應不是 "1|OK" 時視為失敗並重送
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, PlainTextResponse, JSONResponse
+from utils import ecpay
+
+DEFAULT_KEYS = {
+    "2000132": ["5294y06JbISpM5x9", "v77hoKGq4kWxNNIS"],  # 綠界物流測試帳號
+}
+
+RTN_MESSAGES = {
+    "1": "交易成功",
+    "10300066": "交易付款結果待確認中",
+    "385": "交易處理中",
+    "10100248": "拒絕交易",
+    "10100252": "額度不足",
+    "10100254": "交易失敗",
+    "10100251": "卡片過期",
+}
+
+CVS_STORE_PREFIX = {"UNIMART": "1", "FAMI": "0", "HILIFE": "4", "OKMART": "3"}
+
+CONFIG = {
+    "keys": dict(DEFAULT_KEYS),          # MerchantID → [HashKey, HashIV]
+    "rtn_codes": {"1": 1.0},             # 付款結果 RtnCode → 權重
+    "notify_delay": [0.2, 1.0],          # 收到付款後幾秒通知 ReturnURL（最小, 最大）
+    "notify_url": None,                  # 覆寫 ReturnURL（後端的 YOUR_DOMAIN 不是本機時使用）
+    "notify_retries": 3,                 # 回應不是 1|OK 時重送次數
+    "notify_retry_interval": 1.0,
+    "duplicate_rate": 0.0,               # 重複通知的機率
+    "max_duplicates": 2,                 # 重複通知時額外送出 1~N 次
+    "duplicate_spread": 0.5,             # 重複的通知在幾秒內陸續送出
+    "logistics_latency": [0.05, 0.3],    # 物流 API 回應延遲（最小, 最大）
+    "create_fail_rate": 0.0,             # Express/Create 回應 0|錯誤訊息 的機率
+    "create_fail_message": "收件門市已關轉，請重新選擇門市",
+    "http_error_rate": 0.0,              # 物流 API 直接回應 HTTP 503 的機率
+    "stores_per_type": 50,
+}
+
+STATS = {}
+_trade_nos = set()      # 已收到的 MerchantTradeNo（與綠界相同，不可重複）
+_tasks = set()          # 進行中的通知（保留參考，避免被回收）
+_client = None
+
+def reset_stats():
+    STATS.clear()
+    STATS.update({
+        "checkout": 0, "checkout_rejected": 0,
+        "notify_sent": 0, "notify_ok": 0, "notify_retried": 0, "notify_failed": 0, "notify_duplicates": 0,
+        "rtn_codes": {}, "notify_latency": [],
+        "create": 0, "create_failed": 0, "store_list": 0, "logistics_rejected": 0, "http_errors": 0,
+    })
+    _trade_nos.clear()
+
+reset_stats()
+
+# 驗證 CheckMacValue；回傳錯誤訊息，驗證通過時回傳 None
+def verify(params: dict):
+    keys = CONFIG["keys"].get(params.get("MerchantID"))
+    if not keys:
+        return "MerchantID 不存在"
+    if not ecpay.verify(params, *keys):
+        return "CheckMacValue Error"
+    return None
+
+def sign(params: dict) -> dict:
+    return ecpay.sign(params, *CONFIG["keys"][params["MerchantID"]])
+
+def _get_client():
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(timeout=10, limits=httpx.Limits(max_connections=200))
+    return _client
+
+async def _logistics_delay():
+    await asyncio.sleep(random.uniform(*CONFIG["logistics_latency"]))
+    if random.random() < CONFIG["http_error_rate"]:
+        STATS["http_errors"] += 1
+        return True
+    return False
+
+# 送出一次付款通知；與綠界相同，回應不是 1|OK 時間隔一段時間重送
+async def _post_notify(url: str, payload: dict, delay: float):
+    await asyncio.sleep(delay)
+    for attempt in range(CONFIG["notify_retries"] + 1):
+        if attempt:
+            STATS["notify_retried"] += 1
+            await asyncio.sleep(CONFIG["notify_retry_interval"])
+        STATS["notify_sent"] += 1
+        start = time.perf_counter()
+        try:
+            resp = await _get_client().post(url, data=payload)
+            if resp.text.strip() == "1|OK":
+                STATS["notify_ok"] += 1
+                STATS["notify_latency"].append(time.perf_counter() - start)
+                return
+            print(f"⚠️ [模擬器] {payload['MerchantTradeNo']} 通知回應不是 1|OK：HTTP {resp.status_code} {resp.text[:80]!r}")
+        except httpx.HTTPError as e:
+            print(f"⚠️ [模擬器] {payload['MerchantTradeNo']} 通知失敗：{e!r}")
+    STATS["notify_failed"] += 1
+
+async def _deliver_payment(form: dict):
+    await asyncio.sleep(random.uniform(*CONFIG["notify_delay"]))
+    codes = CONFIG["rtn_codes"]
+    rtn_code = random.choices(list(codes), weights=list(codes.values()))[0]
+    STATS["rtn_codes"][rtn_code] = STATS["rtn_codes"].get(rtn_code, 0) + 1
+    now = datetime.now()
+    payload = sign({
+        "MerchantID": form["MerchantID"],
+        "MerchantTradeNo": form["MerchantTradeNo"],
+        "StoreID": form.get("StoreID", ""),
+        "RtnCode": rtn_code,
+        "RtnMsg": RTN_MESSAGES.get(rtn_code, "交易失敗"),
+        "TradeNo": now.strftime("%y%m%d%H%M%S") + f"{random.randint(0, 99999999):08d}",
+        "TradeAmt": form["TotalAmount"],
+        "PaymentDate": now.strftime("%Y/%m/%d %H:%M:%S"),
+        "PaymentType": "Credit_CreditCard",
+        "PaymentTypeChargeFee": "0",
+        "TradeDate": form["MerchantTradeDate"],
+        "SimulatePaid": "0",
+        "CustomField1": form.get("CustomField1", ""),
+        "CustomField2": form.get("CustomField2", ""),
+        "CustomField3": form.get("CustomField3", ""),
+        "CustomField4": form.get("CustomField4", ""),
+    })
+    url = CONFIG["notify_url"] or form["ReturnURL"]
+
+    copies = 1
+    if random.random() < CONFIG["duplicate_rate"]:
+        copies += random.randint(1, CONFIG["max_duplicates"])
+        STATS["notify_duplicates"] += copies - 1
+    delays = [0] + [random.uniform(0, CONFIG["duplicate_spread"]) for _ in range(copies - 1)]
+    await asyncio.gather(*(_post_notify(url, payload, delay) for delay in delays))
+
+def create_app():
+    app = FastAPI()
+
+    # 金流：建立訂單（瀏覽器表單 POST），之後非同步通知 ReturnURL
+    @app.post("/Cashier/AioCheckOut/V5")
+    async def aio_check_out(request: Request):
+        form = dict(await request.form())
+        error = verify(form)
+        required = ["MerchantTradeNo", "MerchantTradeDate", "PaymentType", "TotalAmount",
+                    "TradeDesc", "ItemName", "ReturnURL", "ChoosePayment"]
+        if not error:
+            missing = [k for k in required if not form.get(k)]
+            if missing:
+                error = f"缺少參數：{', '.join(missing)}"
+            elif not str(form["TotalAmount"]).isdigit():
+                error = "TotalAmount 必須為整數"
+            elif len(form["MerchantTradeNo"]) > 20:
+                error = "MerchantTradeNo 長度超過 20"
+            elif form["MerchantTradeNo"] in _trade_nos:
+                error = "訂單編號重複"
+        if error:
+            STATS["checkout_rejected"] += 1
+            return PlainTextResponse(error, status_code=400)
+
+        _trade_nos.add(form["MerchantTradeNo"])
+        STATS["checkout"] += 1
+        task = asyncio.create_task(_deliver_payment(form))
+        _tasks.add(task)
+        task.add_done_callback(_tasks.discard)
+        return HTMLResponse(f"<html><body>模擬付款中：{form['MerchantTradeNo']}（{form['TotalAmount']} 元）</body></html>")
+
+    # 物流：建立物流單；成功回應「1|參數=值&...」，失敗回應「0|錯誤訊息」
+    @app.post("/Express/Create")
+    async def express_create(request: Request):
+        form = dict(await request.form())
+        if await _logistics_delay():
+            return PlainTextResponse("Service Unavailable", status_code=503)
+        error = verify(form)
+        if error:
+            STATS["logistics_rejected"] += 1
+            return PlainTextResponse(f"0|{error}")
+        if random.random() < CONFIG["create_fail_rate"]:
+            STATS["create_failed"] += 1
+            return PlainTextResponse(f"0|{CONFIG['create_fail_message']}")
+
+        STATS["create"] += 1
+        result = sign({
+            "MerchantID": form["MerchantID"],
+            "MerchantTradeNo": form.get("MerchantTradeNo", ""),
+            "AllPayLogisticsID": str(random.randint(1000000, 9999999)),
+            "LogisticsType": form.get("LogisticsType", "CVS"),
+            "LogisticsSubType": form.get("LogisticsSubType", ""),
+            "GoodsAmount": form.get("GoodsAmount", "0"),
+            "ReceiverName": form.get("ReceiverName", ""),
+            "ReceiverCellPhone": form.get("ReceiverCellPhone", ""),
+            "CVSPaymentNo": f"{random.randint(0, 99999999):08d}",
+            "CVSValidationNo": f"{random.randint(0, 9999):04d}",
+            "BookingNote": "",
+            "RtnCode": "300",
+            "RtnMsg": "訂單處理中(已收到訂單資料)",
+            "UpdateStatusDate": datetime.now().strftime("%Y/%m/%d %H:%M:%S"),
+        })
+        return PlainTextResponse("1|" + "&".join(f"{k}={v}" for k, v in result.items()))
+
+    # 物流：超商門市清單（門市資料為固定產生的假資料）
+    @app.post("/Helper/GetStoreList")
+    async def get_store_list(request: Request):
+        form = dict(await request.form())
+        if await _logistics_delay():
+            return PlainTextResponse("Service Unavailable", status_code=503)
+        error = verify(form)
+        if error:
+            STATS["logistics_rejected"] += 1
+            return JSONResponse({"RtnCode": 0, "RtnMsg": error, "StoreList": []})
+
+        STATS["store_list"] += 1
+        cvs_types = [form["CvsType"]] if form.get("CvsType") in CVS_STORE_PREFIX else list(CVS_STORE_PREFIX)
+        return JSONResponse({
+            "RtnCode": 1,
+            "RtnMsg": "成功",
+            "StoreList": [
+                {
+                    "CvsType": cvs_type,
+                    "StoreInfo": [
+                        {
+                            "StoreId": f"{CVS_STORE_PREFIX[cvs_type]}{i:05d}",
+                            "StoreName": f"模擬{cvs_type}第{i}門市",
+                            "StoreAddr": f"台北市中正區模擬路{i}號",
+                            "StorePhone": f"02{i:08d}",
+                        }
+                        for i in range(1, CONFIG["stores_per_type"] + 1)
+                    ],
+                }
+                for cvs_type in cvs_types
+            ],
+        })
+
+    @app.get("/_simulator/stats")
+    async def stats():
+        latency = sorted(STATS["notify_latency"])
+        result = {k: v for k, v in STATS.items() if k != "notify_latency"}
+        result["notify_pending"] = len(_tasks)
+        result["notify_latency_ms"] = {
+            "p50": round(_percentile(latency, 50) * 1000, 1),
+            "p95": round(_percentile(latency, 95) * 1000, 1),
+            "max": round(latency[-1] * 1000, 1) if latency else 0,
+        }
+        return result
+
+    @app.post("/_simulator/config")
+    async def update_config(request: Request):
+        data = await request.json()
+        unknown = [k for k in data if k not in CONFIG]
+        if unknown:
+            return JSONResponse({"error": f"未知的設定：{', '.join(unknown)}"}, status_code=400)
+        CONFIG.update(data)
+        return {k: v for k, v in CONFIG.items() if k != "keys"}
+
+    @app.post("/_simulator/reset")
+    async def reset():
+        reset_stats()
+        return {"message": "統計已重設"}
+
+    return app
+
+def _percentile(values, p):
+    if not values:
+        return 0
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+# 端到端結帳壓測：每筆訂單依序 /api/pay → 模擬器付款 → 輪詢訂單狀態直到不再是 pending
+async def checkout(args):
+    results = {"pay": [], "settled": [], "status": {}, "errors": 0, "timeouts": 0}
+    products = [{"id": args.product_id, "quantity": 1}]
+    order_body = {
+        "products": products, "delivery_type": "home", "address": "壓測地址",
+        "recipient_name": "壓測", "recipient_phone": "0900000000",
+    }
+    queue = asyncio.Queue()
+    for _ in range(args.orders):
+        queue.put_nowait(None)
+
+    async def run_one(client):
+        start = time.perf_counter()
+        resp = await client.post(f"{args.api}/api/pay", json=order_body)
+        if resp.status_code != 200:
+            results["errors"] += 1
+            print(f"❌ /api/pay HTTP {resp.status_code}：{resp.text[:120]}")
+            return
+        data = resp.json()
+        results["pay"].append(time.perf_counter() - start)
+        resp = await client.post(data["ecpay_url"], data=data["params"])
+        if resp.status_code != 200:
+            results["errors"] += 1
+            print(f"❌ 模擬器拒絕付款：{resp.text[:120]}")
+            return
+        deadline = start + args.timeout
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(args.poll_interval)
+            resp = await client.get(f"{args.api}/api/orders/{data['order_id']}/status")
+            if resp.status_code != 200:
+                continue
+            status = resp.json().get("status")
+            if status != "pending":
+                results["settled"].append(time.perf_counter() - start)
+                results["status"][status] = results["status"].get(status, 0) + 1
+                return
+        results["timeouts"] += 1
+
+    async def worker(client):
+        while not queue.empty():
+            queue.get_nowait()
+            try:
+                await run_one(client)
+            except httpx.HTTPError as e:
+                results["errors"] += 1
+                print(f"❌ 請求失敗：{e!r}")
+
+    start = time.perf_counter()
+    async with httpx.AsyncClient(timeout=30, limits=httpx.Limits(max_connections=args.concurrency)) as client:
+        await asyncio.gather(*(worker(client) for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    pay, settled = sorted(results["pay"]), sorted(results["settled"])
+    print(f"📊 {args.orders:,} 筆訂單，並行 {args.concurrency}，耗時 {elapsed:.1f} 秒")
+    print(f"   完成付款 {len(settled):,} 筆（{len(settled) / elapsed:.1f} 筆/秒），狀態：{results['status']}")
+    print(f"   錯誤 {results['errors']:,} 筆、等待逾時 {results['timeouts']:,} 筆")
+    print(f"   /api/pay        p50 {_percentile(pay, 50) * 1000:.0f} ms、p95 {_percentile(pay, 95) * 1000:.0f} ms")
+    print(f"   下單至付款完成  p50 {_percentile(settled, 50) * 1000:.0f} ms、p95 {_percentile(settled, 95) * 1000:.0f} ms")
+
+def _range(value):
+    low, _, high = value.partition(",")
+    return [float(low), float(high or low)]
+
+def _weight(value):
+    code, _, weight = value.partition("=")
+    return code, float(weight or 1)
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="綠界金流 / 物流模擬器")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="啟動模擬器")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=18000)
+    serve.add_argument("--rtn-code", type=_weight, action="append", help="付款結果與權重，例如 1=90（可重複指定）")
+    serve.add_argument("--notify-delay", type=_range, default=CONFIG["notify_delay"], help="通知延遲秒數：最小,最大")
+    serve.add_argument("--notify-url", help="覆寫付款通知網址（預設為 ReturnURL）")
+    serve.add_argument("--notify-retries", type=int, default=CONFIG["notify_retries"])
+    serve.add_argument("--duplicate-rate", type=float, default=CONFIG["duplicate_rate"], help="重複通知的機率")
+    serve.add_argument("--max-duplicates", type=int, default=CONFIG["max_duplicates"])
+    serve.add_argument("--logistics-latency", type=_range, default=CONFIG["logistics_latency"], help="物流 API 延遲秒數：最小,最大")
+    serve.add_argument("--create-fail-rate", type=float, default=CONFIG["create_fail_rate"])
+    serve.add_argument("--http-error-rate", type=float, default=CONFIG["http_error_rate"])
+
+    bench = commands.add_parser("checkout", help="端到端結帳壓測")
+    bench.add_argument("--api", default="http://127.0.0.1:8000", help="後端網址")
+    bench.add_argument("--orders", type=int, default=100)
+    bench.add_argument("--concurrency", type=int, default=10)
+    bench.add_argument("--product-id", type=int, default=1)
+    bench.add_argument("--timeout", type=float, default=30, help="每筆訂單等待付款結果的秒數")
+    bench.add_argument("--poll-interval", type=float, default=0.2)
+    args = parser.parse_args()
+
+    if args.command == "checkout":
+        asyncio.run(checkout(args))
+    else:
+        # 後端 .env 設定的金流特店也能通過驗證
+        if os.getenv("ECPAY_MERCHANT_ID"):
+            CONFIG["keys"][os.getenv("ECPAY_MERCHANT_ID")] = [os.getenv("ECPAY_HASH_KEY"), os.getenv("ECPAY_HASH_IV")]
+        CONFIG.update(
+            rtn_codes=dict(args.rtn_code) if args.rtn_code else CONFIG["rtn_codes"],
+            notify_delay=args.notify_delay,
+            notify_url=args.notify_url,
+            notify_retries=args.notify_retries,
+            duplicate_rate=args.duplicate_rate,
+            max_duplicates=args.max_duplicates,
+            logistics_latency=args.logistics_latency,
+            create_fail_rate=args.create_fail_rate,
+            http_error_rate=args.http_error_rate,
+        )
+        print(f"✅ [模擬器] http://{args.host}:{args.port}  付款結果權重：{CONFIG['rtn_codes']}")
+        uvicorn.run(create_app(), host=args.host, port=args.port, log_level="warning")
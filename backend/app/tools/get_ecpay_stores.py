@@ -0,0 +1,61 @@
+import os
+import json
+import argparse
+import httpx
+from utils import ecpay
+
+# 下載綠界超商門市清單，產生前端選擇門市用的 all_cvs_stores.json（在 backend/app 目錄下執行）：
+#   python -m tools.get_ecpay_stores                                  寫入 clevora-vue/public/all_cvs_stores.json
+#   ECPAY_LOGISTICS_API_URL=http://127.0.0.1:18000 python -m tools.get_ecpay_stores --output /tmp/stores.json
+#                                                                     改向本機模擬器（tools.ecpay_simulator）取得
+
+merchant_id = "2000132"  # 綠界測試帳號
+hash_key = "5294y06JbISpM5x9"
+hash_iv = "v77hoKGq4kWxNNIS"
+
+cvs_types = {
+    "7-11": "UNIMART",
+    "全家": "FAMI",
+    "萊爾富": "HILIFE",
+    "OK超商": "OKMART"
+}
+
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(__file__), "..", "..", "..", "clevora-vue", "public", "all_cvs_stores.json")
+
+def fetch_stores():
+    url = os.getenv("ECPAY_LOGISTICS_API_URL", "https://logistics-stage.ecpay.com.tw").rstrip("/") + "/Helper/GetStoreList"
+    all_stores = []
+    for cvs_name, cvs_type in cvs_types.items():
+        params = ecpay.sign({
+            "MerchantID": merchant_id,
+            "CvsType": cvs_type,
+            "PlatformID": ""
+        }, hash_key, hash_iv)
+        resp = httpx.post(url, data=params, timeout=30)
+        resp.raise_for_status()
+        stores = [
+            {
+                "cvs": cvs_name,
+                "id": info["StoreId"],
+                "store": info["StoreName"],
+                "address": info["StoreAddr"],
+                "phone": info["StorePhone"]
+            }
+            for store in resp.json()["StoreList"] if store["CvsType"] == cvs_type
+            for info in store["StoreInfo"]
+        ]
+        all_stores.extend(stores)
+        print(f"{cvs_name} 門市數量：{len(stores)}")
+    return all_stores
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="下載綠界超商門市清單")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="輸出的 JSON 檔")
+    args = parser.parse_args()
+
+    all_stores = fetch_stores()
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(all_stores, f, ensure_ascii=False, indent=2)
+    print(f"✅ 已儲存所有超商門市到 {os.path.normpath(args.output)}，總數：{len(all_stores)}")
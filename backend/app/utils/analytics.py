@@ -0,0 +1,241 @@
+import os
+import time
+import asyncio
+import psycopg
+import numpy as np
+from datetime import datetime, date, timedelta, timezone
+from db.db import _read_only_conninfo
+
+# 銷售分析（行程內欄式資料）：
+#   定期把訂單、訂單明細與出貨單載入記憶體，每個欄位存成一個緊湊的 NumPy 陣列，
+#   分組與時間區間統計以向量化運算（布林遮罩 + np.bincount）完成，不再對資料庫做分析型全表掃描
+#   - 載入走唯讀副本（副本不健康時才走主庫），以具名游標分批讀取，並在執行緒中進行，不阻塞事件迴圈
+#   - 文字欄位（狀態、配送方式、超商、分類、商品）存成整數代碼，另存代碼 → 文字對照表
+#   - 時間一律換算成台灣時間的日期 / 小時
+#   - 商品分類可有多個（以「#」分隔），拆開後另存 (資料列, 分類代碼) 配對；依分類分組時每個分類各計一次，
+#     多分類商品的明細會出現在多個分類，各分類加總可能大於 total
+#   - created_at 為 NULL 的資料（0020 之前的正式環境資料庫）無法換算日期，載入時略過
+ANALYTICS_REFRESH_INTERVAL = float(os.getenv("ANALYTICS_REFRESH_INTERVAL", 300))  # 每 5 分鐘重新載入
+ANALYTICS_BATCH_SIZE = int(os.getenv("ANALYTICS_BATCH_SIZE", 10000))
+
+TAIPEI_OFFSET = 8 * 3600  # 台灣時間（固定 UTC+8）
+EPOCH = date(1970, 1, 1)
+
+# 資料集：查詢第一欄為 created_at 的 epoch 秒數，其後依序為 numeric 欄位、categorical 欄位
+# multi_valued：以「#」分隔多個值的 categorical 欄位
+DATASETS = {
+    "orders": {
+        "label": "訂單",
+        "query": """
+            SELECT FLOOR(EXTRACT(EPOCH FROM created_at))::bigint, amount::float8, status, delivery_type, cvs_type
+            FROM orders
+            WHERE created_at IS NOT NULL
+        """,
+        "numeric": ["amount"],
+        "categorical": ["status", "delivery_type", "cvs_type"],
+    },
+    # 訂單明細（order_items）：依商品、分類統計銷量與銷售額；單價不明的回填明細銷售額計為 0
+    "items": {
+        "label": "訂單明細",
+        "query": """
+            SELECT FLOOR(EXTRACT(EPOCH FROM o.created_at))::bigint,
+                   i.quantity::float8,
+                   COALESCE(i.quantity * i.unit_price, 0)::float8,
+                   o.status, o.delivery_type,
+                   p.category, i.product_name
+            FROM order_items i
+            JOIN orders o ON o.order_id = i.order_id
+            LEFT JOIN products p ON p.id = i.product_id
+            WHERE o.created_at IS NOT NULL
+        """,
+        "numeric": ["quantity", "amount"],
+        "categorical": ["status", "delivery_type", "category", "product"],
+        "multi_valued": ["category"],
+    },
+    "shipments": {
+        "label": "出貨單",
+        "query": """
+            SELECT FLOOR(EXTRACT(EPOCH FROM created_at))::bigint, status, delivery_type, cvs_type
+            FROM shipments
+            WHERE created_at IS NOT NULL
+        """,
+        "numeric": [],
+        "categorical": ["status", "delivery_type", "cvs_type"],
+    },
+}
+TIME_DIMENSIONS = ("hour", "weekday", "day", "month")
+
+_snapshot = None             # 目前使用中的資料（整份替換，查詢中不會讀到一半的資料）
+_load_lock = asyncio.Lock()
+_refresh_task = None
+
+# 文字欄位轉成整數代碼；index 為跨批次共用的 文字 → 代碼 對照
+def _encode(values, index):
+    return np.fromiter((index.setdefault(v, len(index)) for v in values), dtype=np.int32, count=len(values))
+
+# 以「#」分隔的多值欄位拆開後轉成代碼，回傳 (資料列編號, 代碼)；offset 為這一批第一筆的資料列編號
+# 沒有任何值（NULL 或空字串）的資料列仍保留一筆 None，與單值欄位的 NULL 相同
+def _encode_tags(values, index, offset):
+    rows, tags = [], []
+    for row, value in enumerate(values, start=offset):
+        for tag in [t for t in (value or "").split("#") if t] or [None]:
+            rows.append(row)
+            tags.append(tag)
+    return np.array(rows, dtype=np.int32), _encode(tags, index)
+
+def _load_dataset(conn, name, spec):
+    numeric, categorical = spec["numeric"], spec["categorical"]
+    multi_valued = spec.get("multi_valued", [])
+    indexes = {column: {} for column in categorical}
+    chunks = {column: [] for column in ["created_at", *numeric, *categorical, *(f"{c}_rows" for c in multi_valued)]}
+    loaded = 0
+    with conn.cursor(name=f"analytics_{name}") as cursor:
+        cursor.itersize = ANALYTICS_BATCH_SIZE
+        cursor.execute(spec["query"])
+        while True:
+            batch = cursor.fetchmany(ANALYTICS_BATCH_SIZE)
+            if not batch:
+                break
+            columns = list(zip(*batch))
+            chunks["created_at"].append(np.array(columns[0], dtype=np.int64))
+            for i, column in enumerate(numeric, start=1):
+                chunks[column].append(np.array(columns[i], dtype=np.float64))
+            for i, column in enumerate(categorical, start=1 + len(numeric)):
+                if column in multi_valued:
+                    rows, codes = _encode_tags(columns[i], indexes[column], loaded)
+                    chunks[f"{column}_rows"].append(rows)
+                    chunks[column].append(codes)
+                else:
+                    chunks[column].append(_encode(columns[i], indexes[column]))
+            loaded += len(batch)
+
+    data = {}
+    for column, parts in chunks.items():
+        dtype = np.int64 if column == "created_at" else np.float64 if column in numeric else np.int32
+        data[column] = np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+
+    # 預先算好台灣時間的日期（距 1970-01-01 天數）、小時、月份（距 1970-01 月數）
+    local = data.pop("created_at") + TAIPEI_OFFSET
+    data["day"] = (local // 86400).astype(np.int32)
+    data["hour"] = (local % 86400 // 3600).astype(np.int8)
+    data["month"] = data["day"].astype("datetime64[D]").astype("datetime64[M]").astype(np.int32)
+    data["labels"] = {column: list(indexes[column]) for column in categorical}
+    data["rows"] = len(local)
+    return data
+
+def _load_snapshot():
+    start = time.perf_counter()
+    with psycopg.connect(_read_only_conninfo()) as conn:
+        conn.read_only = True
+        snapshot = {name: _load_dataset(conn, name, spec) for name, spec in DATASETS.items()}
+    snapshot["loaded_at"] = datetime.now(timezone.utc)
+    counts = "、".join(f"{spec['label']} {snapshot[name]['rows']:,} 筆" for name, spec in DATASETS.items())
+    print(f"✅ [分析] 已載入 {counts}（{time.perf_counter() - start:.1f} 秒）")
+    return snapshot
+
+async def refresh():
+    global _snapshot
+    _snapshot = await asyncio.to_thread(_load_snapshot)
+
+# 取得目前的資料；尚未載入過時先載入（同時只會有一個載入）
+async def get_snapshot():
+    if _snapshot is None:
+        async with _load_lock:
+            if _snapshot is None:
+                await refresh()
+    return _snapshot
+
+async def _refresh_forever():
+    while True:
+        try:
+            async with _load_lock:
+                await refresh()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # 載入失敗時沿用上一份資料
+            print(f"❌ [分析] 載入資料失敗：{e}")
+        await asyncio.sleep(ANALYTICS_REFRESH_INTERVAL)
+
+def start_analytics():
+    global _refresh_task
+    if _refresh_task is None:
+        _refresh_task = asyncio.create_task(_refresh_forever())
+
+async def stop_analytics():
+    global _refresh_task
+    if _refresh_task:
+        _refresh_task.cancel()
+        try:
+            await _refresh_task
+        except asyncio.CancelledError:
+            pass
+        _refresh_task = None
+
+# 分組依據 → (每筆資料的分組編號, 各編號的標籤, 對應的資料列)
+# 資料列用來取 numeric 欄位的值；多值欄位的一筆資料可有多個分組編號，資料列為配對中的資料列編號
+def _group_keys(data, by, mask):
+    if by == "hour":
+        return data["hour"][mask], list(range(24)), mask
+    if by == "weekday":
+        # 1970-01-01 為星期四；標籤為 ISO 星期（1 = 星期一 … 7 = 星期日）
+        return (data["day"][mask] + 3) % 7, list(range(1, 8)), mask
+    if by in ("day", "month"):
+        values = data[by][mask]
+        if len(values) == 0:
+            return values, [], mask
+        low = int(values.min())
+        if by == "day":
+            labels = [(EPOCH + timedelta(days=low + i)).isoformat() for i in range(int(values.max()) - low + 1)]
+        else:
+            labels = [str(np.datetime64(low + i, "M")) for i in range(int(values.max()) - low + 1)]
+        return values - low, labels, mask
+    if f"{by}_rows" in data:
+        selected = mask[data[f"{by}_rows"]]
+        return data[by][selected], data["labels"][by], data[f"{by}_rows"][selected]
+    return data[by][mask], data["labels"][by], mask
+
+def dimensions(dataset: str):
+    return TIME_DIMENSIONS + tuple(DATASETS[dataset]["categorical"])
+
+# 依 by 分組統計筆數與各 numeric 欄位的合計
+# date_from / date_to 為台灣時間的日期（含當日）；filters 為 {分類欄位: 文字值}，空值表示不篩選
+# 時間分組回傳連續的區間（無資料為 0），分類分組只回傳有資料的項目
+def group_by(snapshot, dataset: str, by: str, date_from=None, date_to=None, filters=None):
+    data = snapshot[dataset]
+    mask = np.ones(data["rows"], dtype=bool)
+    if date_from:
+        mask &= data["day"] >= (date_from - EPOCH).days
+    if date_to:
+        mask &= data["day"] <= (date_to - EPOCH).days
+    for column, value in (filters or {}).items():
+        if value:
+            labels = data["labels"][column]
+            matched = data[column] == (labels.index(value) if value in labels else -1)
+            if f"{column}_rows" in data:
+                # 多值欄位：任一個值符合即保留該筆資料
+                rows = np.zeros(data["rows"], dtype=bool)
+                rows[data[f"{column}_rows"][matched]] = True
+                matched = rows
+            mask &= matched
+
+    keys, labels, selected = _group_keys(data, by, mask)
+    counts = np.bincount(keys, minlength=len(labels))
+    sums = {
+        column: np.bincount(keys, weights=data[column][selected], minlength=len(labels))
+        for column in DATASETS[dataset]["numeric"]
+    }
+
+    groups = []
+    for i, label in enumerate(labels):
+        if counts[i] == 0 and by not in TIME_DIMENSIONS:
+            continue
+        group = {"key": label, "count": int(counts[i])}
+        for column, values in sums.items():
+            group[column] = round(float(values[i]), 2)
+        groups.append(group)
+
+    total = {"count": int(mask.sum())}
+    for column in sums:
+        total[column] = round(float(data[column][mask].sum()), 2)
+    return {"by": by, "groups": groups, "total": total, "loaded_at": snapshot["loaded_at"]}
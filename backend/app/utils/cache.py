@@ -0,0 +1,218 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict
+
+# 行程內快取：每筆資料有存活時間 (TTL)，超過 max_size 時淘汰最久未使用的資料 (LRU)
+# 同一個 key 同時有多個請求未命中時，只有第一個請求會執行 loader 查詢資料庫，其他請求等待同一個結果
+class TTLCache:
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data = OrderedDict()   # key -> (到期時間, 值)
+        self._loading = {}           # key -> 載入中的 Future
+        self._generation = 0         # 每次 clear() 遞增，清除前開始的載入結果不寫回快取
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return entry[1]
+
+    def set(self, key, value):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def delete(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._generation += 1
+        self._data.clear()
+
+    async def get_or_load(self, key, loader):
+        entry = self._data.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._data.move_to_end(key)
+            return entry[1]
+        return await self._load(key, loader)
+
+    # 一次取得多個 key：未命中的 key 交給 loader(未命中的 keys) 一次載入，回傳 {key: 值}
+    # loader 回傳的 dict 不含某個 key 表示查無資料（不寫入快取）
+    async def get_many_or_load(self, keys, loader):
+        found, missing = {}, []
+        for key in keys:
+            value = self.get(key)
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            generation = self._generation
+            loaded = await loader(missing)
+            if generation == self._generation:
+                for key, value in loaded.items():
+                    self.set(key, value)
+            found.update(loaded)
+        return found
+
+    # 執行 loader 並寫回快取；同一個 key 同時只會有一個 loader 在執行
+    async def _load(self, key, loader):
+        # 已有請求在載入同一個 key：等待它的結果
+        while key in self._loading:
+            future = self._loading[key]
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # 負責載入的請求被取消（例如前端斷線），改由自己重新載入
+
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())  # 沒有等待者時不顯示警告
+        self._loading[key] = future
+        generation = self._generation
+        try:
+            value = await loader()
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            self._loading.pop(key, None)
+
+        if generation == self._generation:
+            self.set(key, value)
+        future.set_result(value)
+        return value
+
+# Stale-while-revalidate 快取：資料超過 ttl 後仍可在 stale_ttl 內回傳舊值，同時在背景重新載入，
+# 請求不必等待查詢；超過 ttl + stale_ttl 才視為未命中
+# start_refresh() 啟動背景工作，定期重新載入最近 hot_window 秒內有人讀取、即將過期的 key，
+# 熱門資料因此一直維持新鮮，冷門資料則自然過期淘汰
+class RefreshingCache(TTLCache):
+    def __init__(self, ttl: float, stale_ttl: float, max_size: int, hot_window: float):
+        super().__init__(ttl=ttl + stale_ttl, max_size=max_size)
+        self.fresh_ttl = ttl
+        self.hot_window = hot_window
+        self._fresh_until = {}    # key -> 新鮮期限
+        self._last_access = {}    # key -> 最後讀取時間
+        self._loaders = {}        # key -> loader（背景重新載入用）
+        self._background = set()  # 執行中的背景重新載入（保留參考避免被回收）
+        self._refresh_task = None
+
+    def set(self, key, value):
+        super().set(key, value)
+        self._fresh_until[key] = time.monotonic() + self.fresh_ttl
+        self._forget_evicted()
+
+    def delete(self, key):
+        super().delete(key)
+        self._forget_evicted()
+
+    def clear(self):
+        super().clear()
+        self._fresh_until.clear()
+        self._last_access.clear()
+        self._loaders.clear()
+
+    # 只保留仍在快取中的 key 的附帶資訊
+    def _forget_evicted(self):
+        if len(self._loaders) > len(self._data):
+            for key in [k for k in self._loaders if k not in self._data]:
+                self._loaders.pop(key, None)
+                self._fresh_until.pop(key, None)
+                self._last_access.pop(key, None)
+
+    async def get_or_load(self, key, loader):
+        now = time.monotonic()
+        self._last_access[key] = now
+        self._loaders[key] = loader
+        entry = self._data.get(key)
+        if entry is None or entry[0] <= now:
+            return await self._load(key, loader)
+        self._data.move_to_end(key)
+        if self._fresh_until.get(key, 0) <= now:
+            self._refresh_in_background(key, loader)
+        return entry[1]
+
+    def _refresh_in_background(self, key, loader):
+        if key not in self._loading:
+            task = asyncio.create_task(self._refresh(key, loader))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+
+    async def _refresh(self, key, loader):
+        try:
+            await self._load(key, loader)
+        except Exception as e:
+            # 重新載入失敗時保留舊值，下次讀取再試
+            print(f"⚠️ [快取] 背景重新載入 {key} 失敗：{e}")
+
+    async def _refresh_forever(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            for key, loader in list(self._loaders.items()):
+                if now - self._last_access.get(key, 0) > self.hot_window:
+                    continue
+                if self._fresh_until.get(key, 0) - now <= interval:
+                    self._refresh_in_background(key, loader)
+
+    def start_refresh(self, interval: float):
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_forever(interval))
+
+    async def stop_refresh(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+# 商品目錄快取（/api/products 與 /api/products/{id}）
+# 後台新增、編輯、刪除商品時清除；其他 Pod 透過 PostgreSQL NOTIFY catalog_changed 同步清除
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", 60))
+CATALOG_CACHE_SIZE = int(os.getenv("CATALOG_CACHE_SIZE", 1000))
+
+catalog_cache = TTLCache(ttl=CATALOG_CACHE_TTL, max_size=CATALOG_CACHE_SIZE)
+
+# 商品價格（結帳計價用，utils/pricing.py），與商品目錄快取同時清除
+PRICE_CACHE_TTL = float(os.getenv("PRICE_CACHE_TTL", 60))
+PRICE_CACHE_SIZE = int(os.getenv("PRICE_CACHE_SIZE", 10000))
+
+price_cache = TTLCache(ttl=PRICE_CACHE_TTL, max_size=PRICE_CACHE_SIZE)
+
+# 商品異動時清除商品相關快取（後台異動後直接呼叫；其他 Pod 由 NOTIFY catalog_changed 觸發）
+def clear_catalog_caches():
+    catalog_cache.clear()
+    price_cache.clear()
+
+# 顧客訂單大約筆數（訂單歷史第一頁計算），僅供顯示，過期前不另外清除
+ORDER_COUNT_CACHE_TTL = float(os.getenv("ORDER_COUNT_CACHE_TTL", 600))
+
+order_count_cache = TTLCache(ttl=ORDER_COUNT_CACHE_TTL, max_size=10000)
+
+# 後台儀表板統計（依查詢日期區間），多位管理員同時開著儀表板時共用同一份結果
+# 訂單狀態異動時清除；其他 Pod 透過 PostgreSQL NOTIFY dashboard_changed 同步清除
+DASHBOARD_CACHE_TTL = float(os.getenv("DASHBOARD_CACHE_TTL", 15))              # 新鮮期
+DASHBOARD_CACHE_STALE_TTL = float(os.getenv("DASHBOARD_CACHE_STALE_TTL", 60))  # 過期後仍可先回傳舊值的時間
+DASHBOARD_CACHE_HOT_WINDOW = float(os.getenv("DASHBOARD_CACHE_HOT_WINDOW", 120))  # 多久內有人讀取算熱門
+DASHBOARD_CACHE_REFRESH_INTERVAL = float(os.getenv("DASHBOARD_CACHE_REFRESH_INTERVAL", 5))
+
+dashboard_cache = RefreshingCache(
+    ttl=DASHBOARD_CACHE_TTL,
+    stale_ttl=DASHBOARD_CACHE_STALE_TTL,
+    max_size=100,
+    hot_window=DASHBOARD_CACHE_HOT_WINDOW,
+)
@@ -0,0 +1,35 @@
+import hmac
+import hashlib
+import urllib.parse
+
+# 綠界共用編碼：CheckMacValue 的產生與驗證、物流 API 回應的解析
+# 金流（pay）、物流（orders）、模擬器與門市清單工具共用同一份實作
+#
+# CheckMacValue：
+#   1. 參數依名稱排序（不分大小寫），組成 HashKey=...&參數=值&...&HashIV=...
+#   2. URL encode 後轉小寫；與綠界（.NET）相同，- _ . ! * ( ) 不編碼
+#   3. MD5 後轉大寫
+
+def check_mac_value(params: dict, hash_key: str, hash_iv: str) -> str:
+    sorted_params = sorted(((k, v) for k, v in params.items() if k != "CheckMacValue"), key=lambda item: item[0].lower())
+    encode_str = f"HashKey={hash_key}&" + '&'.join(f"{k}={v}" for k, v in sorted_params) + f"&HashIV={hash_iv}"
+    encode_str = urllib.parse.quote_plus(encode_str, safe="-_.!*()").lower()
+    return hashlib.md5(encode_str.encode('utf-8')).hexdigest().upper()
+
+# 加上 CheckMacValue（直接修改並回傳 params）
+def sign(params: dict, hash_key: str, hash_iv: str) -> dict:
+    params["CheckMacValue"] = check_mac_value(params, hash_key, hash_iv)
+    return params
+
+# 驗證綠界送來的 CheckMacValue（固定時間比對）
+def verify(params: dict, hash_key: str, hash_iv: str) -> bool:
+    received = str(params.get("CheckMacValue") or "").upper()
+    return bool(received) and hmac.compare_digest(received, check_mac_value(params, hash_key, hash_iv))
+
+# 解析物流 API 回應：成功為「1|參數=值&...」，失敗為「0|錯誤訊息」
+# 回傳 (參數 dict, 錯誤訊息)；成功時錯誤訊息為 None
+def parse_response(text: str):
+    if text.startswith("0|"):
+        return {}, text[2:]
+    body = text.split("|", 1)[-1]
+    return dict(item.split("=", 1) for item in body.split("&") if "=" in item), None
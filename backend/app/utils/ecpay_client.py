@@ -0,0 +1,142 @@
+import os
+import time
+import random
+import asyncio
+import httpx
+
+# 綠界 API 共用用戶端（非同步）：
+#   - 整個行程共用一個 httpx.AsyncClient，保持連線（keep-alive），不必每次重新建立 TLS 連線
+#   - 以 semaphore 限制同時對綠界發出的請求數
+#   - 重試：連線失敗（請求未送出）一律可重試；冪等的呼叫（查詢類）另外在逾時、5xx、429 時重試，
+#     重試間隔為指數退避加隨機抖動（full jitter），避免大量請求同時重送
+#   - 斷路器：連續失敗達 ECPAY_BREAKER_THRESHOLD 次即「斷開」，ECPAY_BREAKER_COOLDOWN 秒內直接失敗不再呼叫綠界；
+#     冷卻後放行一個試探請求，成功即恢復，失敗則再斷開一段時間
+#   - 以上行為可用 python -m tools.check_ecpay_client 檢查（MockTransport，不連線綠界）
+ECPAY_LOGISTICS_API_URL = os.getenv("ECPAY_LOGISTICS_API_URL", "https://logistics-stage.ecpay.com.tw")
+ECPAY_MAX_CONCURRENT = int(os.getenv("ECPAY_MAX_CONCURRENT", 10))
+ECPAY_CONNECT_TIMEOUT = float(os.getenv("ECPAY_CONNECT_TIMEOUT", 3))
+ECPAY_READ_TIMEOUT = float(os.getenv("ECPAY_READ_TIMEOUT", 10))
+ECPAY_MAX_RETRIES = int(os.getenv("ECPAY_MAX_RETRIES", 2))            # 第一次之外最多再試幾次
+ECPAY_RETRY_BASE_DELAY = float(os.getenv("ECPAY_RETRY_BASE_DELAY", 0.2))
+ECPAY_RETRY_MAX_DELAY = float(os.getenv("ECPAY_RETRY_MAX_DELAY", 2))
+ECPAY_BREAKER_THRESHOLD = int(os.getenv("ECPAY_BREAKER_THRESHOLD", 5))
+ECPAY_BREAKER_COOLDOWN = float(os.getenv("ECPAY_BREAKER_COOLDOWN", 30))
+
+class EcpayError(Exception):
+    pass
+
+# 綠界回應逾時（請求可能已送達綠界）
+class EcpayTimeout(EcpayError):
+    pass
+
+# 綠界無法使用：連線失敗、5xx，或斷路器斷開中
+class EcpayUnavailable(EcpayError):
+    pass
+
+_client = None
+_semaphore = asyncio.Semaphore(ECPAY_MAX_CONCURRENT)
+_failures = 0          # 連續失敗次數
+_open_until = 0.0      # 斷路器斷開到何時（time.monotonic()）
+_probing = False       # 冷卻後是否已有試探請求在進行
+
+def _get_client():
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(ECPAY_READ_TIMEOUT, connect=ECPAY_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=ECPAY_MAX_CONCURRENT, max_keepalive_connections=ECPAY_MAX_CONCURRENT),
+        )
+    return _client
+
+async def close_ecpay_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+def breaker_state() -> str:
+    if _failures < ECPAY_BREAKER_THRESHOLD:
+        return "closed"
+    return "open" if time.monotonic() < _open_until else "half_open"
+
+# 呼叫前檢查斷路器；回傳 True 表示這次是冷卻後的試探請求
+def _before_call() -> bool:
+    global _probing
+    state = breaker_state()
+    if state == "open" or (state == "half_open" and _probing):
+        raise EcpayUnavailable("綠界服務暫時無法使用（斷路器斷開中）")
+    if state == "half_open":
+        _probing = True
+        return True
+    return False
+
+def _record_success():
+    global _failures, _probing
+    if _failures >= ECPAY_BREAKER_THRESHOLD:
+        print("✅ [綠界] 服務恢復，斷路器關閉")
+    _failures = 0
+    _probing = False
+
+def _record_failure():
+    global _failures, _open_until, _probing
+    _failures += 1
+    _probing = False
+    if _failures >= ECPAY_BREAKER_THRESHOLD:
+        _open_until = time.monotonic() + ECPAY_BREAKER_COOLDOWN
+        print(f"⚠️ [綠界] 連續失敗 {_failures} 次，斷路器斷開 {ECPAY_BREAKER_COOLDOWN:.0f} 秒")
+
+def _release_probe():
+    global _probing
+    _probing = False
+
+def _backoff(attempt: int) -> float:
+    return random.uniform(0, min(ECPAY_RETRY_MAX_DELAY, ECPAY_RETRY_BASE_DELAY * 2 ** attempt))
+
+# 以表單 POST 呼叫綠界 API，回傳回應內容（文字）
+# idempotent=True 僅用於重送不會造成重複效果的呼叫（例如查詢）；建立物流單等呼叫只在請求確定未送出時重試
+async def post_form(path: str, params: dict, idempotent: bool = False, base_url: str = None) -> str:
+    url = (base_url or ECPAY_LOGISTICS_API_URL).rstrip("/") + path
+    attempt = 0
+    while True:
+        probe = _before_call()
+        try:
+            async with _semaphore:
+                resp = await _get_client().post(url, data=params)
+            if resp.status_code >= 500 or resp.status_code == 429:
+                raise EcpayUnavailable(f"綠界回應 HTTP {resp.status_code}")
+        except httpx.PoolTimeout as e:
+            # 本機連線數已滿，與綠界狀態無關，不計入斷路器
+            error, retryable = EcpayUnavailable(f"綠界連線忙碌：{e!r}"), True
+        except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+            # 請求尚未送出，不論是否冪等都可以重試
+            _record_failure()
+            error, retryable = EcpayUnavailable(f"無法連線綠界：{e!r}"), True
+        except httpx.TimeoutException as e:
+            _record_failure()
+            error, retryable = EcpayTimeout(f"綠界回應逾時：{e!r}"), idempotent
+        except EcpayUnavailable as e:
+            _record_failure()
+            error, retryable = e, idempotent
+        except httpx.HTTPError as e:
+            _record_failure()
+            error, retryable = EcpayUnavailable(f"綠界 API 請求失敗：{e!r}"), False
+        except BaseException:
+            # 請求被取消（例如用戶端斷線）時，釋放試探名額
+            if probe:
+                _release_probe()
+            raise
+        else:
+            # 綠界有回應（含 4xx）即視為服務正常
+            _record_success()
+            if resp.status_code >= 400:
+                raise EcpayError(f"綠界回應 HTTP {resp.status_code}")
+            return resp.text
+
+        if probe:
+            _release_probe()
+        if not retryable or attempt >= ECPAY_MAX_RETRIES or breaker_state() == "open":
+            raise error
+        delay = _backoff(attempt)
+        attempt += 1
+        print(f"⚠️ [綠界] {path} 失敗（{error}），{delay:.2f} 秒後第 {attempt} 次重試")
+        await asyncio.sleep(delay)
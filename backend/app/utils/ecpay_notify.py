@@ -0,0 +1,188 @@
+import os
+import asyncio
+from psycopg.types.json import Jsonb
+from db.db import db_cursor
+from utils.cache import dashboard_cache
+
+# 綠界付款通知（收件匣 + 背景工作）：
+#   /api/ecpay/notify 只檢查欄位並寫入 ecpay_inbound_events（一次 INSERT，同時 NOTIFY ecpay_inbound），立即回應 1|OK；
+#   資料庫忙碌時綠界不會因等待逾時而重送，通知也不會因 Pod 重啟而遺失
+#   背景工作收到 NOTIFY（或每 ECPAY_NOTIFY_POLL_INTERVAL 秒）以 FOR UPDATE SKIP LOCKED 分批取出未處理的通知，
+#   多個 Pod 可同時處理而不會重複取到同一筆；每批在一個交易內結算（settle_payment）並標記已處理
+#   - CheckMacValue 在寫入收件匣前驗證（routers/pay.py），偽造的通知不會進到資料庫
+#   - 已處理的交易記錄在 ecpay_processed_trades（TradeNo + RtnCode），重送的通知以主鍵衝突直接略過
+#   - 狀態只往前推進：pending → success / fail，逾時被標為 fail 的訂單仍可被之後的付款成功通知更新；
+#     已付款（或已出貨）的訂單不會被重複或較晚到的通知改回
+#   - 出貨單只在訂單這次由未付款變為 success 時建立，並由 shipments.order_id 唯一索引保證只有一張
+#   - 單筆處理失敗只回滾該筆（SAVEPOINT），失敗達 ECPAY_NOTIFY_MAX_ATTEMPTS 次後不再自動重試
+ECPAY_NOTIFY_BATCH_SIZE = int(os.getenv("ECPAY_NOTIFY_BATCH_SIZE", 100))
+ECPAY_NOTIFY_POLL_INTERVAL = float(os.getenv("ECPAY_NOTIFY_POLL_INTERVAL", 5))
+ECPAY_NOTIFY_MAX_ATTEMPTS = int(os.getenv("ECPAY_NOTIFY_MAX_ATTEMPTS", 5))
+
+PENDING_CODES = ["10300066", "385"]  # 付款等待中
+CARD_ERROR_MESSAGES = {              # 信用卡常見錯誤
+    "10100248": "信用卡交易被拒絕",
+    "10100252": "信用卡額度不足",
+    "10100254": "信用卡交易失敗，請確認交易限制",
+    "10100251": "信用卡過期",
+}
+
+_wakeup = asyncio.Event()
+_worker_task = None
+
+# 綠界 RtnCode → (訂單狀態, 付款訊息)
+def payment_result(rtn_code: str, rtn_msg: str):
+    if rtn_code == "1":  # 付款成功
+        return "success", rtn_msg
+    if rtn_code in PENDING_CODES:
+        return "pending", "交易處理中，等待銀行回覆"
+    return "fail", CARD_ERROR_MESSAGES.get(rtn_code, rtn_msg)  # 其他所有錯誤
+
+# 寫入收件匣並通知背景工作（呼叫端負責提交）
+async def enqueue(cursor, payload: dict):
+    await cursor.execute("""
+        WITH event AS (
+            INSERT INTO ecpay_inbound_events (merchant_trade_no, rtn_code, payload)
+            VALUES (%s, %s, %s)
+            RETURNING id
+        )
+        SELECT pg_notify('ecpay_inbound', id::text) FROM event
+    """, (payload["MerchantTradeNo"], payload["RtnCode"], Jsonb(payload)))
+
+# 付款結算：一次往返完成「登記交易 → 更新訂單 → 建立出貨單」
+#   - 相同 TradeNo + RtnCode 已處理過時 claimed 為空，整句不做任何事
+#   - 狀態只往前推進（見檔案開頭說明），出貨單由 shipments.order_id 的唯一索引保證只有一張
+SETTLE_PAYMENT = """
+    WITH claimed AS (
+        INSERT INTO ecpay_processed_trades (trade_no, rtn_code, merchant_trade_no)
+        VALUES (%s, %s, %s)
+        ON CONFLICT DO NOTHING
+        RETURNING merchant_trade_no
+    ),
+    updated AS (
+        UPDATE orders o
+        SET status = %s,
+            payment_message = %s,
+            paid_at = CASE WHEN %s = 'success' THEN %s::timestamp ELSE NULL END,
+            updated_at = NOW()
+        FROM claimed c
+        WHERE o.order_id = c.merchant_trade_no
+          AND (o.status = 'pending' OR (o.status = 'fail' AND %s <> 'pending'))
+        RETURNING o.order_id, o.status, o.recipient_name, o.delivery_type,
+                  o.store_id, o.store_name, o.cvs_type, o.address
+    ),
+    shipped AS (
+        INSERT INTO shipments (
+            order_id, recipient_name, delivery_type, store_id, store_name, cvs_type, address, status, created_at
+        )
+        SELECT order_id, recipient_name, delivery_type, store_id, store_name, cvs_type, address, 'pending', NOW()
+        FROM updated
+        WHERE status = 'success'
+        ON CONFLICT (order_id) DO NOTHING
+        RETURNING order_id
+    )
+    SELECT (SELECT COUNT(*) FROM claimed) AS claimed,
+           (SELECT COUNT(*) FROM updated) AS updated,
+           (SELECT COUNT(*) FROM shipped) AS shipped
+"""
+
+# 套用一筆付款通知；回傳訂單是否有更新
+async def settle_payment(cursor, payload: dict) -> bool:
+    merchant_trade_no = payload["MerchantTradeNo"]
+    new_status, message = payment_result(payload["RtnCode"], payload.get("RtnMsg"))
+
+    await cursor.execute(SETTLE_PAYMENT, (
+        payload["TradeNo"], payload["RtnCode"], merchant_trade_no,
+        new_status, message, new_status, payload.get("PaymentDate"), new_status,
+    ))
+    result = await cursor.fetchone()
+    if not result["claimed"]:
+        print(f"⚠️ [付款通知] 交易 {payload['TradeNo']}（訂單 {merchant_trade_no}，RtnCode={payload['RtnCode']}）已處理過，略過")
+        return False
+    if not result["updated"]:
+        print(f"⚠️ [付款通知] 訂單 {merchant_trade_no} 不存在或狀態已確定，略過（RtnCode={payload['RtnCode']}）")
+        return False
+
+    print(f"✅ 訂單 {merchant_trade_no} 已更新為 {new_status}，原因：{message}")
+    if result["shipped"]:
+        print(f"✅ 已為訂單 {merchant_trade_no} 建立出貨單")
+    return True
+
+# 處理一批通知，回傳取出的筆數
+async def drain_batch() -> int:
+    async with db_cursor() as cursor:
+        await cursor.execute("""
+            SELECT id, payload
+            FROM ecpay_inbound_events
+            WHERE processed_at IS NULL AND attempts < %s
+            ORDER BY id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        """, (ECPAY_NOTIFY_MAX_ATTEMPTS, ECPAY_NOTIFY_BATCH_SIZE))
+        events = await cursor.fetchall()
+        if not events:
+            await cursor.connection.rollback()
+            return 0
+
+        processed, changed = [], False
+        for event in events:
+            await cursor.execute("SAVEPOINT ecpay_event")
+            try:
+                changed |= await settle_payment(cursor, event["payload"])
+                processed.append(event["id"])
+            except Exception as e:
+                await cursor.execute("ROLLBACK TO SAVEPOINT ecpay_event")
+                await cursor.execute("""
+                    UPDATE ecpay_inbound_events
+                    SET attempts = attempts + 1,
+                        last_error = %s
+                    WHERE id = %s
+                """, (str(e), event["id"]))
+                print(f"❌ [付款通知] 處理通知 {event['id']}（訂單 {event['payload'].get('MerchantTradeNo')}）失敗：{e}")
+
+        await cursor.execute("""
+            UPDATE ecpay_inbound_events
+            SET processed_at = NOW(),
+                attempts = attempts + 1
+            WHERE id = ANY(%s)
+        """, (processed,))
+        if changed:
+            await cursor.execute("SELECT pg_notify('dashboard_changed', 'ecpay_notify')")  # 提交後通知各 Pod 清除儀表板快取
+        await cursor.connection.commit()
+        if changed:
+            dashboard_cache.clear()
+        return len(events)
+
+# 收到 NOTIFY ecpay_inbound 時喚醒背景工作（db.listener 的 callback）
+def wake_notify_worker(payload=None):
+    _wakeup.set()
+
+async def _drain_forever():
+    while True:
+        _wakeup.clear()
+        try:
+            while await drain_batch() == ECPAY_NOTIFY_BATCH_SIZE:
+                pass
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ [付款通知] 處理收件匣時發生錯誤：{e}")
+        try:
+            await asyncio.wait_for(_wakeup.wait(), ECPAY_NOTIFY_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+def start_notify_worker():
+    global _worker_task
+    if _worker_task is None:
+        _worker_task = asyncio.create_task(_drain_forever())
+
+async def stop_notify_worker():
+    global _worker_task
+    if _worker_task:
+        _worker_task.cancel()
+        try:
+            await _worker_task
+        except asyncio.CancelledError:
+            pass
+        _worker_task = None
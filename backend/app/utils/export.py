@@ -0,0 +1,85 @@
+import io
+import os
+import csv
+import asyncio
+from datetime import datetime
+from psycopg import rows
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+from db.db import open_read_only_connection
+from utils.json_response import render_json
+
+# 大量資料匯出（CSV / NDJSON）：
+#   以專用唯讀連線 + server-side cursor（具名游標）逐批讀取，每批轉換後立即送出，
+#   記憶體只保留一批資料，不論匯出幾百萬筆都不會撐爆 Pod，也不佔用 API 連線池
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 2000))        # 每批讀取筆數
+EXPORT_MAX_CONCURRENT = int(os.getenv("EXPORT_MAX_CONCURRENT", 2))   # 同時進行的匯出數上限
+EXPORT_RETRY_AFTER = int(os.getenv("EXPORT_RETRY_AFTER", 30))
+EXPORT_FORMATS = ("csv", "ndjson")
+
+_export_slots = asyncio.Semaphore(EXPORT_MAX_CONCURRENT)
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def _encode_csv(batch):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_csv_value(v) for v in row] for row in batch)
+    return buffer.getvalue().encode("utf-8")
+
+async def _stream(query, params, fmt, columns):
+    try:
+        conn = await open_read_only_connection()
+        try:
+            # 具名游標需在交易中使用；結果留在資料庫端，每次 fetchmany 只取回一批
+            async with conn.transaction():
+                row_factory = rows.dict_row if fmt == "ndjson" else rows.tuple_row
+                async with conn.cursor(name="export", row_factory=row_factory) as cursor:
+                    cursor.itersize = EXPORT_BATCH_SIZE
+                    await cursor.execute(query, params)
+                    if fmt == "csv":
+                        yield "\ufeff".encode("utf-8") + _encode_csv([columns])  # BOM 讓 Excel 正確顯示中文
+                    while True:
+                        batch = await cursor.fetchmany(EXPORT_BATCH_SIZE)
+                        if not batch:
+                            break
+                        if fmt == "csv":
+                            yield _encode_csv(batch)
+                        else:
+                            yield b"".join(render_json(row) + b"\n" for row in batch)
+        finally:
+            await conn.close()
+    except Exception as e:
+        print(f"❌ [匯出] 串流中斷：{e}")
+        raise
+
+# 匯出名額在送出回應時才佔用，並在同一個 try/finally 內歸還：
+# 不論串流正常結束、用戶端中斷、產生器從未開始，或回應根本沒有送出，名額都不會遺失
+class _ExportResponse(StreamingResponse):
+    async def __call__(self, scope, receive, send):
+        if _export_slots.locked():
+            response = JSONResponse(
+                {"detail": "目前匯出作業過多，請稍後再試"},
+                status_code=429,
+                headers={"Retry-After": str(EXPORT_RETRY_AFTER)},
+            )
+            await response(scope, receive, send)
+            return
+        async with _export_slots:  # 上面已確認有名額，這裡不會等待
+            await super().__call__(scope, receive, send)
+
+# 回傳串流匯出的回應；query 的欄位順序需與 columns 相同
+# 同時匯出數已滿時回傳 429，避免長時間的匯出拖垮資料庫
+def streaming_export(query, params, fmt, columns, filename):
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Unsupported export format")
+    media_type = "text/csv; charset=utf-8" if fmt == "csv" else "application/x-ndjson"
+    return _ExportResponse(
+        _stream(query, params, fmt, columns),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
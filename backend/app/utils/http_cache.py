@@ -0,0 +1,44 @@
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request
+from fastapi.responses import Response
+
+# HTTP 條件式請求：回應帶上 ETag / Last-Modified，
+# 瀏覽器（或 Cloudflare）下次帶 If-None-Match / If-Modified-Since 詢問時，
+# 資料未變更就直接回 304，不需再傳送與序列化內容
+# 內容請先以 utils.json_response.render_json 轉成 bytes（可放進快取重複使用）
+
+def http_date(dt) -> str:
+    return format_datetime(dt.astimezone(timezone.utc), usegmt=True)
+
+# 判斷用戶端手上的版本是否仍是最新；有 If-None-Match 時以它為準（Cloudflare 壓縮後會改成 W/ 弱 ETag，比對時忽略）
+def is_not_modified(request: Request, etag: str, last_modified=None) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return etag.removeprefix("W/") in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+# 依條件式請求回傳 304 或完整內容；no-cache 表示可以快取但每次使用前都要向伺服器確認
+# body 可傳入已序列化的 bytes，或回傳 bytes 的函式（只在需要回傳內容時才序列化）
+def conditional_response(request: Request, body, etag: str, last_modified=None, cache_control: str = "no-cache"):
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified:
+        headers["Last-Modified"] = http_date(last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    if callable(body):
+        body = body()
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,19 @@
+import orjson
+from decimal import Decimal
+from fastapi.responses import JSONResponse
+
+# 快速 JSON 序列化：orjson 原生支援 datetime / date / UUID（輸出 ISO 8601），
+# Decimal 轉成 float；搭配 cursor.execute(..., json_rows=True) 取得的 dict 結果列，
+# 列表 API 可直接回傳查詢結果，不必逐列建立新 dict、呼叫 isoformat() / float()
+
+def _default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def render_json(content) -> bytes:
+    return orjson.dumps(content, default=_default)
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return render_json(content)
@@ -0,0 +1,63 @@
+import json
+import math
+import base64
+from datetime import datetime
+from fastapi import HTTPException
+
+# Keyset（游標）分頁：以上一頁最後一筆的排序欄位值作為下一頁的起點，
+# 查詢條件寫成 (排序欄位...) < (游標值...)，不論翻到第幾頁都只讀取一頁的資料
+#
+# 游標對前端是不透明的字串（base64 編碼的 JSON 陣列），前端只需原樣帶回 cursor 參數
+
+def encode_cursor(values) -> str:
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool) and -2**63 <= value < 2**63
+
+def _is_str(value):
+    return isinstance(value, str) and "\x00" not in value
+
+def _is_timestamp(value):
+    if not _is_str(value):
+        return False
+    try:
+        datetime.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+# 游標欄位型別：number（例如搜尋相關度）、timestamp（ISO 8601 時間）、int（數字 ID）、str（例如訂單編號）
+CURSOR_TYPES = {
+    "number": _is_number,
+    "timestamp": _is_timestamp,
+    "int": _is_int,
+    "str": _is_str,
+}
+
+# 解析游標；types 為各欄位的型別（見 CURSOR_TYPES），格式錯誤、欄位數或型別不符回傳 400
+# 游標由用戶端帶回，型別不符若直接送進查詢會變成資料庫錯誤（500）
+def decode_cursor(token: str, types) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(types):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not all(CURSOR_TYPES[t](v) for t, v in zip(types, values)):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+# 依查詢結果組成分頁回應：rows 需多查一筆（limit + 1）用來判斷是否還有下一頁
+# key(row) 回傳該筆資料的排序欄位值，做為下一頁游標
+def paginate(rows, limit: int, key):
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(key(rows[-1])) if has_more and rows else None
+    return rows, next_cursor
@@ -0,0 +1,43 @@
+from decimal import Decimal
+from utils.cache import price_cache
+
+# 購物車計價：商品名稱與單價一律以資料庫為準，前端傳來的 price / name 不採用
+# 整個購物車的商品以一次 WHERE id = ANY(...) 查詢取得，並放在 price_cache，
+# 不論購物車有幾項商品，結帳最多只查詢一次 products（快取命中時不查詢）
+
+class PricingError(ValueError):
+    pass
+
+async def _load_prices(cursor, product_ids):
+    await cursor.execute("SELECT id, name, price FROM products WHERE id = ANY(%s)", (list(product_ids),))
+    return {row[0]: (row[1], row[2]) for row in await cursor.fetchall()}
+
+# 依購物車內容 [{"id": 商品 ID, "quantity": 數量}, ...] 計算報價
+# 回傳 {"lines": [{product_id, name, unit_price, quantity, subtotal}], "total": 總金額}（金額為 Decimal）
+# 商品資料錯誤或商品已下架時拋出 PricingError（訊息可直接顯示給顧客）
+async def quote_cart(cursor, items) -> dict:
+    if not items:
+        raise PricingError("❌ 缺少商品資料")
+    for item in items:
+        quantity = item.get("quantity")
+        if not str(item.get("id")).isdigit() or not isinstance(quantity, int) or isinstance(quantity, bool) or quantity <= 0:
+            raise PricingError("❌ 商品數量錯誤")
+
+    product_ids = {int(item["id"]) for item in items}
+    prices = await price_cache.get_many_or_load(product_ids, lambda missing: _load_prices(cursor, missing))
+    unavailable = [item.get("name") or item["id"] for item in items if int(item["id"]) not in prices]
+    if unavailable:
+        raise PricingError(f"❌ 商品已下架：{'、'.join(map(str, unavailable))}")
+
+    lines = []
+    for item in items:
+        product_id = int(item["id"])
+        name, unit_price = prices[product_id]
+        lines.append({
+            "product_id": product_id,
+            "name": name,
+            "unit_price": unit_price,
+            "quantity": item["quantity"],
+            "subtotal": unit_price * item["quantity"],
+        })
+    return {"lines": lines, "total": sum((line["subtotal"] for line in lines), Decimal("0"))}
@@ -80,8 +80,9 @@ api.interceptors.response.use(
 
 // 商品相關 API
 export const productsAPI = {
-  getProducts() {
-    return api.get('/api/products');
+  // params：query、category、limit、cursor（上一頁回傳的 next_cursor）
+  getProducts(params = {}) {
+    return api.get('/api/products', { params });
   },
   addProduct(data) {
     return api.post('/api/products', data);
@@ -102,10 +103,13 @@ export const ordersAPI = {
   updateOrder(id, data) {
     return api.put(`/api/orders/${id}`, data);
   },
-  getCustomerOrders(customerId, page = 1, limit = 10) {
-    return api.get(`/api/customers/${customerId}/orders`, {
-      params: { page, limit }
-    });
+  // cursor：上一頁回傳的 next_cursor，第一頁不需帶
+  getCustomerOrders(customerId, cursor = '', limit = 10) {
+    const params = { limit };
+    if (cursor) {
+      params.cursor = cursor;
+    }
+    return api.get(`/api/customers/${customerId}/orders`, { params });
   }
 };
 
@@ -53,6 +53,18 @@ export const useCartStore = defineStore('cart', () => {
     }
   }
 
+  // 以後端報價（/api/cart/quote）更新商品名稱與單價，顯示的金額與實際結帳金額一致
+  function applyQuote(lines) {
+    for (const line of lines) {
+      const item = items.value.find(item => item.id === line.product_id);
+      if (item) {
+        item.name = line.name;
+        item.price = line.unit_price;
+      }
+    }
+    saveCart(); // 保存到 localStorage
+  }
+
   function clearCart() {
     items.value = [];
     saveCart(); // 保存到 localStorage
@@ -71,6 +83,7 @@ export const useCartStore = defineStore('cart', () => {
     removeItem,
     updateQuantity,
     clearCart,
+    applyQuote,
     loadCart
   };
 });